@@ -0,0 +1,120 @@
+"""Throughput and ratio of the artifact codecs on pass directories.
+
+    python benchmarks/artifact_codecs.py /data/worker_runs/run_20250101_000000_abcd1234
+    python benchmarks/artifact_codecs.py --synthetic 20 --threads 1,4,8
+
+Positional arguments are run workdirs (their numeric pass directories are
+used) or pass directories. Without any, ``--synthetic N`` builds N pass
+directories with an HTML report and a tick-mode sized report.json. Every
+codec packs the whole set as one callback batch, the way
+``zip_pass_dirs_to_b64`` does, and is reported as input MB/s and
+compressed/original ratio. ``legacy`` is the previous single-threaded
+``zipfile`` deflate path for reference; zstd rows only appear when the
+zstandard package is installed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _synthetic_pass_dirs(root: Path, count: int) -> list[Path]:
+    rnd = random.Random(7)
+    dirs: list[Path] = []
+    for pid in range(1, count + 1):
+        pass_dir = root / str(pid)
+        pass_dir.mkdir(parents=True)
+        rows = "".join(
+            f"<tr><td>{i}</td><td>EURUSD</td><td>{rnd.uniform(-50, 60):.2f}</td></tr>" for i in range(20000)
+        )
+        (pass_dir / "report.html").write_text(f"<html><body><table>{rows}</table></body></html>", encoding="utf-8")
+        trades = [
+            {"id": i, "symbol": "EURUSD", "volume": 1000, "netProfit": round(rnd.uniform(-50, 60), 2)}
+            for i in range(60000)
+        ]
+        (pass_dir / "report.json").write_text(json.dumps({"main": {"netProfit": 1.0}, "trades": trades}), encoding="utf-8")
+        (pass_dir / "log.txt").write_text("backtest started\n" * 200, encoding="utf-8")
+        (pass_dir / "parameters.cbotset").write_text(json.dumps({"Parameters": {"x": pid}}), encoding="utf-8")
+        dirs.append(pass_dir)
+    return dirs
+
+
+def _collect(paths: list[str]) -> list[Path]:
+    dirs: list[Path] = []
+    for raw in paths:
+        path = Path(raw).expanduser().resolve()
+        children = sorted(p for p in path.iterdir() if p.is_dir() and p.name.isdigit())
+        dirs.extend(children or [path])
+    return dirs
+
+
+def _legacy_zip(dirs: list[Path]) -> bytes:
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for pass_dir in dirs:
+            for child in pass_dir.rglob("*"):
+                if child.is_file():
+                    zf.write(child, arcname=str(Path(pass_dir.name) / child.relative_to(pass_dir)))
+    return out.getvalue()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("paths", nargs="*")
+    ap.add_argument("--synthetic", type=int, default=10)
+    ap.add_argument("--codecs", default="stored,deflate:1,deflate:6,deflate:9,zstd:3,zstd:9")
+    ap.add_argument("--threads", default=f"1,{min(8, os.cpu_count() or 1)}")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    os.environ.setdefault("OPTIMO_WORKER_ROOT", tempfile.mkdtemp(prefix="optimo-bench-"))
+    sys.path.insert(0, str(REPO_ROOT))
+    import main as worker  # noqa: E402
+
+    with tempfile.TemporaryDirectory(prefix="optimo-codec-bench-") as tmp:
+        dirs = _collect(args.paths) if args.paths else _synthetic_pass_dirs(Path(tmp), args.synthetic)
+        entries: list[tuple[str, Path]] = []
+        for pass_dir in dirs:
+            entries.extend(worker._artifact_entries(pass_dir, f"{pass_dir.name}/"))
+        total = sum(path.stat().st_size for _, path in entries)
+        print(f"{len(dirs)} pass dirs, {len(entries)} files, {total / 1e6:.1f} MB")
+        print(f"{'codec':>10} {'threads':>7} {'MB/s':>8} {'ratio':>7} {'seconds':>8}")
+
+        def _report(label: str, threads: int, fn) -> None:
+            best = float("inf")
+            size = 0
+            for _ in range(max(1, args.repeat)):
+                started = time.perf_counter()
+                size = len(fn())
+                best = min(best, time.perf_counter() - started)
+            print(f"{label:>10} {threads:>7} {total / 1e6 / best:>8.1f} {size / max(1, total):>7.3f} {best:>8.3f}", flush=True)
+
+        _report("legacy", 1, lambda: _legacy_zip(dirs))
+        for spec in [c.strip() for c in args.codecs.split(",") if c.strip()]:
+            try:
+                codec = worker._parse_artifact_codec(spec)
+            except ValueError as exc:
+                print(f"{spec:>10} skipped: {exc}")
+                continue
+            for threads in [int(t) for t in args.threads.split(",") if t.strip()]:
+                worker.ARTIFACT_PACK_THREADS = threads
+                worker._PACK_POOL = None
+                _report(codec.label, threads, lambda: worker._pack_artifacts(entries, codec)[0])
+                if codec.name == "zstd":
+                    # zstd uses its own thread pool; the pack threads do not apply.
+                    break
+
+
+if __name__ == "__main__":
+    main()
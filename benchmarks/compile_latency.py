@@ -0,0 +1,88 @@
+"""Cold vs warm /compile latency: a fresh CLI process per attempt against the
+patched host that keeps the CLI loaded between compiles.
+
+    python benchmarks/compile_latency.py path/to/BotProject --repeat 5
+    python benchmarks/compile_latency.py bot_source.zip --project Bot/Bot.csproj
+
+Needs the same environment as the worker (CTRADE_CLI_PATH, CTRADE_CLI_DIR,
+OPTIMO_CLI_PATCHED_HOST_PATH, OPTIMO_CLI_PATCHED_DOTNET_PATH). Each mode
+starts with no remembered compile syntax, so ``first_ms`` includes syntax
+detection (and, for ``warm``, starting the host); the remaining compiles
+are summarised as p50/min/max. The compile cache is bypassed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("source", help="bot source directory or zip archive")
+    ap.add_argument("--project", default=None, help="project path inside the source, as project_relpath")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--timeout", type=int, default=300)
+    ap.add_argument("--modes", default="cold,warm")
+    args = ap.parse_args()
+
+    os.environ.setdefault("OPTIMO_WORKER_ROOT", tempfile.mkdtemp(prefix="optimo-bench-"))
+    os.environ.setdefault("OPTIMO_CUSTOM_CLI_PATCHED", "1")
+    sys.path.insert(0, str(REPO_ROOT))
+    import main as worker  # noqa: E402
+
+    with tempfile.TemporaryDirectory(prefix="optimo-compile-bench-") as tmp:
+        source_dir = Path(tmp) / "source"
+        src = Path(args.source).expanduser().resolve()
+        if src.is_file():
+            with zipfile.ZipFile(src, "r") as zf:
+                zf.extractall(source_dir)
+        else:
+            shutil.copytree(src, source_dir)
+        target = worker._resolve_compile_target(source_dir, args.project)
+        print(f"target: {target}")
+        print(f"cli version: {worker._cli_version()}")
+        print(f"{'mode':>5} {'first_ms':>9} {'p50_ms':>8} {'min_ms':>8} {'max_ms':>8} {'syntax':>6}")
+
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            worker.COMPILE_VIA_HOST = mode == "warm"
+            if mode == "warm" and not worker._compile_host_available():
+                print(f"{mode:>5} skipped: patched host not found at {worker.CLI_PATCHED_HOST_PATH}")
+                continue
+            worker._close_compile_client()
+            worker._COMPILE_PROFILES = {}
+            (worker.WORKER_ROOT / worker.COMPILE_PROFILE_FILENAME).unlink(missing_ok=True)
+
+            timings: list[float] = []
+            for i in range(max(2, args.repeat + 1)):
+                out_dir = Path(tmp) / f"{mode}_{i}"
+                out_dir.mkdir()
+                started = time.perf_counter()
+                try:
+                    worker._run_compile_commands(target, out_dir / "compiled.algo", args.timeout)
+                except worker.HTTPException as exc:
+                    print(f"{mode:>5} failed: {str(exc.detail)[:500]}")
+                    break
+                timings.append((time.perf_counter() - started) * 1000.0)
+            else:
+                steady = timings[1:]
+                syntax = worker._compile_profile(worker._cli_version()).get("syntax")
+                print(
+                    f"{mode:>5} {timings[0]:>9.0f} {statistics.median(steady):>8.0f} "
+                    f"{min(steady):>8.0f} {max(steady):>8.0f} {str(syntax):>6}",
+                    flush=True,
+                )
+            worker._close_compile_client()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Micro-benchmark: full json.loads of report.json vs the selective streaming parser.
+
+    python benchmarks/report_parser.py --sizes 10,100,500
+
+Writes synthetic tick-mode reports (summary sections plus a large ``trades``
+array and ``equity.curve``) of each size in MB, once with the summary before
+the big arrays and once after, then times each parser in a fresh interpreter
+and reports wall time and peak RSS (file pages touched through mmap count
+towards RSS). ``legacy`` is the previous read_text + json.loads path;
+``stream`` is parse_report with the streaming scanner (orjson decodes the
+picked sections when installed); ``project`` adds a three-field metrics
+projection, which only needs ``main`` and ``tradeStatistics``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+SUMMARY = {
+    "main": {"netProfit": 1234.5, "endingEquity": 11234.5, "endingBalance": 11234.5},
+    "tradeStatistics": {
+        "profitFactor": {"all": 1.41},
+        "totalTrades": {"all": 0},
+        "winningTrades": {"all": 0},
+        "losingTrades": {"all": 0},
+        "averageTrade": {"all": 0.42},
+    },
+}
+
+
+def _write_report(path: Path, size_mb: int, summary_first: bool) -> None:
+    rnd = random.Random(size_mb)
+    target = size_mb * 1024 * 1024
+    with path.open("w", encoding="utf-8") as fh:
+        fh.write("{")
+        if summary_first:
+            fh.write(json.dumps(SUMMARY)[1:-1] + ",")
+        fh.write('"trades":[')
+        written = 0
+        i = 0
+        while written < target * 0.8:
+            row = json.dumps(
+                {
+                    "id": i,
+                    "symbol": "EURUSD",
+                    "direction": "Buy" if i % 2 else "Sell",
+                    "entryTime": "2024-01-01T00:00:00.000Z",
+                    "closeTime": "2024-01-01T01:00:00.000Z",
+                    "volume": 1000,
+                    "netProfit": round(rnd.uniform(-50, 60), 2),
+                    "comment": "tp/sl {hit} [auto]",
+                }
+            )
+            fh.write(("," if i else "") + row)
+            written += len(row) + 1
+            i += 1
+        fh.write('],"equity":{"maxEquityDrawdownPercent":7.5,"maxBalanceDrawdownPercent":6.1,"curve":[')
+        j = 0
+        while written < target:
+            point = f'{{"t":{j},"v":{10000 + rnd.uniform(-500, 1500):.2f}}}'
+            fh.write(("," if j else "") + point)
+            written += len(point) + 1
+            j += 1
+        fh.write("]}")
+        if not summary_first:
+            fh.write("," + json.dumps(SUMMARY)[1:-1])
+        fh.write("}")
+
+
+def _child(mode: str, report: str) -> None:
+    os.environ.setdefault("OPTIMO_WORKER_ROOT", tempfile.mkdtemp(prefix="optimo-bench-"))
+    sys.path.insert(0, str(REPO_ROOT))
+    import main  # noqa: E402
+
+    path = Path(report)
+    started = time.perf_counter()
+    if mode == "legacy":
+        obj = json.loads(path.read_text(encoding="utf-8", errors="ignore"))
+        value = obj["main"]["netProfit"]
+    elif mode == "project":
+        main.REPORT_STREAM_MIN_BYTES = 0
+        extractor = main._compile_metrics_projection(["netProfit", "profitFactor", "totalTrades"])
+        value = main.parse_report(path, extractor)["netProfit"]
+    else:
+        main.REPORT_STREAM_MIN_BYTES = 0
+        value = main.parse_report(path)["netProfit"]
+    elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print(json.dumps({"seconds": round(elapsed, 3), "peak_rss_mb": round(peak_mb, 1), "netProfit": value}))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10,100,500")
+    ap.add_argument("--child", nargs=2, metavar=("MODE", "REPORT"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        _child(*args.child)
+        return
+
+    try:
+        import orjson  # noqa: F401
+
+        backend = "orjson"
+    except ImportError:
+        backend = "json"
+    print(f"section decoder: {backend}")
+    print(f"{'size':>6} {'layout':>14} {'mode':>7} {'seconds':>8} {'peak_rss_mb':>12}")
+    with tempfile.TemporaryDirectory(prefix="optimo-report-bench-") as tmp:
+        for size in [int(x) for x in args.sizes.split(",") if x.strip()]:
+            for summary_first in (True, False):
+                report = Path(tmp) / f"report_{size}_{int(summary_first)}.json"
+                _write_report(report, size, summary_first)
+                layout = "summary_first" if summary_first else "summary_last"
+                for mode in ("legacy", "stream", "project"):
+                    out = subprocess.run(
+                        [sys.executable, __file__, "--child", mode, str(report)],
+                        capture_output=True,
+                        text=True,
+                    )
+                    lines = [ln for ln in out.stdout.splitlines() if ln.startswith("{")]
+                    if not lines:
+                        print(f"{size:>6} {layout:>14} {mode:>7} failed: {out.stderr[-500:]}")
+                        continue
+                    res = json.loads(lines[-1])
+                    print(f"{size:>6} {layout:>14} {mode:>7} {res['seconds']:>8} {res['peak_rss_mb']:>12}", flush=True)
+                report.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Compare in-process slots with process-sharded slot supervisors.
+
+    python benchmarks/slot_shards.py --passes 200 --parallel 8 --shards 0,2,4
+
+Each configuration runs in a fresh interpreter with a fake cTrader CLI
+(subprocess mode, no dotnet needed) that sleeps ``--backtest-seconds`` and
+writes a report of ``--report-trades`` trades, so the worker still parses
+and zips real-sized files. While the run drains, the main thread polls
+``GET /status`` and records its latency. Reported per configuration:
+
+- ``status_p50_ms`` / ``status_p99_ms``: API latency under load
+- ``pass_overhead_ms``: wall time per pass per slot beyond the fake backtest
+- ``passes_per_second``
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+FAKE_CLI = r'''#!/usr/bin/env python3
+import json, os, sys, time
+args = sys.argv[1:]
+opts = dict(a[2:].split("=", 1) for a in args if a.startswith("--") and "=" in a)
+if args and args[0] == "compile":
+    open(opts["output"], "wb").write(b"ALGO")
+    sys.exit(0)
+time.sleep(float(os.environ.get("BENCH_BACKTEST_SECONDS", "0.2")))
+trades = int(os.environ.get("BENCH_REPORT_TRADES", "2000"))
+params = json.load(open(args[2]))["Parameters"]
+report = {
+    "main": {"netProfit": float(params.get("x", 0)), "endingEquity": 10000.0, "endingBalance": 10000.0},
+    "tradeStatistics": {"profitFactor": {"all": 1.2}, "totalTrades": {"all": trades}},
+    "equity": {"maxEquityDrawdownPercent": 5.0, "maxBalanceDrawdownPercent": 4.0},
+    "trades": [{"id": i, "symbol": "EURUSD", "volume": 1000, "netProfit": (i % 7) - 3.0} for i in range(trades)],
+}
+if "report" in opts:
+    open(opts["report"], "w").write("<html>" + "x" * 50000 + "</html>")
+open(opts["report-json"], "w").write(json.dumps(report))
+'''
+
+
+def _child(args: argparse.Namespace) -> None:
+    sys.path.insert(0, str(REPO_ROOT))
+    import main  # noqa: E402
+    from fastapi.testclient import TestClient
+
+    payload = dict(
+        symbol="EURUSD", period="h1", start="01/01/2024", end="02/01/2024", data_mode="m1",
+        ctid="bench", account="1", pwd_text="bench", include_artifacts=True,
+        algo_b64=base64.b64encode(b"algo").decode(),
+    )
+    latencies: list[float] = []
+    with TestClient(main.app) as client:
+        run_id = client.post("/run/start", json=payload).json()["run_id"]
+        started = time.perf_counter()
+        passes = [{"pass_id": i, "parameters": {"x": i}} for i in range(1, args.passes + 1)]
+        client.post(f"/run/{run_id}/assign", json={"passes": passes})
+        while True:
+            t0 = time.perf_counter()
+            status = client.get("/status").json()
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            if not status["busy"]:
+                break
+            time.sleep(0.02)
+        wall = time.perf_counter() - started
+        client.post(f"/run/{run_id}/stop")
+    latencies.sort()
+    per_pass = wall * args.parallel / max(1, args.passes)
+    print(json.dumps({
+        "shards": args.shards_one,
+        "passes": args.passes,
+        "wall_seconds": round(wall, 3),
+        "passes_per_second": round(args.passes / wall, 2),
+        "pass_overhead_ms": round((per_pass - args.backtest_seconds) * 1000.0, 1),
+        "status_p50_ms": round(latencies[len(latencies) // 2], 2),
+        "status_p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+        "status_samples": len(latencies),
+    }))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--passes", type=int, default=200)
+    ap.add_argument("--parallel", type=int, default=8)
+    ap.add_argument("--shards", default="0,2")
+    ap.add_argument("--backtest-seconds", type=float, default=0.2)
+    ap.add_argument("--report-trades", type=int, default=2000)
+    ap.add_argument("--shards-one", type=int, default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.shards_one is not None:
+        _child(args)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="optimo-bench-") as tmp:
+        cli = Path(tmp) / "fake_cli.py"
+        cli.write_text(FAKE_CLI, encoding="utf-8")
+        cli.chmod(0o755)
+        for shards in [int(x) for x in args.shards.split(",") if x.strip()]:
+            env = dict(
+                os.environ,
+                OPTIMO_WORKER_ROOT=str(Path(tmp) / f"root_{shards}"),
+                CTRADE_CLI_PATH=str(cli),
+                OPTIMO_CUSTOM_CLI_PATCHED="0",
+                OPTIMO_WORKER_RUN_JOURNAL="0",
+                OPTIMO_WORKER_PARALLEL=str(args.parallel),
+                OPTIMO_WORKER_SLOT_PROCESSES=str(shards),
+                BENCH_BACKTEST_SECONDS=str(args.backtest_seconds),
+                BENCH_REPORT_TRADES=str(args.report_trades),
+            )
+            cmd = [
+                sys.executable, __file__,
+                "--passes", str(args.passes),
+                "--parallel", str(args.parallel),
+                "--backtest-seconds", str(args.backtest_seconds),
+                "--shards-one", str(shards),
+            ]
+            out = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            lines = [ln for ln in out.stdout.splitlines() if ln.startswith("{")]
+            print(lines[-1] if lines else f"shards={shards} failed:\n{out.stderr[-2000:]}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
+using System.Collections.Concurrent;
 using System.Diagnostics;
 using System.Globalization;
 using System.Reflection;
 using System.Runtime.InteropServices;
+using System.Text;
 using System.Text.Json;
 
 namespace Optimo.CliPatchedHost;
@@ -10,12 +12,19 @@ internal static class Program
 {
     private const string CliEntryAssembly = "ctrader-cli.dll";
     private const string CliCommandName = "ctrader-cli";
+    private const string ProgressMarker = "OPTIMO_PROGRESS";
 
     private static readonly JsonSerializerOptions JsonOptions = new()
     {
         PropertyNamingPolicy = JsonNamingPolicy.CamelCase,
     };
 
+    private static readonly object ProtocolLock = new();
+    private static TextWriter _protocolOut = Console.Out;
+    private static volatile string? _activeRequestId;
+    private static int _progressIntervalMs = 1000;
+    private static string _cliDir = string.Empty;
+
     private static int Main(string[] args)
     {
         SessionBacktestHost? sessionHost = null;
@@ -53,18 +62,37 @@ internal static class Program
             }
 
             sessionHost = new SessionBacktestHost(cliDir, cliAssembly, commandLineArgsField);
-
-            string? line;
-            while ((line = Console.ReadLine()) != null)
+            _cliDir = cliDir;
+            _protocolOut = Console.Out;
+            _progressIntervalMs = cfg.ProgressIntervalMs;
+
+            // Control messages (abort) must get through while a request is running,
+            // so stdin is read on its own thread and requests are queued.
+            var requests = new BlockingCollection<string>();
+            var host = sessionHost;
+            var stdinReader = new Thread(() =>
             {
-                if (string.IsNullOrWhiteSpace(line))
+                string? raw;
+                while ((raw = Console.In.ReadLine()) != null)
                 {
-                    continue;
+                    if (string.IsNullOrWhiteSpace(raw) || TryHandleControl(raw, host))
+                    {
+                        continue;
+                    }
+                    requests.Add(raw);
                 }
+                requests.CompleteAdding();
+            })
+            {
+                IsBackground = true,
+                Name = "protocol-stdin",
+            };
+            stdinReader.Start();
 
+            foreach (var line in requests.GetConsumingEnumerable())
+            {
                 var response = ExecuteRequest(line, entryPoint, commandLineArgsField, sessionHost);
-                Console.WriteLine(JsonSerializer.Serialize(response, JsonOptions));
-                Console.Out.Flush();
+                WriteProtocolLine(response);
             }
 
             return 0;
@@ -109,6 +137,49 @@ internal static class Program
         };
     }
 
+    private static void WriteProtocolLine<T>(T payload)
+    {
+        var json = JsonSerializer.Serialize(payload, JsonOptions);
+        lock (ProtocolLock)
+        {
+            _protocolOut.WriteLine(json);
+            _protocolOut.Flush();
+        }
+    }
+
+    private static bool TryHandleControl(string rawJson, SessionBacktestHost sessionHost)
+    {
+        string? id;
+        string? control;
+        try
+        {
+            using var doc = JsonDocument.Parse(rawJson);
+            if (doc.RootElement.ValueKind != JsonValueKind.Object
+                || !doc.RootElement.TryGetProperty("control", out var controlElement))
+            {
+                return false;
+            }
+            control = controlElement.GetString();
+            id = doc.RootElement.TryGetProperty("id", out var idElement) ? idElement.GetString() : null;
+        }
+        catch (JsonException)
+        {
+            // Not ours to judge; ExecuteRequest reports invalid JSON.
+            return false;
+        }
+
+        var accepted = false;
+        if (string.Equals(control, "abort", StringComparison.OrdinalIgnoreCase)
+            && !string.IsNullOrEmpty(id)
+            && string.Equals(id, _activeRequestId, StringComparison.Ordinal))
+        {
+            accepted = sessionHost.RequestAbort();
+        }
+
+        WriteProtocolLine(new ControlAck { Id = id ?? string.Empty, Control = control ?? string.Empty, Accepted = accepted });
+        return true;
+    }
+
     private static CommandResponse ExecuteRequest(
         string rawJson,
         MethodInfo entryPoint,
@@ -170,22 +241,34 @@ internal static class Program
         var stderrWriter = new StringWriter(CultureInfo.InvariantCulture);
         var oldOut = Console.Out;
         var oldErr = Console.Error;
+        ProgressTap? progressTap = null;
 
         var sw = Stopwatch.StartNew();
         try
         {
-            Console.SetOut(stdoutWriter);
             Console.SetError(stderrWriter);
 
             if (string.Equals(args[0], "backtest", StringComparison.OrdinalIgnoreCase))
             {
+                // The cBot log goes to stdout; the tap relays its progress lines as events.
+                progressTap = new ProgressTap(stdoutWriter, request.Id!, _progressIntervalMs);
+                Console.SetOut(progressTap);
+                _activeRequestId = request.Id;
                 var sessionResult = sessionHost.ExecuteBacktest(args);
                 response.ExitCode = sessionResult.ExitCode;
                 response.Ok = sessionResult.ExitCode == 0 && string.IsNullOrWhiteSpace(sessionResult.Error);
                 response.Error = sessionResult.Error;
             }
+            else if (string.Equals(args[0], "compile", StringComparison.OrdinalIgnoreCase))
+            {
+                Console.SetOut(stdoutWriter);
+                var result = ExecuteCompile(args, entryPoint, commandLineArgsField, sessionHost);
+                response.ExitCode = result;
+                response.Ok = result == 0;
+            }
             else
             {
+                Console.SetOut(stdoutWriter);
                 var cliArgs = new string[args.Length + 1];
                 cliArgs[0] = CliCommandName;
                 Array.Copy(args, 0, cliArgs, 1, args.Length);
@@ -206,8 +289,10 @@ internal static class Program
         }
         finally
         {
+            _activeRequestId = null;
             Console.Out.Flush();
             Console.Error.Flush();
+            progressTap?.Dispose();
             response.Stdout = stdoutWriter.ToString();
             response.Stderr = stderrWriter.ToString();
             Console.SetOut(oldOut);
@@ -219,6 +304,43 @@ internal static class Program
         return response;
     }
 
+    // Runs "compile ..." through the CLI entry point in this process, so repeated
+    // compiles skip .NET startup and assembly loading. The worker keeps a host
+    // for compiles only: the entry point must not run next to a backtest session.
+    private static int ExecuteCompile(
+        string[] args,
+        MethodInfo entryPoint,
+        FieldInfo commandLineArgsField,
+        SessionBacktestHost sessionHost)
+    {
+        if (sessionHost.IsStarted)
+        {
+            throw new InvalidOperationException("compile_unavailable: a backtest session is active in this host");
+        }
+
+        var previousDirectory = Directory.GetCurrentDirectory();
+        var cliArgs = new string[args.Length + 1];
+        cliArgs[0] = CliCommandName;
+        Array.Copy(args, 0, cliArgs, 1, args.Length);
+        commandLineArgsField.SetValue(null, cliArgs);
+        Environment.SetEnvironmentVariable("__CT_PRODUCT_PATH", _cliDir);
+        Environment.SetEnvironmentVariable(
+            "__CT_DOTNET_PATH",
+            Path.TrimEndingDirectorySeparator(RuntimeEnvironment.GetRuntimeDirectory()));
+        Environment.ExitCode = 0;
+        try
+        {
+            var result = InvokeEntryPoint(entryPoint, cliArgs);
+            // Some commands only report failure through Environment.ExitCode.
+            return result != 0 ? result : Environment.ExitCode;
+        }
+        finally
+        {
+            Environment.ExitCode = 0;
+            Directory.SetCurrentDirectory(previousDirectory);
+        }
+    }
+
     private static int InvokeEntryPoint(MethodInfo entryPoint, string[] cliArgs)
     {
         object? result;
@@ -262,6 +384,7 @@ internal static class Program
     private static Config? ParseArgs(string[] args)
     {
         string? cliDir = null;
+        var progressIntervalMs = 1000;
 
         for (var i = 0; i < args.Length; i++)
         {
@@ -275,6 +398,14 @@ internal static class Program
                     }
                     cliDir = args[++i];
                     break;
+                case "--progress-interval-ms":
+                    if (i + 1 >= args.Length
+                        || !int.TryParse(args[++i], NumberStyles.Integer, CultureInfo.InvariantCulture, out progressIntervalMs)
+                        || progressIntervalMs < 50)
+                    {
+                        return null;
+                    }
+                    break;
                 case "-h":
                 case "--help":
                     return null;
@@ -292,22 +423,30 @@ internal static class Program
         return new Config
         {
             CliDir = cliDir,
+            ProgressIntervalMs = progressIntervalMs,
         };
     }
 
     private static void PrintUsage()
     {
         Console.WriteLine("Usage:");
-        Console.WriteLine("  dotnet Optimo.CliPatchedHost.dll --cli-dir <ctrader_cli_directory>");
+        Console.WriteLine("  dotnet Optimo.CliPatchedHost.dll --cli-dir <ctrader_cli_directory> [--progress-interval-ms 1000]");
         Console.WriteLine();
         Console.WriteLine("Protocol:");
         Console.WriteLine("  stdin:  one JSON line per request:  {\"id\":\"1\",\"args\":[\"backtest\",\"...\"]}");
+        Console.WriteLine("          control for the request in flight: {\"id\":\"1\",\"control\":\"abort\"}");
+        Console.WriteLine("          compile in this process:  {\"id\":\"2\",\"args\":[\"compile\",\"<project>\",\"--output=<file.algo>\"]}");
         Console.WriteLine("  stdout: one JSON line per response with fields id/ok/exitCode/stdout/stderr/error/elapsedMs");
+        Console.WriteLine("          progress while a backtest runs: {\"id\":\"1\",\"event\":\"progress\",\"data\":{...}}");
+        Console.WriteLine("          data comes from cBot log lines \"OPTIMO_PROGRESS {json}\" (time/equity/balance/");
+        Console.WriteLine("          drawdownPercent/trades/bars/ticks), the log timestamps and elapsedMs");
     }
 
     private sealed class Config
     {
         public string CliDir { get; init; } = string.Empty;
+
+        public int ProgressIntervalMs { get; init; } = 1000;
     }
 
     private sealed class CommandRequest
@@ -334,6 +473,148 @@ internal static class Program
         public long ElapsedMs { get; set; }
     }
 
+    private sealed class ProgressEvent
+    {
+        public string Id { get; init; } = string.Empty;
+
+        public string Event { get; init; } = "progress";
+
+        public Dictionary<string, JsonElement> Data { get; init; } = new();
+    }
+
+    private sealed class ControlAck
+    {
+        public string Id { get; init; } = string.Empty;
+
+        public string Event { get; init; } = "control";
+
+        public string Control { get; init; } = string.Empty;
+
+        public bool Accepted { get; init; }
+    }
+
+    // Captures the backtest's console output like a StringWriter and watches each
+    // completed line: "OPTIMO_PROGRESS {json}" fields and the simulated timestamp
+    // that prefixes cBot log lines are merged into the latest progress snapshot.
+    // A timer sends it once per interval with the wall time elapsed, so the
+    // worker can tell a slow backtest from a stuck one.
+    private sealed class ProgressTap : TextWriter
+    {
+        private static readonly string[] LogTimeFormats =
+        {
+            "dd/MM/yyyy HH:mm:ss.fff",
+            "dd/MM/yyyy HH:mm:ss",
+        };
+
+        private readonly StringWriter _inner;
+        private readonly string _requestId;
+        private readonly StringBuilder _line = new();
+        private readonly Dictionary<string, JsonElement> _snapshot = new();
+        private readonly Stopwatch _elapsed = Stopwatch.StartNew();
+        private readonly Timer _timer;
+
+        public ProgressTap(StringWriter inner, string requestId, int intervalMs)
+        {
+            _inner = inner;
+            _requestId = requestId;
+            _timer = new Timer(_ => Emit(), null, intervalMs, intervalMs);
+        }
+
+        public override Encoding Encoding => _inner.Encoding;
+
+        public override void Write(char value)
+        {
+            lock (_inner)
+            {
+                _inner.Write(value);
+                Track(value);
+            }
+        }
+
+        public override void Write(string? value)
+        {
+            if (value is null)
+            {
+                return;
+            }
+            lock (_inner)
+            {
+                _inner.Write(value);
+                foreach (var ch in value)
+                {
+                    Track(ch);
+                }
+            }
+        }
+
+        private void Track(char value)
+        {
+            if (value == '\n')
+            {
+                InspectLine(_line.ToString());
+                _line.Clear();
+            }
+            else if (value != '\r')
+            {
+                _line.Append(value);
+            }
+        }
+
+        private void InspectLine(string line)
+        {
+            var markerPos = line.IndexOf(ProgressMarker, StringComparison.Ordinal);
+            var lineHasTime = false;
+            if (markerPos >= 0)
+            {
+                try
+                {
+                    using var doc = JsonDocument.Parse(line[(markerPos + ProgressMarker.Length)..]);
+                    if (doc.RootElement.ValueKind == JsonValueKind.Object)
+                    {
+                        foreach (var prop in doc.RootElement.EnumerateObject())
+                        {
+                            _snapshot[prop.Name] = prop.Value.Clone();
+                            lineHasTime |= prop.Name == "time";
+                        }
+                    }
+                }
+                catch (JsonException)
+                {
+                    // Malformed progress line; the cBot log keeps it anyway.
+                }
+            }
+
+            var sep = line.IndexOf(" | ", StringComparison.Ordinal);
+            if (sep > 0
+                && DateTime.TryParseExact(line[..sep], LogTimeFormats, CultureInfo.InvariantCulture, DateTimeStyles.None, out var simTime)
+                && !lineHasTime)
+            {
+                _snapshot["time"] = JsonSerializer.SerializeToElement(simTime.ToString("yyyy-MM-ddTHH:mm:ss", CultureInfo.InvariantCulture));
+            }
+        }
+
+        private void Emit()
+        {
+            ProgressEvent pending;
+            lock (_inner)
+            {
+                _snapshot["elapsedMs"] = JsonSerializer.SerializeToElement(_elapsed.ElapsedMilliseconds);
+                pending = new ProgressEvent { Id = _requestId, Data = new Dictionary<string, JsonElement>(_snapshot) };
+            }
+            WriteProtocolLine(pending);
+        }
+
+        protected override void Dispose(bool disposing)
+        {
+            if (disposing)
+            {
+                _timer.Dispose();
+                Emit();
+            }
+            base.Dispose(disposing);
+        }
+    }
+
     private sealed class BacktestSessionResult
     {
         public int ExitCode { get; init; }
@@ -397,6 +678,8 @@ internal static class Program
         private Thread? _loopThread;
         private Exception? _loopException;
         private bool _started;
+        private volatile bool _abortRequested;
+        private volatile bool _backtestRunning;
 
         public SessionBacktestHost(string cliDir, Assembly cliAssembly, FieldInfo commandLineArgsField)
         {
@@ -442,10 +725,24 @@ internal static class Program
             _appLoopStartedStateValue = Enum.Parse(_stateEnumType, "ApplicationLoopStarted", ignoreCase: false);
         }
 
+        public bool IsStarted => _started;
+
+        public bool RequestAbort()
+        {
+            if (!_backtestRunning)
+            {
+                return false;
+            }
+            _abortRequested = true;
+            return true;
+        }
+
         public BacktestSessionResult ExecuteBacktest(string[] args)
         {
             lock (_sync)
             {
+                _abortRequested = false;
+                _backtestRunning = true;
                 try
                 {
                     if (!_started)
@@ -474,6 +771,10 @@ internal static class Program
                         Fatal = true,
                     };
                 }
+                finally
+                {
+                    _backtestRunning = false;
+                }
             }
         }
 
@@ -549,6 +850,18 @@ internal static class Program
 
             while (DateTime.UtcNow < deadline)
             {
+                if (_abortRequested)
+                {
+                    // The engine has no cancel hook; tearing the session down stops
+                    // the run and the next backtest boots a fresh one.
+                    return new BacktestSessionResult
+                    {
+                        ExitCode = 1,
+                        Error = "aborted_by_request",
+                        Fatal = true,
+                    };
+                }
+
                 if (_loopException is not null)
                 {
                     return new BacktestSessionResult
@@ -0,0 +1,223 @@
+"""Local stand-in coordinator for the worker's pull-based lease mode.
+
+Run it next to one or more workers:
+
+    uvicorn lease_coordinator:app --port 1113
+
+fill a queue with ``POST /queues/{name}/passes`` and start each worker run with
+``lease_url=http://<host>:1113/queues/{name}``. Leases that miss their heartbeat
+for longer than the TTL go back to the front of the queue.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+
+DEFAULT_TTL_SECONDS = 120
+REAPER_INTERVAL_SECONDS = 1.0
+
+
+class PassItem(BaseModel):
+    pass_id: int
+    parameters: dict[str, Any] = Field(default_factory=dict)
+
+
+class SubmitPassesRequest(BaseModel):
+    passes: list[PassItem]
+
+
+class AcquireRequest(BaseModel):
+    worker_id: str
+    run_id: Optional[str] = None
+    max_passes: int = Field(default=1, ge=0, le=10000)
+    ttl_seconds: Optional[int] = Field(default=None, ge=1)
+
+
+class HeartbeatRequest(BaseModel):
+    worker_id: str
+    run_id: Optional[str] = None
+    lease_ids: list[str] = Field(default_factory=list)
+    ttl_seconds: Optional[int] = Field(default=None, ge=1)
+
+
+class CompleteRequest(BaseModel):
+    worker_id: str
+    run_id: Optional[str] = None
+    lease_id: str
+    pass_id: int
+    status: str
+    result: dict[str, Any] = Field(default_factory=dict)
+
+
+class ReleaseRequest(BaseModel):
+    worker_id: str
+    run_id: Optional[str] = None
+    lease_ids: list[str] = Field(default_factory=list)
+
+
+@dataclass
+class _Lease:
+    lease_id: str
+    item: PassItem
+    worker_id: str
+    ttl_seconds: int
+    expires_at: float
+
+
+@dataclass
+class _LeaseQueue:
+    pending: deque[PassItem] = field(default_factory=deque)
+    leases: dict[str, _Lease] = field(default_factory=dict)
+    results: dict[int, dict[str, Any]] = field(default_factory=dict)
+    expired_total: int = 0
+    completed_by_worker: dict[str, int] = field(default_factory=dict)
+
+
+LOCK = threading.Lock()
+QUEUES: dict[str, _LeaseQueue] = {}
+
+app = FastAPI(title="Bravo OPTIMO Lease Coordinator (stand-in)", version="0.1.0")
+
+
+def _queue(name: str, create: bool = False) -> _LeaseQueue:
+    q = QUEUES.get(name)
+    if q is None:
+        if not create:
+            raise HTTPException(status_code=404, detail="Queue not found")
+        q = QUEUES[name] = _LeaseQueue()
+    return q
+
+
+def _expire_leases(now: float) -> int:
+    expired = 0
+    with LOCK:
+        for q in QUEUES.values():
+            for lease_id, lease in list(q.leases.items()):
+                if lease.expires_at > now:
+                    continue
+                q.leases.pop(lease_id, None)
+                q.pending.appendleft(lease.item)
+                q.expired_total += 1
+                expired += 1
+    return expired
+
+
+async def _reaper_loop() -> None:
+    while True:
+        await asyncio.sleep(REAPER_INTERVAL_SECONDS)
+        _expire_leases(time.monotonic())
+
+
+@app.on_event("startup")
+async def _start_reaper() -> None:
+    asyncio.create_task(_reaper_loop())
+
+
+@app.post("/queues/{name}/passes")
+def submit_passes(name: str, payload: SubmitPassesRequest):
+    with LOCK:
+        q = _queue(name, create=True)
+        q.pending.extend(payload.passes)
+        pending = len(q.pending)
+    return {"ok": True, "queued": len(payload.passes), "pending": pending}
+
+
+@app.post("/queues/{name}/acquire")
+def acquire(name: str, payload: AcquireRequest):
+    now = time.monotonic()
+    leases: list[dict[str, Any]] = []
+    with LOCK:
+        q = _queue(name, create=True)
+        ttl = int(payload.ttl_seconds or DEFAULT_TTL_SECONDS)
+        while q.pending and len(leases) < payload.max_passes:
+            item = q.pending.popleft()
+            lease = _Lease(
+                lease_id=uuid.uuid4().hex,
+                item=item,
+                worker_id=payload.worker_id,
+                ttl_seconds=ttl,
+                expires_at=now + ttl,
+            )
+            q.leases[lease.lease_id] = lease
+            leases.append(
+                {
+                    "lease_id": lease.lease_id,
+                    "pass_id": item.pass_id,
+                    "parameters": item.parameters,
+                    "ttl_seconds": ttl,
+                }
+            )
+        done = not q.pending and not q.leases
+    return {"leases": leases, "done": done}
+
+
+@app.post("/queues/{name}/heartbeat")
+def heartbeat(name: str, payload: HeartbeatRequest):
+    now = time.monotonic()
+    renewed: list[str] = []
+    lost: list[str] = []
+    with LOCK:
+        q = _queue(name)
+        for lease_id in payload.lease_ids:
+            lease = q.leases.get(lease_id)
+            if lease is None or lease.worker_id != payload.worker_id:
+                lost.append(lease_id)
+                continue
+            if payload.ttl_seconds:
+                lease.ttl_seconds = int(payload.ttl_seconds)
+            lease.expires_at = now + lease.ttl_seconds
+            renewed.append(lease_id)
+    return {"renewed": renewed, "lost": lost}
+
+
+@app.post("/queues/{name}/complete")
+def complete(name: str, payload: CompleteRequest):
+    with LOCK:
+        q = _queue(name)
+        lease = q.leases.pop(payload.lease_id, None)
+        # A late completion after expiry is still a valid result; keep the first one.
+        q.results.setdefault(int(payload.pass_id), {"status": payload.status, **payload.result})
+        q.completed_by_worker[payload.worker_id] = q.completed_by_worker.get(payload.worker_id, 0) + 1
+        if lease is None:
+            q.pending = deque(item for item in q.pending if item.pass_id != payload.pass_id)
+    return {"ok": True, "known_lease": lease is not None}
+
+
+@app.post("/queues/{name}/release")
+def release(name: str, payload: ReleaseRequest):
+    released = 0
+    with LOCK:
+        q = _queue(name)
+        for lease_id in payload.lease_ids:
+            lease = q.leases.pop(lease_id, None)
+            if lease is None:
+                continue
+            q.pending.appendleft(lease.item)
+            released += 1
+    return {"ok": True, "released": released}
+
+
+@app.get("/queues/{name}")
+def queue_status(name: str, include_results: int = 0):
+    with LOCK:
+        q = _queue(name)
+        out: dict[str, Any] = {
+            "pending": len(q.pending),
+            "leased": len(q.leases),
+            "completed": len(q.results),
+            "expired_total": q.expired_total,
+            "completed_by_worker": dict(q.completed_by_worker),
+        }
+        if int(include_results or 0):
+            out["results"] = [{"pass_id": pid, **res} for pid, res in sorted(q.results.items())]
+    return out
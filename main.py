@@ -1,29 +1,74 @@
 from __future__ import annotations
 
+from array import array
 import asyncio
 import base64
-from collections import deque
+import csv
+import hashlib
+import heapq
+import io
+from collections import Counter, deque
+from itertools import accumulate, chain
 import json
+import mmap
+import multiprocessing
 import os
+import re
 import shutil
+import socket
+import sqlite3
+import struct
 import subprocess
+import tarfile
 import tempfile
 import threading
 import time
 import uuid
 import zipfile
+import zlib
 import shlex
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from queue import Empty, SimpleQueue
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Literal, Optional
+from typing import IO, Any, Callable, Literal, Optional
 from urllib.parse import urlencode
 from urllib import request as urlrequest
 from urllib import error as urlerror
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
+try:
+    import fcntl
+except ImportError:  # POSIX only: locks for the shared data cache
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # optional: faster decoding of report sections
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:  # optional: worker-side risk analytics
+    np = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd artifact archives
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: parquet/arrow result exports
+    pa = None
+    pq = None
+
 
 CTRADE_BIN = os.environ.get(
     "CTRADE_CLI_PATH",
@@ -184,10 +229,93 @@ CLI_PATCHED_HOST_PATH = str(
     os.environ.get("OPTIMO_CLI_PATCHED_HOST_PATH", "/app/worker/cli_patched_host/Optimo.CliPatchedHost.dll")
 ).strip() or "/app/worker/cli_patched_host/Optimo.CliPatchedHost.dll"
 CLI_PATCHED_CLI_DIR = str(os.environ.get("CTRADE_CLI_DIR", _guess_ctrade_cli_dir(CTRADE_BIN))).strip() or "/app"
+# /compile runs the CLI inside one warm patched host instead of a fresh process
+# per attempt; the syntax that worked is kept per CLI build in this file.
+COMPILE_VIA_HOST = _bool_env("OPTIMO_WORKER_COMPILE_VIA_HOST", True)
+COMPILE_HOST_MAX_FAILURES = max(1, _int_env("OPTIMO_WORKER_COMPILE_HOST_MAX_FAILURES", 3))
+COMPILE_PROFILE_FILENAME = "_cli_compile.json"
 CALLBACK_BATCH_SIZE = max(1, _int_env("OPTIMO_WORKER_CALLBACK_BATCH_SIZE", 10))
 CALLBACK_BATCH_FLUSH_SECONDS = max(0.1, _float_env("OPTIMO_WORKER_CALLBACK_BATCH_FLUSH_SECONDS", 1.0))
 CALLBACK_POST_TIMEOUT_SECONDS = max(3, _int_env("OPTIMO_WORKER_CALLBACK_TIMEOUT_SECONDS", 10))
 SLOW_PASS_LOG_SECONDS = max(1.0, _float_env("OPTIMO_WORKER_SLOW_PASS_LOG_SECONDS", 180.0))
+# A running pass whose simulated time has not moved for this long is flagged stalled;
+# the clock starts at its first simulated time or progress, never before.
+PROGRESS_STALL_SECONDS = max(0.0, _float_env("OPTIMO_WORKER_PROGRESS_STALL_SECONDS", 600.0))
+PROGRESS_LOG_PERCENT = max(0.0, _float_env("OPTIMO_WORKER_PROGRESS_LOG_PERCENT", 25.0))
+PROGRESS_TAIL_MAX_BYTES = 4 * 1024 * 1024
+# The first pass of a run is its warm-up: the other slots wait until it shows
+# simulated time (the CLI has loaded the history by then) so they do not all
+# download the same data at once; for a cBot that logs nothing, at most this long.
+WARMUP_ENABLED = _bool_env("OPTIMO_WORKER_WARMUP", True)
+WARMUP_MAX_SECONDS = max(30, _int_env("OPTIMO_WORKER_WARMUP_MAX_SECONDS", 300))
+# Host-mounted history cache shared by the worker containers on one box. At
+# startup the CLI's own cache directory (under .NET LocalApplicationData, i.e.
+# $XDG_DATA_HOME or ~/.local/share) is replaced by a link into it; downloads
+# are serialized per symbol with file locks and recorded in a coverage index.
+SHARED_DATA_DIR = (
+    Path(str(os.environ.get("OPTIMO_WORKER_SHARED_DATA_DIR"))).expanduser().resolve()
+    if str(os.environ.get("OPTIMO_WORKER_SHARED_DATA_DIR") or "").strip()
+    else None
+)
+CLI_HISTORY_CACHE_DIR = Path(
+    str(os.environ.get("OPTIMO_WORKER_CLI_CACHE_DIR") or "").strip()
+    or Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share") / "Spotware" / "cTrader" / "BacktestingCache"
+).expanduser()
+SHARED_DATA_LOCK_TIMEOUT_SECONDS = max(1.0, _float_env("OPTIMO_WORKER_SHARED_DATA_LOCK_TIMEOUT_SECONDS", 1800.0))
+RUN_JOURNAL_ENABLED = _bool_env("OPTIMO_WORKER_RUN_JOURNAL", True)
+RUN_JOURNAL_FSYNC_SECONDS = max(0.05, _float_env("OPTIMO_WORKER_RUN_JOURNAL_FSYNC_SECONDS", 0.5))
+RUN_RESUME_ON_STARTUP = _bool_env("OPTIMO_WORKER_RESUME_ON_STARTUP", True)
+RUN_JOURNAL_FILENAME = "journal.jsonl"
+RESULTS_SPILL_FILENAME = "results.jsonl"
+# HTML reports rendered on demand for runs started with html_report=false.
+HTML_RENDER_DIRNAME = "html"
+HTML_RENDER_CONCURRENCY = max(1, _int_env("OPTIMO_WORKER_HTML_RENDER_CONCURRENCY", 1))
+RESULT_INDEX_ENABLED = _bool_env("OPTIMO_WORKER_RESULT_INDEX", True)
+RESULT_INDEX_FILENAME = "results.sqlite"
+RESULT_QUERY_MAX_LIMIT = max(1, _int_env("OPTIMO_WORKER_RESULT_QUERY_MAX_LIMIT", 10000))
+EXPORT_BATCH_ROWS = max(100, _int_env("OPTIMO_WORKER_EXPORT_BATCH_ROWS", 20000))
+WORKER_ID = (
+    str(os.environ.get("OPTIMO_WORKER_ID") or "").strip()
+    or f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+)
+LEASE_REQUEST_TIMEOUT_SECONDS = max(2, _int_env("OPTIMO_WORKER_LEASE_TIMEOUT_SECONDS", 10))
+LEASE_IDLE_POLL_SECONDS = max(0.2, _float_env("OPTIMO_WORKER_LEASE_IDLE_POLL_SECONDS", 2.0))
+# Max queued passes per run as a multiple of MAX_PARALLEL (0 disables the cap).
+MAX_QUEUE_FACTOR = max(0, _int_env("OPTIMO_WORKER_MAX_QUEUE_FACTOR", 100))
+DRAIN_RATE_WINDOW_SECONDS = max(5.0, _float_env("OPTIMO_WORKER_DRAIN_RATE_WINDOW_SECONDS", 120.0))
+ASSIGN_RETRY_AFTER_DEFAULT_SECONDS = max(1, _int_env("OPTIMO_WORKER_ASSIGN_RETRY_AFTER_SECONDS", 10))
+ASSIGN_RETRY_AFTER_MAX_SECONDS = max(1, _int_env("OPTIMO_WORKER_ASSIGN_RETRY_AFTER_MAX_SECONDS", 600))
+# report.json files at least this big are scanned section by section instead of loaded whole.
+REPORT_STREAM_MIN_BYTES = max(0, _int_env("OPTIMO_WORKER_REPORT_STREAM_MIN_BYTES", 4 * 1024 * 1024))
+# Threads for callback posts, artifact zipping and lease calls; slots get a pool of their own.
+IO_POOL_THREADS = max(2, _int_env("OPTIMO_WORKER_IO_THREADS", min(32, max(4, CPU_CORES))))
+# Child supervisor processes that run the slots (0 keeps every slot in the API process).
+SLOT_PROCESSES = max(0, _int_env("OPTIMO_WORKER_SLOT_PROCESSES", 0))
+# Disk janitor for finished run_* / compile_* directories under WORKER_ROOT
+# (0 disables a limit). New runs are refused below the critical free space.
+DISK_JANITOR_ENABLED = _bool_env("OPTIMO_WORKER_DISK_JANITOR", True)
+DISK_JANITOR_INTERVAL_SECONDS = max(10.0, _float_env("OPTIMO_WORKER_DISK_JANITOR_INTERVAL_SECONDS", 300.0))
+DISK_JANITOR_GRACE_SECONDS = max(0.0, _float_env("OPTIMO_WORKER_DISK_JANITOR_GRACE_SECONDS", 900.0))
+DISK_QUOTA_BYTES = int(max(0.0, _float_env("OPTIMO_WORKER_DISK_QUOTA_GB", 0.0)) * 1024**3)
+DISK_MIN_FREE_BYTES = int(max(0.0, _float_env("OPTIMO_WORKER_DISK_MIN_FREE_GB", 5.0)) * 1024**3)
+DISK_CRITICAL_FREE_BYTES = int(max(0.0, _float_env("OPTIMO_WORKER_DISK_CRITICAL_FREE_GB", 1.0)) * 1024**3)
+RUN_DIR_MAX_AGE_HOURS = max(0.0, _float_env("OPTIMO_WORKER_RUN_MAX_AGE_HOURS", 0.0))
+COMPILE_DIR_MAX_AGE_HOURS = max(0.0, _float_env("OPTIMO_WORKER_COMPILE_MAX_AGE_HOURS", 24.0))
+# Compiled .algo files keyed by the normalized source tree and the CLI build,
+# evicted least recently used first; the janitor leaves the directory alone.
+COMPILE_CACHE_ENABLED = _bool_env("OPTIMO_WORKER_COMPILE_CACHE", True)
+COMPILE_CACHE_DIRNAME = "_compile_cache"
+COMPILE_CACHE_MAX_ENTRIES = max(1, _int_env("OPTIMO_WORKER_COMPILE_CACHE_ENTRIES", 200))
+COMPILE_CACHE_MAX_BYTES = max(1, _int_env("OPTIMO_WORKER_COMPILE_CACHE_MB", 256)) * 1024 * 1024
+# Optional RAM scratch tier (tmpfs such as /dev/shm/optimo): passes work there
+# while it stays under the budget and kept pass directories are moved to the
+# run workdir in the background.
+SCRATCH_ROOT = (
+    Path(str(os.environ.get("OPTIMO_WORKER_SCRATCH_DIR"))).expanduser().resolve()
+    if str(os.environ.get("OPTIMO_WORKER_SCRATCH_DIR") or "").strip()
+    else None
+)
+SCRATCH_BUDGET_BYTES = max(0, _int_env("OPTIMO_WORKER_SCRATCH_BUDGET_MB", 1024)) * 1024 * 1024
 
 
 def now_utc_iso() -> str:
@@ -220,39 +348,303 @@ def write_cbotset(path: Path, params: dict[str, Any], symbol: str, period: str)
     path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
 
 
-def parse_report(report_json: Path) -> dict[str, Any] | None:
+# Headline metric -> candidate paths into report.json; the first scalar found wins.
+_HEADLINE_METRIC_PATHS: dict[str, tuple[tuple[str, ...], ...]] = {
+    "netProfit": (("main", "netProfit"), ("tradeStatistics", "netProfit")),
+    "endingEquity": (("main", "endingEquity"),),
+    "endingBalance": (("main", "endingBalance"),),
+    "profitFactor": (("tradeStatistics", "profitFactor", "all"),),
+    "totalTrades": (("tradeStatistics", "totalTrades", "all"),),
+    "winningTrades": (("tradeStatistics", "winningTrades", "all"),),
+    "losingTrades": (("tradeStatistics", "losingTrades", "all"),),
+    "maxEquityDrawdownPercent": (("equity", "maxEquityDrawdownPercent"),),
+    "maxBalanceDrawdownPercent": (("equity", "maxBalanceDrawdownPercent"),),
+    "maxEquityDrawdownAbsolute": (("equity", "maxEquityDrawdownAbsolute"),),
+    "maxBalanceDrawdownAbsolute": (("equity", "maxBalanceDrawdownAbsolute"),),
+    "averageTrade": (("tradeStatistics", "averageTrade", "all"), ("tradeStatistics", "averageTrade")),
+}
+HEADLINE_METRIC_KEYS = tuple(_HEADLINE_METRIC_PATHS)
+
+_REPORT_FULL_SECTIONS = frozenset({"main", "tradeStatistics", "equity"})
+
+
+def _dig(obj: Any, path: tuple[str, ...]) -> Any:
+    for part in path:
+        if isinstance(obj, dict):
+            obj = obj.get(part)
+        elif isinstance(obj, list) and part.isdigit() and int(part) < len(obj):
+            obj = obj[int(part)]
+        else:
+            return None
+    return obj
+
+
+def _first_metric_value(obj: Any, paths: tuple[tuple[str, ...], ...], scalar_only: bool) -> Any:
+    for path in paths:
+        value = _dig(obj, path)
+        if value is None or (scalar_only and isinstance(value, (dict, list))):
+            continue
+        return value
+    return None
+
+
+@dataclass(frozen=True)
+class MetricsExtractor:
+    # (output key, candidate paths, scalar_only), resolved once per run.
+    table: tuple[tuple[str, tuple[tuple[str, ...], ...], bool], ...]
+
+    @property
+    def sections(self) -> frozenset[str]:
+        return frozenset(path[0] for _, paths, _ in self.table for path in paths)
+
+    def __call__(self, obj: Any) -> dict[str, Any]:
+        return {key: _first_metric_value(obj, paths, scalar_only) for key, paths, scalar_only in self.table}
+
+
+def _compile_metrics_projection(fields: Optional[list[str]]) -> MetricsExtractor | None:
+    if not fields:
+        return None
+    table: list[tuple[str, tuple[tuple[str, ...], ...], bool]] = []
+    seen: set[str] = set()
+    for raw in fields:
+        name = str(raw or "").strip()
+        if name in seen:
+            continue
+        seen.add(name)
+        if name in _HEADLINE_METRIC_PATHS:
+            table.append((name, _HEADLINE_METRIC_PATHS[name], True))
+            continue
+        parts = tuple(name.split("."))
+        if not name or any(not part for part in parts):
+            raise ValueError(f"invalid metrics projection entry: {raw!r}")
+        table.append((name, (parts,), False))
+    return MetricsExtractor(table=tuple(table))
+
+
+_JSON_WS_RE = re.compile(rb"[ \t\r\n]*")
+_JSON_STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_JSON_SCALAR_RE = re.compile(rb"[^,}\]\s]*")
+# Used on escape-neutralised bytes, where a string is just quote..quote.
+_JSON_PLAIN_TOKEN_RE = re.compile(rb'"[^"]*"|[\[\]{}]')
+_JSON_KEEP_STRUCTURAL = bytes(c for c in range(256) if c not in b'"[]{}')
+_JSON_DEPTH_DELTA = [0] * 256
+for _ch in b"[{":
+    _JSON_DEPTH_DELTA[_ch] = 1
+for _ch in b"]}":
+    _JSON_DEPTH_DELTA[_ch] = -1
+_JSON_SKIP_CHUNK_BYTES = 1 << 20
+
+
+def _json_loads_bytes(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _skip_json_container(buf: Any, pos: int) -> int:
+    # Returns the offset just past the container opening at pos, without
+    # decoding it. Per chunk, escaped backslashes and quotes are blanked
+    # (same length, so offsets hold), everything but quotes and brackets is
+    # dropped, strings are removed and depth is tracked with C-level
+    # accumulate/min. Only the chunk where depth returns to zero is walked
+    # token by token.
+    n = len(buf)
+    depth = 0
+    size = _JSON_SKIP_CHUNK_BYTES
+    while pos < n:
+        end = min(n, pos + size)
+        chunk = buf[pos:end]
+        plain = chunk.replace(b"\\\\", b"__").replace(b'\\"', b"__") if b"\\" in chunk else chunk
+        if plain.count(b'"') % 2:
+            # A string runs past the chunk end: stop the chunk where it opens.
+            if end == n:
+                raise ValueError("unterminated string in report.json")
+            keep = plain.rfind(b'"')
+            if keep <= 0:
+                size *= 2
+                continue
+            chunk, plain = chunk[:keep], plain[:keep]
+        size = _JSON_SKIP_CHUNK_BYTES
+        structural = plain.translate(None, _JSON_KEEP_STRUCTURAL)
+        # Strings without brackets reduce to "" and go with one replace; a
+        # quote left over means some string holds a bracket.
+        brackets = structural.replace(b'""', b"")
+        if b'"' in brackets:
+            brackets = b"".join(structural.split(b'"')[::2])
+        if depth + min(accumulate(map(_JSON_DEPTH_DELTA.__getitem__, brackets)), default=1) > 0:
+            depth += brackets.count(b"[") + brackets.count(b"{") - brackets.count(b"]") - brackets.count(b"}")
+            pos += len(chunk)
+            continue
+        for match in _JSON_PLAIN_TOKEN_RE.finditer(plain):
+            ch = plain[match.start()]
+            if ch == 0x22:
+                continue
+            depth += _JSON_DEPTH_DELTA[ch]
+            if depth == 0:
+                return pos + match.end()
+        raise ValueError("bracket scan out of sync in report.json")
+    raise ValueError("truncated report.json")
+
+
+def _skip_json_value(buf: Any, pos: int) -> int:
+    ch = buf[pos : pos + 1]
+    if ch == b'"':
+        match = _JSON_STRING_RE.match(buf, pos)
+        if match is None:
+            raise ValueError("unterminated string in report.json")
+        return match.end()
+    if ch in (b"{", b"["):
+        return _skip_json_container(buf, pos)
+    return _JSON_SCALAR_RE.match(buf, pos).end()
+
+
+def _read_report_sections(buf: Any, wanted: frozenset[str]) -> dict[str, Any]:
+    # Walks the top-level object of report.json, decodes only the wanted
+    # sections and stops as soon as all of them are found.
+    out: dict[str, Any] = {}
+    remaining = set(wanted)
+    pos = _JSON_WS_RE.match(buf, 0).end()
+    if buf[pos : pos + 1] != b"{":
+        raise ValueError("report.json is not an object")
+    pos += 1
+    while remaining:
+        pos = _JSON_WS_RE.match(buf, pos).end()
+        ch = buf[pos : pos + 1]
+        if ch == b"}" or not ch:
+            break
+        key_match = _JSON_STRING_RE.match(buf, pos)
+        if key_match is None:
+            raise ValueError(f"expected key at offset {pos} in report.json")
+        key = json.loads(key_match.group())
+        pos = _JSON_WS_RE.match(buf, key_match.end()).end()
+        if buf[pos : pos + 1] != b":":
+            raise ValueError(f"expected ':' at offset {pos} in report.json")
+        pos = _JSON_WS_RE.match(buf, pos + 1).end()
+        value_end = _skip_json_value(buf, pos)
+        if key in remaining:
+            out[key] = _json_loads_bytes(buf[pos:value_end])
+            remaining.discard(key)
+        pos = _JSON_WS_RE.match(buf, value_end).end()
+        if buf[pos : pos + 1] == b",":
+            pos += 1
+    return out
+
+
+def _load_report_json(report_json: Path, sections: frozenset[str]) -> Any:
+    size = report_json.stat().st_size
+    if size >= REPORT_STREAM_MIN_BYTES:
+        try:
+            with report_json.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return _read_report_sections(buf, sections)
+        except Exception:
+            # Anything unexpected falls back to a full load.
+            pass
+    raw = report_json.read_bytes()
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except Exception:
+            pass
+    return json.loads(raw.decode("utf-8", errors="ignore"))
+
+
+def _series_values(raw: Any, value_keys: list[str]) -> list[float]:
+    if not isinstance(raw, list):
+        return []
+    values: list[float] = []
+    for item in raw:
+        if isinstance(item, dict):
+            item = next((item[key] for key in value_keys if item.get(key) is not None), None)
+        elif isinstance(item, (list, tuple)):
+            item = item[-1] if item else None
+        value = _as_float_or_none(item)
+        if value is not None:
+            values.append(value)
+    return values
+
+
+def _risk_analytics(obj: Any, cfg: RiskAnalyticsConfig) -> dict[str, float | None]:
+    out: dict[str, float | None] = {name: None for name in cfg.metrics}
+    equity_values: list[float] = []
+    if cfg.equity_path:
+        equity_values = _series_values(_dig(obj, tuple(cfg.equity_path.split("."))), cfg.equity_value_keys)
+    if len(equity_values) < 2 and cfg.trades_path:
+        profits = _series_values(_dig(obj, tuple(cfg.trades_path.split("."))), [cfg.trade_profit_key])
+        if profits:
+            ending = _as_float_or_none(_dig(obj, ("main", "endingBalance")))
+            start = (ending - sum(profits)) if ending is not None else 0.0
+            equity_values = [start, *(start + v for v in np.cumsum(profits).tolist())]
+    if len(equity_values) < 2:
+        return out
+
+    eq = np.asarray(equity_values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(eq) / eq[:-1]
+        returns = returns[np.isfinite(returns)]
+        peaks = np.maximum.accumulate(eq)
+        drawdown = peaks - eq
+        drawdown_pct = np.where(peaks > 0, drawdown / peaks * 100.0, 0.0)
+
+    scale = float(np.sqrt(cfg.periods_per_year)) if cfg.periods_per_year else 1.0
+    rf = cfg.risk_free_rate / cfg.periods_per_year if cfg.periods_per_year else cfg.risk_free_rate
+    excess = returns - rf
+
+    def _finite(value: Any) -> float | None:
+        value = float(value)
+        return value if np.isfinite(value) else None
+
+    if "sharpeRatio" in out and excess.size > 1:
+        std = excess.std(ddof=1)
+        out["sharpeRatio"] = _finite(excess.mean() / std * scale) if std > 0 else None
+    if "sortinoRatio" in out and excess.size > 1:
+        downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2))
+        out["sortinoRatio"] = _finite(excess.mean() / downside * scale) if downside > 0 else None
+    if "ulcerIndex" in out:
+        out["ulcerIndex"] = _finite(np.sqrt(np.mean(drawdown_pct**2)))
+    if "recoveryFactor" in out:
+        max_dd = float(drawdown.max())
+        out["recoveryFactor"] = _finite((eq[-1] - eq[0]) / max_dd) if max_dd > 0 else None
+    if "equityR2" in out and eq.size > 2:
+        x = np.arange(eq.size, dtype=np.float64)
+        corr = np.corrcoef(x, eq)[0, 1]
+        out["equityR2"] = _finite(corr * corr)
+    return out
+
+
+def parse_report(
+    report_json: Path,
+    extractor: MetricsExtractor | None = None,
+    analytics: RiskAnalyticsConfig | None = None,
+    timings: dict[str, float] | None = None,
+) -> dict[str, Any] | None:
     if not report_json.exists() or report_json.stat().st_size == 0:
         return None
+    sections = extractor.sections if extractor is not None else _REPORT_FULL_SECTIONS
+    if analytics is not None:
+        sections = sections | analytics.sections
     try:
-        obj = json.loads(report_json.read_text(encoding="utf-8", errors="ignore"))
+        obj = _load_report_json(report_json, sections)
     except Exception:
         return None
 
-    main = obj.get("main", {}) if isinstance(obj, dict) else {}
-    trade = obj.get("tradeStatistics", {}) if isinstance(obj, dict) else {}
-    equity = obj.get("equity", {}) if isinstance(obj, dict) else {}
-    pf = trade.get("profitFactor") or {}
-    total_trades = trade.get("totalTrades") or {}
-    winning_trades = trade.get("winningTrades") or {}
-    losing_trades = trade.get("losingTrades") or {}
-    avg_trade = trade.get("averageTrade") or {}
-    return {
-        "main": main,
-        "trade": trade,
-        "equity": equity,
-        "netProfit": main.get("netProfit") if main.get("netProfit") is not None else trade.get("netProfit"),
-        "endingEquity": main.get("endingEquity"),
-        "endingBalance": main.get("endingBalance"),
-        "profitFactor": pf.get("all"),
-        "totalTrades": total_trades.get("all"),
-        "winningTrades": winning_trades.get("all"),
-        "losingTrades": losing_trades.get("all"),
-        "maxEquityDrawdownPercent": equity.get("maxEquityDrawdownPercent"),
-        "maxBalanceDrawdownPercent": equity.get("maxBalanceDrawdownPercent"),
-        "maxEquityDrawdownAbsolute": equity.get("maxEquityDrawdownAbsolute"),
-        "maxBalanceDrawdownAbsolute": equity.get("maxBalanceDrawdownAbsolute"),
-        "averageTrade": avg_trade.get("all") if isinstance(avg_trade, dict) else avg_trade,
-    }
+    if extractor is not None:
+        out = extractor(obj)
+    else:
+        main = obj.get("main", {}) if isinstance(obj, dict) else {}
+        trade = obj.get("tradeStatistics", {}) if isinstance(obj, dict) else {}
+        equity = obj.get("equity", {}) if isinstance(obj, dict) else {}
+        out = {"main": main, "trade": trade, "equity": equity}
+        for key, paths in _HEADLINE_METRIC_PATHS.items():
+            out[key] = _first_metric_value(obj, paths, True)
+    if analytics is not None and np is not None:
+        analytics_started_perf = time.perf_counter()
+        try:
+            out.update(_risk_analytics(obj, analytics))
+        except Exception:
+            out.update({name: None for name in analytics.metrics})
+        if timings is not None:
+            timings["analytics_seconds"] = round(max(0.0, time.perf_counter() - analytics_started_perf), 3)
+    return out
 
 
 def _extract_json_from_output(text: str) -> str:
@@ -353,23 +745,180 @@ def _run_ctrader_info_json(
             pass
 
 
-def zip_dir_to_b64(dir_path: Path) -> str:
-    tmp_zip = dir_path.with_suffix(".zip")
-    if tmp_zip.exists():
-        tmp_zip.unlink()
-    with zipfile.ZipFile(tmp_zip, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+# Artifact packaging. "stored" and "deflate:<level>" produce standard zip
+# archives whose members are compressed in parallel on PACK_POOL (zlib drops
+# the GIL) and assembled by _write_zip; "zstd:<level>" produces a .tar.zst
+# with zstandard's own worker threads, when that module is installed.
+@dataclass(frozen=True)
+class _ArtifactCodec:
+    name: Literal["stored", "deflate", "zstd"]
+    level: int = 0
+
+    @property
+    def label(self) -> str:
+        return self.name if self.name == "stored" else f"{self.name}:{self.level}"
+
+    @property
+    def extension(self) -> str:
+        return "tar.zst" if self.name == "zstd" else "zip"
+
+
+def _parse_artifact_codec(spec: Optional[str]) -> _ArtifactCodec:
+    raw = str(spec or "").strip().lower()
+    name, _, level_raw = raw.partition(":")
+    try:
+        level = int(level_raw) if level_raw else None
+    except ValueError:
+        raise ValueError(f"invalid artifact codec level: {spec!r}")
+    if name in ("stored", "store"):
+        return _ArtifactCodec("stored")
+    if name in ("deflate", "zip"):
+        # "zip" is how artifacts were always packed before codecs: deflate.
+        level = 6 if level is None else level
+        if not 0 <= level <= 9:
+            raise ValueError("deflate level must be between 0 and 9")
+        return _ArtifactCodec("deflate", level)
+    if name == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd artifacts require the zstandard package on the worker")
+        level = 3 if level is None else level
+        if not 1 <= level <= 22:
+            raise ValueError("zstd level must be between 1 and 22")
+        return _ArtifactCodec("zstd", level)
+    raise ValueError(f"unknown artifact codec: {spec!r} (stored, deflate[:level], zstd[:level])")
+
+
+# Reported at startup, once logging is up, when the configured codec is unusable.
+ARTIFACTS_CODEC_ERROR: str | None = None
+try:
+    ARTIFACTS_CODEC = _parse_artifact_codec(os.environ.get("OPTIMO_WORKER_ARTIFACTS_CODEC") or "deflate:6")
+except ValueError as _codec_exc:
+    ARTIFACTS_CODEC_ERROR = str(_codec_exc)
+    ARTIFACTS_CODEC = _ArtifactCodec("deflate", 6)
+ARTIFACT_PACK_THREADS = max(1, _int_env("OPTIMO_WORKER_ARTIFACT_PACK_THREADS", min(8, CPU_CORES)))
+_PACK_POOL: ThreadPoolExecutor | None = None
+_PACK_POOL_LOCK = threading.Lock()
+
+
+def _pack_pool() -> ThreadPoolExecutor:
+    global _PACK_POOL
+    with _PACK_POOL_LOCK:
+        if _PACK_POOL is None:
+            _PACK_POOL = ThreadPoolExecutor(max_workers=ARTIFACT_PACK_THREADS, thread_name_prefix="optimo-pack")
+        return _PACK_POOL
+
+
+def _zip_member(path: Path, level: int) -> tuple[bytes, int, int, int, float] | None:
+    try:
+        data = path.read_bytes()
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        # Evicted by artifact retention or moved out of scratch meanwhile.
+        return None
+    crc = zlib.crc32(data)
+    if level > 0:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        packed = compressor.compress(data) + compressor.flush()
+        if len(packed) < len(data):
+            return packed, crc, len(data), zipfile.ZIP_DEFLATED, mtime
+    return data, crc, len(data), zipfile.ZIP_STORED, mtime
+
+
+def _write_zip(out: io.BytesIO, members: Any) -> int:
+    central: list[bytes] = []
+    for arcname, member in members:
+        if member is None:
+            continue
+        payload, crc, size, method, mtime = member
+        if size >= 0xFFFFFFFF or out.tell() >= 0xFFFFFFFF:
+            raise OverflowError("artifact too large for a zip32 archive")
+        name = arcname.encode("utf-8")
+        t = time.localtime(mtime)
+        dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+        dos_date = (max(0, t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+        offset = out.tell()
+        out.write(
+            struct.pack("<IHHHHHIIIHH", 0x04034B50, 20, 0x800, method, dos_time, dos_date, crc, len(payload), size, len(name), 0)
+        )
+        out.write(name)
+        out.write(payload)
+        central.append(
+            struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                0x02014B50, 20, 20, 0x800, method, dos_time, dos_date, crc, len(payload), size,
+                len(name), 0, 0, 0, 0, 0o100644 << 16, offset,
+            )
+            + name
+        )
+    directory_offset = out.tell()
+    for entry in central:
+        out.write(entry)
+    out.write(
+        struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(central), len(central), out.tell() - directory_offset, directory_offset, 0)
+    )
+    return len(central)
+
+
+def _pack_artifacts(entries: list[tuple[str, Path]], codec: _ArtifactCodec | None = None) -> tuple[bytes, int]:
+    # -> (archive bytes, members written)
+    codec = codec or ARTIFACTS_CODEC
+    out = io.BytesIO()
+    if codec.name == "zstd":
+        compressor = zstandard.ZstdCompressor(level=codec.level, threads=-1)
+        written = 0
+        with compressor.stream_writer(out, closefd=False) as writer:
+            with tarfile.open(fileobj=writer, mode="w|") as tar:
+                for arcname, path in entries:
+                    try:
+                        tar.add(str(path), arcname=arcname, recursive=False)
+                        written += 1
+                    except FileNotFoundError:
+                        continue
+        return out.getvalue(), written
+    level = codec.level if codec.name == "deflate" else 0
+    if len(entries) > 1 and ARTIFACT_PACK_THREADS > 1:
+        members = _pack_pool().map(lambda entry: _zip_member(entry[1], level), entries)
+    else:
+        members = (_zip_member(path, level) for _, path in entries)
+    try:
+        written = _write_zip(out, zip((arcname for arcname, _ in entries), members))
+    except OverflowError:
+        out = io.BytesIO()
+        written = 0
+        method = zipfile.ZIP_DEFLATED if level else zipfile.ZIP_STORED
+        with zipfile.ZipFile(out, "w", compression=method, compresslevel=level or None, allowZip64=True) as zf:
+            for arcname, path in entries:
+                try:
+                    zf.write(path, arcname=arcname)
+                    written += 1
+                except FileNotFoundError:
+                    continue
+    return out.getvalue(), written
+
+
+def _artifact_entries(dir_path: Path, prefix: str = "") -> list[tuple[str, Path]]:
+    entries: list[tuple[str, Path]] = []
+    try:
         for child in dir_path.rglob("*"):
             if child.is_file():
-                zf.write(child, arcname=child.relative_to(dir_path))
-    data = tmp_zip.read_bytes()
-    try:
-        tmp_zip.unlink()
-    except Exception:
+                entries.append((f"{prefix}{child.relative_to(dir_path).as_posix()}", child))
+    except FileNotFoundError:
+        # Moved out of the scratch tier or evicted mid-walk.
         pass
+    return entries
+
+
+def zip_dir_to_b64(dir_path: Path, codec: _ArtifactCodec | None = None) -> str:
+    data, _ = _pack_artifacts(_artifact_entries(dir_path), codec)
     return base64.b64encode(data).decode("ascii")
 
 
-def zip_pass_dirs_to_b64(run_dir: Path, pass_ids: list[int]) -> str | None:
+def zip_pass_dirs_to_b64(
+    run_dir: Path,
+    pass_ids: list[int],
+    scratch_dir: Path | None = None,
+    codec: _ArtifactCodec | None = None,
+) -> str | None:
     unique_ids: list[int] = []
     seen: set[int] = set()
     for raw in pass_ids:
@@ -381,29 +930,17 @@ def zip_pass_dirs_to_b64(run_dir: Path, pass_ids: list[int]) -> str | None:
     if not unique_ids:
         return None
 
-    tmp_zip = run_dir / f".callback_batch_{uuid.uuid4().hex}.zip"
-    files_written = 0
-    try:
-        with zipfile.ZipFile(tmp_zip, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for pass_id in unique_ids:
-                pass_dir = run_dir / str(pass_id)
-                if not pass_dir.exists():
-                    continue
-                for child in pass_dir.rglob("*"):
-                    if not child.is_file():
-                        continue
-                    rel = child.relative_to(pass_dir)
-                    zf.write(child, arcname=str(Path(str(pass_id)) / rel))
-                    files_written += 1
-        if files_written <= 0:
-            return None
-        data = tmp_zip.read_bytes()
-        return base64.b64encode(data).decode("ascii")
-    finally:
-        try:
-            tmp_zip.unlink()
-        except Exception:
-            pass
+    entries: list[tuple[str, Path]] = []
+    for pass_id in unique_ids:
+        pass_dir = run_dir / str(pass_id)
+        if not pass_dir.exists() and scratch_dir is not None:
+            pass_dir = scratch_dir / str(pass_id)
+        if pass_dir.exists():
+            entries.extend(_artifact_entries(pass_dir, f"{pass_id}/"))
+    data, written = _pack_artifacts(entries, codec)
+    if written <= 0:
+        return None
+    return base64.b64encode(data).decode("ascii")
 
 
 def post_json(url: str, payload: dict[str, Any], timeout: int = 10) -> tuple[bool, str | None]:
@@ -427,164 +964,1272 @@ def post_json(url: str, payload: dict[str, Any], timeout: int = 10) -> tuple[boo
         return False, str(exc)
 
 
-def _detect_public_ip(timeout: int = 5) -> str | None:
-    for u in ("https://api.ipify.org", "https://ifconfig.me/ip"):
-        try:
-            with urlrequest.urlopen(u, timeout=timeout) as resp:
-                ip = resp.read().decode("utf-8", errors="ignore").strip()
-            if ip:
-                return ip
-        except Exception:
-            continue
-    return None
-
-
-def _telegram_send_message(token: str, chat_id: str, text: str, timeout: int = 10) -> None:
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    data = urlencode({"chat_id": chat_id, "text": text}).encode("utf-8")
-    req = urlrequest.Request(url, data=data, method="POST")
-    with urlrequest.urlopen(req, timeout=timeout) as resp:
-        _ = resp.read()
+# Append-only JSON-lines file. Appends are flushed to the OS right away (survive a
+# process kill); fsync runs in the background at most every fsync_seconds, so
+# writers never wait on the disk.
+class _AppendOnlyJsonl:
+    def __init__(self, path: Path, fsync_seconds: float = RUN_JOURNAL_FSYNC_SECONDS):
+        self.path = path
+        self._fsync_seconds = max(0.01, float(fsync_seconds))
+        self._lock = threading.Lock()
+        self._fsync_lock = threading.Lock()
+        self._fh = path.open("ab")
+        self._dirty = False
+        self._closed = False
+        self._fsync_thread = threading.Thread(target=self._fsync_loop, daemon=True)
+        self._fsync_thread.start()
 
+    def append(self, record: dict[str, Any]) -> int:
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        with self._lock:
+            if self._closed:
+                return -1
+            offset = self._fh.tell()
+            self._fh.write(line)
+            self._fh.flush()
+            self._dirty = True
+        return offset
+
+    def _fsync_loop(self) -> None:
+        while True:
+            time.sleep(self._fsync_seconds)
+            with self._fsync_lock:
+                with self._lock:
+                    if self._closed:
+                        return
+                    if not self._dirty:
+                        continue
+                    self._dirty = False
+                    fd = self._fh.fileno()
+                try:
+                    os.fsync(fd)
+                except Exception:
+                    pass
 
-def run_backtest(
-    algo_path: Path,
-    cbotset_path: Path,
-    start: str,
-    end: str,
-    data_mode: Literal["ticks", "m1"],
-    ctid: str,
-    pwd_file: Path,
-    account: str,
-    symbol: str,
-    period: str,
-    report_html: Path,
-    report_json: Path,
-    log_path: Path,
-    timeout_seconds: int,
-    balance: float | None,
-    stop_requested: Optional[Callable[[], bool]] = None,
-    on_proc_start: Optional[Callable[[subprocess.Popen], None]] = None,
-    on_proc_end: Optional[Callable[[int], None]] = None,
-) -> bool:
-    cmd_prefix = _resolve_ctrade_cmd_prefix()
-    cmd = [
-        *cmd_prefix,
-        "backtest",
-        str(algo_path),
-        str(cbotset_path),
-        f"--start={start}",
-        f"--end={end}",
-        f"--data-mode={data_mode}",
-        f"--ctid={ctid}",
-        f"--pwd-file={str(pwd_file)}",
-        f"--account={account}",
-        f"--symbol={symbol}",
-        f"--period={period}",
-        f"--report={str(report_html)}",
-        f"--report-json={str(report_json)}",
-    ]
-    if balance is not None:
-        cmd.append(f"--balance={balance}")
+    def close(self) -> None:
+        with self._fsync_lock:
+            with self._lock:
+                if self._closed:
+                    return
+                self._closed = True
+                try:
+                    self._fh.flush()
+                    os.fsync(self._fh.fileno())
+                except Exception:
+                    pass
+                try:
+                    self._fh.close()
+                except Exception:
+                    pass
 
-    def reports_ready() -> bool:
-        return (
-            report_html.exists()
-            and report_json.exists()
-            and report_html.stat().st_size > 0
-            and report_json.stat().st_size > 0
-        )
+    @staticmethod
+    def iter_records(path: Path):
+        for _, record in _AppendOnlyJsonl.iter_offsets(path):
+            yield record
 
-    with log_path.open("w", encoding="utf-8") as logf:
-        logf.write(f"[started_at_utc] {now_utc_iso()}\n")
-        logf.write(f"[command] {' '.join(cmd)}\n\n")
-        logf.flush()
-        proc = subprocess.Popen(cmd, stdout=logf, stderr=subprocess.STDOUT, text=True)
-        if on_proc_start:
-            try:
-                on_proc_start(proc)
-            except Exception:
-                pass
+    @staticmethod
+    def iter_offsets(path: Path):
+        if not path.exists():
+            return
+        with path.open("rb") as fh:
+            offset = 0
+            for raw in fh:
+                start, offset = offset, offset + len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    record = _json_loads_bytes(line)
+                except Exception:
+                    # A torn tail line from a crash mid-write is expected; skip it.
+                    continue
+                if isinstance(record, dict):
+                    yield start, record
+
+
+_RESULT_STATUS_CODES = {"Completed": 0, "Failed": 1, "Skipped": 2}
+_RESULT_CANCELLED_CODE = 3
+
+
+# Per-run result store. Only the pass id, status, elapsed time and the headline
+# metrics stay in memory, as parallel arrays (NaN for missing); the full
+# PassResult (nested metric dicts, log tails) is spilled to results.jsonl and
+# read back by offset when /results asks for it.
+class _ResultStore:
+    def __init__(self, spill_path: Path | None):
+        self.spill_path = spill_path
+        self.pass_ids = array("q")
+        self.status = bytearray()
+        self.elapsed = array("d")
+        self.offsets = array("q")
+        self.columns: dict[str, array] = {key: array("d") for key in HEADLINE_METRIC_KEYS}
+        self._index: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._spill: _AppendOnlyJsonl | None = None
+        # Rows whose spill write failed stay here in full.
+        self._unspilled: dict[int, "PassResult"] = {}
+
+    def __len__(self) -> int:
+        return len(self.pass_ids)
+
+    def _add_row(self, pass_id: int, status: int, elapsed: Any, metrics: dict[str, Any], offset: int) -> int:
+        row = len(self.pass_ids)
+        self.pass_ids.append(int(pass_id))
+        self.status.append(status)
+        value = _as_float_or_none(elapsed)
+        self.elapsed.append(float("nan") if value is None else value)
+        self.offsets.append(int(offset))
+        for key, column in self.columns.items():
+            value = _as_float_or_none(metrics.get(key))
+            column.append(float("nan") if value is None else value)
+        self._index[int(pass_id)] = row
+        return row
+
+    @staticmethod
+    def _status_code(status: str, outcome: Optional[str]) -> int:
+        if outcome == "cancelled":
+            return _RESULT_CANCELLED_CODE
+        return _RESULT_STATUS_CODES.get(str(status), 1)
+
+    def append(self, result: "PassResult", parameters: dict[str, Any] | None = None) -> int:
+        record = result.model_dump(exclude={"artifacts_zip_b64", "artifacts_codec"})
+        if parameters is not None:
+            # Not part of PassResult; kept in the spill for exports.
+            record["parameters"] = parameters
+        with self._lock:
+            offset = -1
+            if self.spill_path is not None:
+                try:
+                    if self._spill is None:
+                        self._spill = _AppendOnlyJsonl(self.spill_path)
+                    offset = self._spill.append(record)
+                except Exception:
+                    offset = -1
+            row = self._add_row(
+                result.pass_id,
+                self._status_code(result.status, result.outcome),
+                result.elapsed_seconds_total,
+                result.metrics or {},
+                offset,
+            )
+            if offset < 0:
+                self._unspilled[row] = result.model_copy(update={"artifacts_zip_b64": None})
+        return row
+
+    def load(self) -> int:
+        # Rebuilds the in-memory columns from an existing spill file (resume).
+        if self.spill_path is None:
+            return 0
+        loaded = 0
+        with self._lock:
+            for offset, record in _AppendOnlyJsonl.iter_offsets(self.spill_path):
+                try:
+                    self._add_row(
+                        int(record["pass_id"]),
+                        self._status_code(record.get("status") or "", record.get("outcome")),
+                        record.get("elapsed_seconds_total"),
+                        record.get("metrics") or {},
+                        offset,
+                    )
+                    loaded += 1
+                except Exception:
+                    continue
+        return loaded
 
-        start_ts = time.time()
-        success = False
-        outcome = "unknown"
+    def row_of(self, pass_id: int) -> int | None:
+        with self._lock:
+            return self._index.get(int(pass_id))
+
+    def is_cancelled(self, row: int) -> bool:
+        return self.status[row] == _RESULT_CANCELLED_CODE
+
+    def headline(self, row: int) -> dict[str, float]:
+        out: dict[str, float] = {}
+        for key, column in self.columns.items():
+            value = column[row]
+            if value == value:
+                out[key] = value
+        return out
+
+    def read(self, rows: list[int]) -> list["PassResult"]:
+        out: list[PassResult] = []
+        fh = None
         try:
-            while True:
-                if stop_requested and stop_requested():
-                    try:
-                        proc.terminate()
-                        proc.wait(timeout=3)
-                    except Exception:
-                        try:
-                            proc.kill()
-                            proc.wait(timeout=1)
-                        except Exception:
-                            pass
-                    outcome = "stopped_by_request"
-                    break
-                if reports_ready():
-                    if proc.poll() is None:
-                        try:
-                            proc.wait(timeout=2)
-                        except Exception:
-                            try:
-                                proc.terminate()
-                                proc.wait(timeout=2)
-                            except Exception:
-                                try:
-                                    proc.kill()
-                                    proc.wait(timeout=1)
-                                except Exception:
-                                    pass
-                    success = True
-                    outcome = "reports_ready"
-                    break
-                if proc.poll() is not None:
-                    outcome = f"process_exited_rc_{proc.returncode}"
-                    break
-                if timeout_seconds and (time.time() - start_ts) >= timeout_seconds:
-                    try:
-                        proc.terminate()
-                        proc.wait(timeout=3)
-                    except Exception:
-                        try:
-                            proc.kill()
-                            proc.wait(timeout=1)
-                        except Exception:
-                            pass
-                    outcome = "timeout"
-                    break
-                time.sleep(1)
+            for row in rows:
+                kept = self._unspilled.get(row)
+                if kept is not None:
+                    out.append(kept)
+                    continue
+                if fh is None:
+                    fh = self.spill_path.open("rb")  # type: ignore[union-attr]
+                fh.seek(self.offsets[row])
+                out.append(PassResult.model_validate_json(fh.readline()))
         finally:
-            if on_proc_end:
+            if fh is not None:
+                fh.close()
+        return out
+
+    def get(self, row: int) -> "PassResult":
+        return self.read([row])[0]
+
+    def parameters(self, pass_ids: list[int]) -> dict[int, dict[str, Any]]:
+        # Parameters as assigned, for passes spilled with them (re-runs, exports).
+        out: dict[int, dict[str, Any]] = {}
+        if self.spill_path is None or not self.spill_path.exists():
+            return out
+        with self._lock:
+            offsets = {pid: self.offsets[row] for pid in pass_ids if (row := self._index.get(int(pid))) is not None}
+        with self.spill_path.open("rb") as fh:
+            for pid, offset in offsets.items():
+                if offset < 0:
+                    continue
+                fh.seek(offset)
                 try:
-                    on_proc_end(int(proc.pid))
+                    params = _json_loads_bytes(fh.readline()).get("parameters")
                 except Exception:
-                    pass
-            elapsed_total = round(max(0.0, time.time() - start_ts), 3)
-            logf.write(f"\n[finished_at_utc] {now_utc_iso()}\n")
-            logf.write(f"[elapsed_seconds_total] {elapsed_total}\n")
-            logf.write(f"[outcome] {outcome}\n")
-            logf.flush()
+                    continue
+                if isinstance(params, dict):
+                    out[int(pid)] = params
+        return out
 
-    return success or reports_ready()
+    def tail(self, limit: int) -> list["PassResult"]:
+        total = len(self)
+        return self.read(list(range(max(0, total - max(0, int(limit))), total)))
 
+    def close(self) -> None:
+        with self._lock:
+            spill, self._spill = self._spill, None
+        if spill is not None:
+            spill.close()
 
-class _PatchedCliClient:
-    def __init__(
-        self,
-        slot_index: int,
-        on_proc_start: Optional[Callable[[subprocess.Popen[str]], None]] = None,
-        on_proc_end: Optional[Callable[[int], None]] = None,
-    ):
-        self.slot_index = int(slot_index)
+
+_QUERY_FILTER_RE = re.compile(r"^\s*([A-Za-z_][\w.\-]*)\s*(<=|>=|!=|==|=|<|>)\s*(.*?)\s*$")
+_QUERY_NAME_RE = re.compile(r"^[A-Za-z_][\w\-]*$")
+_QUERY_BASE_FIELDS = {"pass_id": "pass_id", "elapsed_seconds_total": "elapsed"}
+
+
+def _index_metric_values(metrics: dict[str, Any]) -> dict[str, float]:
+    return {
+        str(key): float(value)
+        for key, value in metrics.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+    }
+
+
+# Per-run SQLite index of the results for server-side filtering and top-N.
+# Every scalar numeric metric gets an indexed REAL column (m0, m1, ... mapped
+# by name in metric_columns); parameters are kept as JSON. One writer thread
+# owns the write connection and batches whatever has queued up; queries open
+# their own read-only connection, which WAL lets run next to the writer.
+class _ResultIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS passes ("
+                "pass_id INTEGER PRIMARY KEY, status TEXT NOT NULL, outcome TEXT,"
+                " elapsed REAL, finished_at TEXT, parameters TEXT);"
+                "CREATE TABLE IF NOT EXISTS metric_columns (name TEXT PRIMARY KEY, col TEXT NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS ix_passes_status ON passes(status);"
+            )
+            self._columns: dict[str, str] = dict(conn.execute("SELECT name, col FROM metric_columns"))
+        finally:
+            conn.close()
+        self._queue: SimpleQueue = SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name="optimo-result-index", daemon=True)
+        self._thread.start()
+
+    def add(self, result: "PassResult", parameters: dict[str, Any] | None = None) -> None:
+        if self._closed:
+            return
+        self._queue.put(
+            (
+                int(result.pass_id),
+                result.status,
+                result.outcome,
+                result.elapsed_seconds_total,
+                result.finished_at_utc,
+                parameters,
+                _index_metric_values(result.metrics or {}),
+            )
+        )
+
+    def backfill(self, spill_path: Path, parameters: dict[int, dict[str, Any]]) -> None:
+        # Resume: index whatever the spill file holds that never reached the database.
+        if not self._closed:
+            self._queue.put(("backfill", spill_path, parameters))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+
+    def _write_loop(self) -> None:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            while True:
+                rows: list[tuple] = []
+                item = self._queue.get()
+                while True:
+                    if item is None:
+                        self._flush(conn, rows)
+                        conn.execute("PRAGMA optimize")
+                        return
+                    if item[0] == "backfill":
+                        self._flush(conn, rows)
+                        rows = []
+                        self._backfill(conn, item[1], item[2])
+                    else:
+                        rows.append(item)
+                    if len(rows) >= 2000:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except Empty:
+                        break
+                self._flush(conn, rows)
+        finally:
+            conn.close()
+
+    def _flush(self, conn: sqlite3.Connection, rows: list[tuple]) -> None:
+        if not rows:
+            return
+        try:
+            # sqlite3 opens transactions only for DML; ALTER TABLE would commit on
+            # its own and outlive a rollback that drops its metric_columns row.
+            conn.execute("BEGIN")
+            for row in rows:
+                for name in row[6]:
+                    if name not in self._columns:
+                        col = f"m{len(self._columns)}"
+                        conn.execute(f"ALTER TABLE passes ADD COLUMN {col} REAL")
+                        conn.execute(f"CREATE INDEX ix_passes_{col} ON passes({col})")
+                        conn.execute("INSERT INTO metric_columns (name, col) VALUES (?, ?)", (name, col))
+                        self._columns[name] = col
+            names = list(self._columns)
+            cols = ", ".join(["pass_id", "status", "outcome", "elapsed", "finished_at", "parameters"] + [self._columns[n] for n in names])
+            marks = ", ".join("?" * (6 + len(names)))
+            conn.executemany(
+                f"INSERT OR REPLACE INTO passes ({cols}) VALUES ({marks})",
+                [
+                    (
+                        pid,
+                        status,
+                        outcome,
+                        _as_float_or_none(elapsed),
+                        finished_at,
+                        json.dumps(params, ensure_ascii=False, default=str) if params is not None else None,
+                        *[metrics.get(n) for n in names],
+                    )
+                    for pid, status, outcome, elapsed, finished_at, params, metrics in rows
+                ],
+            )
+            conn.commit()
+        except Exception as exc:
+            conn.rollback()
+            self._columns = dict(conn.execute("SELECT name, col FROM metric_columns"))
+            _log_event(
+                "ERROR",
+                f"result index write failed for {self.path.parent.name}: {exc}",
+                kind="run",
+                extra={"run_id": self.path.parent.name, "phase": "result_index_error", "rows": len(rows), "error": str(exc)},
+            )
+
+    def _backfill(self, conn: sqlite3.Connection, spill_path: Path, parameters: dict[int, dict[str, Any]]) -> None:
+        indexed = {pid: (status, outcome) for pid, status, outcome in conn.execute("SELECT pass_id, status, outcome FROM passes")}
+        # Last spill record per pass wins, as it does for the live index.
+        latest: dict[int, dict[str, Any]] = {}
+        for _, record in _AppendOnlyJsonl.iter_offsets(spill_path):
+            try:
+                latest[int(record["pass_id"])] = record
+            except Exception:
+                continue
+        rows: list[tuple] = []
+        for pid, record in latest.items():
+            if indexed.get(pid) == (record.get("status"), record.get("outcome")):
+                continue
+            rows.append(
+                (
+                    pid,
+                    str(record.get("status") or "Failed"),
+                    record.get("outcome"),
+                    record.get("elapsed_seconds_total"),
+                    record.get("finished_at_utc"),
+                    parameters.get(pid),
+                    _index_metric_values(record.get("metrics") or {}),
+                )
+            )
+            if len(rows) >= 5000:
+                self._flush(conn, rows)
+                rows = []
+        self._flush(conn, rows)
+
+    def query(
+        self,
+        filters: list[str],
+        order_by: str | None = None,
+        descending: bool = True,
+        limit: int = 100,
+        offset: int = 0,
+        status: str | None = None,
+        count: bool = False,
+    ) -> dict[str, Any]:
+        if not self.path.exists():
+            return {"items": [], "matched": 0 if count else None}
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            columns = dict(conn.execute("SELECT name, col FROM metric_columns"))
+            binds: list[Any] = []
+
+            def _field(name: str) -> tuple[str, bool]:
+                # -> (SQL expression, numeric); unknown metrics behave as all-NULL columns.
+                if name in _QUERY_BASE_FIELDS:
+                    return _QUERY_BASE_FIELDS[name], True
+                if name.startswith(("param.", "parameters.")):
+                    key = name.split(".", 1)[1]
+                    if not _QUERY_NAME_RE.match(key):
+                        raise ValueError(f"invalid parameter name: {key!r}")
+                    return f"json_extract(parameters, '$.\"{key}\"')", False
+                if name in columns:
+                    return columns[name], True
+                if not _QUERY_NAME_RE.match(name):
+                    raise ValueError(f"invalid field: {name!r}")
+                return "NULL", True
+
+            clauses: list[str] = []
+            if status:
+                clauses.append("status = ?")
+                binds.append(str(status))
+            for raw in filters:
+                match = _QUERY_FILTER_RE.match(raw or "")
+                if not match:
+                    raise ValueError(f"invalid filter: {raw!r} (expected <field><op><value>)")
+                name, op, value_raw = match.groups()
+                expr, numeric = _field(name)
+                value: Any = value_raw.strip("'\"")
+                try:
+                    value = float(value)
+                except ValueError:
+                    if numeric:
+                        raise ValueError(f"filter value for {name!r} must be a number: {value_raw!r}")
+                clauses.append(f"{expr} {'=' if op == '==' else op} ?")
+                binds.append(value)
+            order_expr, _ = _field(order_by or "pass_id")
+            if order_expr != "pass_id":
+                clauses.append(f"{order_expr} IS NOT NULL")
+            where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+            direction = "DESC" if descending else "ASC"
+
+            names = list(columns)
+            select_cols = ", ".join(["pass_id", "status", "outcome", "elapsed", "parameters"] + [columns[n] for n in names])
+            cursor = conn.execute(
+                f"SELECT {select_cols} FROM passes{where_sql} ORDER BY {order_expr} {direction}, pass_id LIMIT ? OFFSET ?",
+                [*binds, int(limit), int(offset)],
+            )
+            items: list[dict[str, Any]] = []
+            for row in cursor:
+                items.append(
+                    {
+                        "pass_id": row[0],
+                        "status": row[1],
+                        "outcome": row[2],
+                        "elapsed_seconds_total": row[3],
+                        "parameters": json.loads(row[4]) if row[4] else None,
+                        "metrics": {n: v for n, v in zip(names, row[5:]) if v is not None},
+                    }
+                )
+            matched = None
+            if count:
+                matched = conn.execute(f"SELECT COUNT(*) FROM passes{where_sql}", binds).fetchone()[0]
+            return {"items": items, "matched": matched}
+        finally:
+            conn.close()
+
+
+_EXPORT_BASE_COLUMNS = (
+    "pass_id",
+    "status",
+    "outcome",
+    "error",
+    "early_stopped",
+    "elapsed_seconds_total",
+    "started_at_utc",
+    "finished_at_utc",
+)
+_EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+
+_EXPORT_TYPE_KINDS = {type(None): "null", bool: "bool", int: "int", float: "float", str: "str"}
+
+
+def _merge_export_kinds(kinds: dict[str, str], values: dict[str, Any]) -> None:
+    for key, value in values.items():
+        kind = _EXPORT_TYPE_KINDS.get(type(value), "json")
+        current = kinds.get(key)
+        if current == kind or kind == "null":
+            if current is None:
+                kinds[key] = kind
+            continue
+        if current is None or current == "null":
+            kinds[key] = kind
+        elif {current, kind} == {"int", "float"}:
+            kinds[key] = "float"
+        else:
+            kinds[key] = "str"
+
+
+def _export_text(value: Any) -> str:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+# Per-kind conversion applied to non-null values; int, bool and str pass through.
+_EXPORT_CONVERTERS: dict[str, Callable[[Any], Any]] = {"float": float, "json": _export_text}
+
+
+def _journal_assigned_parameters(workdir: Path) -> dict[int, dict[str, Any]]:
+    out: dict[int, dict[str, Any]] = {}
+    for record in _AppendOnlyJsonl.iter_records(workdir / RUN_JOURNAL_FILENAME):
+        if record.get("t") != "assign":
+            continue
+        for item in record.get("passes") or []:
+            try:
+                out[int(item["pass_id"])] = item.get("parameters") or {}
+            except Exception:
+                continue
+    return out
+
+
+# Column layout of a results export, from one scan of results.jsonl: the last
+# record per pass wins, parameters become param.<name> columns and metrics keep
+# their own names, each typed from the values actually seen.
+@dataclass
+class _ExportPlan:
+    spill_path: Path
+    end_offset: int
+    latest: dict[int, int]
+    columns: list[tuple[str, str, str, str]]  # (column, source, key, kind)
+    fallback_parameters: dict[int, dict[str, Any]]
+
+    @property
+    def rows(self) -> int:
+        return len(self.latest)
+
+
+def _plan_results_export(workdir: Path) -> _ExportPlan:
+    spill_path = workdir / RESULTS_SPILL_FILENAME
+    latest: dict[int, int] = {}
+    base_kinds: dict[str, str] = {name: "null" for name in _EXPORT_BASE_COLUMNS}
+    param_kinds: dict[str, str] = {}
+    metric_kinds: dict[str, str] = {}
+    end_offset = -1
+    missing_parameters = False
+    for offset, record in _AppendOnlyJsonl.iter_offsets(spill_path):
+        try:
+            latest[int(record["pass_id"])] = offset
+        except Exception:
+            continue
+        end_offset = offset
+        _merge_export_kinds(base_kinds, {name: record.get(name) for name in _EXPORT_BASE_COLUMNS})
+        _merge_export_kinds(metric_kinds, record.get("metrics") or {})
+        params = record.get("parameters")
+        if params is None:
+            missing_parameters = True
+        else:
+            _merge_export_kinds(param_kinds, params)
+
+    fallback: dict[int, dict[str, Any]] = {}
+    if missing_parameters:
+        # Results spilled before parameters were recorded there: take them from the journal.
+        fallback = _journal_assigned_parameters(workdir)
+        for pid in latest:
+            _merge_export_kinds(param_kinds, fallback.get(pid) or {})
+
+    columns = [(name, "base", name, base_kinds[name]) for name in _EXPORT_BASE_COLUMNS]
+    columns += [(f"param.{key}", "param", key, kind) for key, kind in param_kinds.items()]
+    columns += [
+        (f"metric.{key}" if key in base_kinds else key, "metric", key, kind)
+        for key, kind in metric_kinds.items()
+    ]
+    return _ExportPlan(spill_path, end_offset, latest, columns, fallback)
+
+
+def _iter_export_batches(plan: _ExportPlan):
+    # Column-major batches of at most EXPORT_BATCH_ROWS rows, in spill order.
+    converters = [
+        _export_text if kind == "str" else _EXPORT_CONVERTERS.get(kind) for _, _, _, kind in plan.columns
+    ]
+    batch: list[list[Any]] = [[] for _ in plan.columns]
+    for offset, record in _AppendOnlyJsonl.iter_offsets(plan.spill_path):
+        if offset > plan.end_offset:
+            break
+        try:
+            pid = int(record["pass_id"])
+        except Exception:
+            continue
+        if plan.latest.get(pid) != offset:
+            continue
+        metrics = record.get("metrics") or {}
+        params = record.get("parameters")
+        if params is None:
+            params = plan.fallback_parameters.get(pid) or {}
+        sources = {"base": record, "param": params, "metric": metrics}
+        for values, convert, (_, source, key, _) in zip(batch, converters, plan.columns):
+            value = sources[source].get(key)
+            values.append(value if convert is None or value is None else convert(value))
+        if len(batch[0]) >= EXPORT_BATCH_ROWS:
+            yield batch
+            batch = [[] for _ in plan.columns]
+    if batch[0]:
+        yield batch
+
+
+def _export_csv_chunks(plan: _ExportPlan):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([column for column, _, _, _ in plan.columns])
+    for batch in _iter_export_batches(plan):
+        writer.writerows(zip(*batch))
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    # Write-only file object for pyarrow writers; the bytes are drained after each batch.
+    def __init__(self):
+        self.closed = False
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+_ARROW_KIND_TYPES = {"int": "int64", "float": "float64", "bool": "bool_", "str": "string", "json": "string", "null": "string"}
+
+
+def _export_arrow_chunks(plan: _ExportPlan, fmt: str):
+    schema = pa.schema(
+        [(column, getattr(pa, _ARROW_KIND_TYPES[kind])()) for column, _, _, kind in plan.columns]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema) if fmt == "parquet" else pa.ipc.new_file(sink, schema)
+    try:
+        for batch in _iter_export_batches(plan):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(batch, schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+# Thread pool that records how long each call waited for a free thread, so
+# starvation shows up in /status instead of as slow passes.
+class _TimedPool:
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"optimo-{name}")
+        self._pending = 0
+        self._active = 0
+        self._submitted = 0
+        self._delays: deque[float] = deque(maxlen=512)
+        self._max_delay = 0.0
+
+    def ensure_workers(self, workers: int) -> None:
+        workers = max(1, int(workers))
+        with self._lock:
+            if workers <= self.workers:
+                return
+            old = self._executor
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"optimo-{self.name}")
+            self.workers = workers
+        # Calls already queued on the old executor still run there.
+        old.shutdown(wait=False)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+            self._submitted += 1
+            executor = self._executor
+
+        def _call() -> Any:
+            delay = time.perf_counter() - queued_at
+            with self._lock:
+                self._pending -= 1
+                self._active += 1
+                self._delays.append(delay)
+                self._max_delay = max(self._max_delay, delay)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+        return await asyncio.get_running_loop().run_in_executor(executor, _call)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            delays = sorted(self._delays)
+            out: dict[str, Any] = {
+                "workers": self.workers,
+                "active": self._active,
+                "pending": self._pending,
+                "submitted": self._submitted,
+                "queue_delay_max_ms": round(self._max_delay * 1000.0, 2),
+            }
+        if delays:
+            out["queue_delay_avg_ms"] = round(sum(delays) / len(delays) * 1000.0, 2)
+            out["queue_delay_p95_ms"] = round(delays[min(len(delays) - 1, int(len(delays) * 0.95))] * 1000.0, 2)
+        else:
+            out["queue_delay_avg_ms"] = 0.0
+            out["queue_delay_p95_ms"] = 0.0
+        return out
+
+
+def post_json_reply(url: str, payload: dict[str, Any], timeout: int = 10) -> tuple[bool, Any, str | None]:
+    req = urlrequest.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urlrequest.urlopen(req, timeout=timeout) as resp:
+            raw = resp.read()
+    except urlerror.HTTPError as exc:
+        try:
+            detail = exc.read().decode("utf-8", errors="ignore")
+        except Exception:
+            detail = str(exc)
+        return False, None, f"HTTP {exc.code}: {detail}"
+    except Exception as exc:
+        return False, None, str(exc)
+    if not raw:
+        return True, None, None
+    try:
+        return True, json.loads(raw.decode("utf-8", errors="ignore")), None
+    except Exception as exc:
+        return False, None, f"invalid JSON reply: {exc}"
+
+
+def _detect_public_ip(timeout: int = 5) -> str | None:
+    for u in ("https://api.ipify.org", "https://ifconfig.me/ip"):
+        try:
+            with urlrequest.urlopen(u, timeout=timeout) as resp:
+                ip = resp.read().decode("utf-8", errors="ignore").strip()
+            if ip:
+                return ip
+        except Exception:
+            continue
+    return None
+
+
+def _telegram_send_message(token: str, chat_id: str, text: str, timeout: int = 10) -> None:
+    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    data = urlencode({"chat_id": chat_id, "text": text}).encode("utf-8")
+    req = urlrequest.Request(url, data=data, method="POST")
+    with urlrequest.urlopen(req, timeout=timeout) as resp:
+        _ = resp.read()
+
+
+PROGRESS_MARKER = "OPTIMO_PROGRESS"
+_SIM_TIME_FORMATS = ("%d/%m/%Y %H:%M:%S.%f", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+
+def _parse_sim_time(value: Any) -> datetime | None:
+    text = str(value or "").strip()
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for fmt in _SIM_TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _log_line_sim_time(line: str) -> datetime | None:
+    # cBot log lines start with the simulated time: "dd/MM/yyyy HH:mm:ss.fff | Info | ...".
+    pos = line.find(" | ", 0, 40)
+    return _parse_sim_time(line[:pos]) if pos > 0 else None
+
+
+def _progress_line_event(line: str) -> dict[str, Any] | None:
+    # "<log prefix> OPTIMO_PROGRESS {json}", as printed by the cBot.
+    pos = line.find(PROGRESS_MARKER)
+    if pos < 0:
+        return None
+    try:
+        event = json.loads(line[pos + len(PROGRESS_MARKER):].strip())
+    except ValueError:
+        return None
+    if not isinstance(event, dict):
+        return None
+    if "time" not in event:
+        sim = _log_line_sim_time(line[:pos])
+        if sim is not None:
+            event["time"] = sim.isoformat()
+    return event
+
+
+# Live progress of one pass: simulated time, equity, drawdown, trade count and
+# processing rates as last reported, plus the early-stop verdict. feed() runs on
+# whichever thread receives the event and hands a plain snapshot to publish
+# (the run's pass_progress map, or the shard pipe); readers only see snapshots.
+class _PassProgress:
+    def __init__(
+        self,
+        rules: EarlyStopRules | None,
+        start: str,
+        end: str,
+        balance: float | None,
+        *,
+        run_id: str | None = None,
+        pass_id: int | None = None,
+        worker_slot: int | None = None,
+        publish: Optional[Callable[[dict[str, Any]], None]] = None,
+    ):
+        self.rules = rules
+        self._start = _parse_sim_time(start)
+        self._end = _parse_sim_time(end)
+        self._balance = balance
+        self._peak_equity: float | None = None
+        self._max_drawdown: float | None = None
+        self._publish = publish
+        # field -> (wall time, value) when it was first reported; see _rates.
+        self._rate_base: dict[str, tuple[float, float]] = {}
+        self._logged_step = 0
+        self._stall_logged = False
+        self.run_id = run_id
+        self.pass_id = pass_id
+        self.worker_slot = worker_slot
+        self.started_at = time.time()
+        # None until the first simulated time or progress: a cBot that reports
+        # neither (heartbeats only) has no progress data, which is not a stall.
+        self.advanced_at: float | None = None
+        # Called once, on the feeding thread, when that first progress arrives.
+        self.on_simulating: Optional[Callable[[], None]] = None
+        self.last: dict[str, Any] = {}
+        self.events = 0
+        self.reason: str | None = None
+        self._emit()
+
+    def _fraction(self, event: dict[str, Any]) -> float | None:
+        value = _as_float_or_none(event.get("progress"))
+        if value is not None:
+            return min(1.0, max(0.0, value))
+        sim = _parse_sim_time(event.get("time"))
+        if sim is None or self._start is None or self._end is None or self._end <= self._start:
+            return None
+        return min(1.0, max(0.0, (sim - self._start).total_seconds() / (self._end - self._start).total_seconds()))
+
+    def feed(self, event: dict[str, Any]) -> str | None:
+        now = time.time()
+        snapshot = dict(self.last)
+        fraction = self._fraction(event)
+        if fraction is not None:
+            snapshot["progress"] = round(fraction, 4)
+        if event.get("time"):
+            snapshot["time"] = str(event["time"])
+        for key in ("equity", "balance", "trades", "bars", "ticks"):
+            value = _as_float_or_none(event.get(key))
+            if value is not None:
+                snapshot[key] = int(value) if key in ("trades", "bars", "ticks") else value
+        equity = _as_float_or_none(event.get("equity"))
+        drawdown = _as_float_or_none(event.get("drawdownPercent"))
+        if equity is not None:
+            self._peak_equity = equity if self._peak_equity is None else max(self._peak_equity, equity)
+            if drawdown is None and self._peak_equity > 0:
+                drawdown = (self._peak_equity - equity) / self._peak_equity * 100.0
+        if drawdown is not None:
+            snapshot["drawdownPercent"] = round(drawdown, 4)
+            self._max_drawdown = drawdown if self._max_drawdown is None else max(self._max_drawdown, drawdown)
+        if snapshot.get("time") != self.last.get("time") or snapshot.get("progress") != self.last.get("progress"):
+            if self.advanced_at is None and self.on_simulating is not None:
+                try:
+                    self.on_simulating()
+                except Exception:
+                    pass
+            self.advanced_at = now
+            self._stall_logged = False
+        self._rates(snapshot, now)
+        self.last = snapshot
+        self.events += 1
+        if self.reason is None and self.rules is not None:
+            self.reason = self._check(snapshot)
+        self._emit(now)
+        self._log_milestone(snapshot)
+        return self.reason
+
+    def _rates(self, snap: dict[str, Any], now: float) -> None:
+        # Averages since each field was first reported, so the engine warm-up does
+        # not skew them; heartbeats that carry only elapsedMs set no baseline.
+        sim = _parse_sim_time(snap.get("time"))
+        values = {key: float(snap[key]) for key in ("bars", "ticks") if key in snap}
+        if sim is not None:
+            values["time"] = sim.timestamp()
+        if snap.get("progress") is not None:
+            values["progress"] = float(snap["progress"])
+        for key, value in values.items():
+            self._rate_base.setdefault(key, (now, value))
+
+        def _delta(key: str) -> tuple[float, float] | None:
+            # Log-tailed events arrive in per-poll batches; wait for a meaningful window.
+            first_at, first_value = self._rate_base[key]
+            wall = now - first_at
+            return (values[key] - first_value, wall) if key in values and wall >= 1.0 else None
+
+        for key in ("bars", "ticks"):
+            moved = _delta(key) if key in values else None
+            if moved is not None:
+                snap[f"{key}_per_second"] = round(moved[0] / moved[1], 1)
+        moved = _delta("time") if "time" in values else None
+        if moved is not None:
+            snap["sim_seconds_per_second"] = round(moved[0] / moved[1], 1)
+        moved = _delta("progress") if "progress" in values else None
+        if moved is not None and moved[0] > 0:
+            snap["eta_seconds"] = round((1.0 - values["progress"]) * moved[1] / moved[0], 1)
+
+    def _emit(self, now: float | None = None) -> None:
+        if self._publish is None:
+            return
+        try:
+            self._publish(
+                {
+                    **self.last,
+                    "pass_id": self.pass_id,
+                    "worker_slot": self.worker_slot,
+                    "started_at": self.started_at,
+                    "updated_at": now or self.started_at,
+                    "advanced_at": self.advanced_at,
+                    "events": self.events,
+                    **({"early_stop_reason": self.reason} if self.reason else {}),
+                }
+            )
+        except Exception:
+            pass
+
+    def _log_milestone(self, snap: dict[str, Any]) -> None:
+        if PROGRESS_LOG_PERCENT <= 0 or "progress" not in snap or self.run_id is None:
+            return
+        step = int(snap["progress"] * 100.0 // PROGRESS_LOG_PERCENT)
+        if step <= self._logged_step or snap["progress"] >= 1.0:
+            return
+        self._logged_step = step
+        _log_event(
+            "INFO",
+            (
+                f"pass {self.pass_id} progress {round(100.0 * snap['progress'], 1)}% sim_time={snap.get('time')} "
+                f"elapsed={round(time.time() - self.started_at, 1)}s eta={snap.get('eta_seconds', 'n/a')}s "
+                f"(run_id={self.run_id}, worker_slot={self.worker_slot})"
+            ),
+            kind="run",
+            extra={
+                "run_id": self.run_id,
+                "pass_id": self.pass_id,
+                "worker_slot": self.worker_slot,
+                "phase": "pass_progress",
+                "progress": snap["progress"],
+                "sim_time": snap.get("time"),
+                "sim_seconds_per_second": snap.get("sim_seconds_per_second"),
+                "eta_seconds": snap.get("eta_seconds"),
+            },
+        )
+
+    def check_stalled(self) -> bool:
+        # Called from the backtest wait loops; logs once per stall.
+        if self.advanced_at is None:
+            return False
+        stalled = PROGRESS_STALL_SECONDS > 0 and time.time() - self.advanced_at >= PROGRESS_STALL_SECONDS
+        if stalled and not self._stall_logged and self.run_id is not None:
+            self._stall_logged = True
+            _log_event(
+                "WARNING",
+                (
+                    f"pass {self.pass_id} stalled: no simulated progress for {round(time.time() - self.advanced_at)}s "
+                    f"at {self.last.get('time') or self.last.get('progress')} (run_id={self.run_id}, worker_slot={self.worker_slot})"
+                ),
+                kind="run",
+                extra={
+                    "run_id": self.run_id,
+                    "pass_id": self.pass_id,
+                    "worker_slot": self.worker_slot,
+                    "phase": "pass_stalled",
+                    "sim_time": self.last.get("time"),
+                    "progress": self.last.get("progress"),
+                    "events": self.events,
+                },
+            )
+        return stalled
+
+    def _check(self, snap: dict[str, Any]) -> str | None:
+        rules = self.rules
+        at = f" at {round(100.0 * snap['progress'], 1)}% progress" if "progress" in snap else ""
+        if rules.max_drawdown_percent is not None and (self._max_drawdown or 0.0) >= rules.max_drawdown_percent:
+            return f"max_drawdown_percent {round(self._max_drawdown or 0.0, 2)}>={rules.max_drawdown_percent}{at}"
+        if rules.min_equity is not None and "equity" in snap and snap["equity"] <= rules.min_equity:
+            return f"min_equity {snap['equity']}<={rules.min_equity}{at}"
+        if (
+            rules.min_trades is not None
+            and "trades" in snap
+            and snap.get("progress", 0.0) >= rules.min_trades_at_progress
+            and snap["trades"] < rules.min_trades
+        ):
+            return f"min_trades {snap['trades']}<{rules.min_trades}{at}"
+        return None
+
+    def partial_metrics(self) -> dict[str, Any]:
+        snap = self.last
+        out: dict[str, Any] = {}
+        if "equity" in snap:
+            out["endingEquity"] = snap["equity"]
+        if "balance" in snap:
+            out["endingBalance"] = snap["balance"]
+        if self._balance is not None and ("balance" in snap or "equity" in snap):
+            out["netProfit"] = round(snap.get("balance", snap.get("equity")) - self._balance, 2)
+        if "trades" in snap:
+            out["totalTrades"] = snap["trades"]
+        if self._max_drawdown is not None:
+            out["maxEquityDrawdownPercent"] = round(self._max_drawdown, 4)
+        if "progress" in snap:
+            out["progress"] = snap["progress"]
+        return out
+
+
+def _read_progress_events(path: Path, offset: int) -> tuple[list[dict[str, Any]], int]:
+    # New complete lines of a log file since offset; a partial last line waits.
+    # A chatty cBot can outrun the poll, so only the newest bytes are scanned.
+    try:
+        with path.open("rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            skipped = size - offset > PROGRESS_TAIL_MAX_BYTES
+            if skipped:
+                offset = size - PROGRESS_TAIL_MAX_BYTES
+            fh.seek(offset)
+            chunk = fh.read()
+    except OSError:
+        return [], offset
+    if skipped:
+        cut = chunk.find(b"\n") + 1
+        chunk, offset = chunk[cut:], offset + cut
+    end = chunk.rfind(b"\n")
+    if end < 0:
+        return [], offset
+    events = []
+    lines = chunk[: end + 1].splitlines()
+    for raw in lines:
+        if PROGRESS_MARKER.encode() in raw:
+            event = _progress_line_event(raw.decode("utf-8", errors="replace"))
+            if event is not None:
+                events.append(event)
+    # Plain cBot log lines carry the simulated time too (the patched host reads
+    # it the same way); only the newest one after the last progress line counts.
+    for raw in reversed(lines):
+        if PROGRESS_MARKER.encode() in raw:
+            break
+        sim = _log_line_sim_time(raw.decode("utf-8", errors="replace"))
+        if sim is not None:
+            events.append({"time": sim.isoformat()})
+            break
+    return events, offset + end + 1
+
+
+def _reports_ready(report_html: Path | None, report_json: Path) -> bool:
+    # report_html is None when the run asked for JSON reports only.
+    try:
+        if report_html is not None and report_html.stat().st_size <= 0:
+            return False
+        return report_json.stat().st_size > 0
+    except OSError:
+        return False
+
+
+def run_backtest(
+    algo_path: Path,
+    cbotset_path: Path,
+    start: str,
+    end: str,
+    data_mode: Literal["ticks", "m1"],
+    ctid: str,
+    pwd_file: Path,
+    account: str,
+    symbol: str,
+    period: str,
+    report_html: Path | None,
+    report_json: Path,
+    log_path: Path,
+    timeout_seconds: int,
+    balance: float | None,
+    stop_requested: Optional[Callable[[], bool]] = None,
+    on_proc_start: Optional[Callable[[subprocess.Popen], None]] = None,
+    on_proc_end: Optional[Callable[[int], None]] = None,
+    progress: _PassProgress | None = None,
+) -> bool:
+    cmd_prefix = _resolve_ctrade_cmd_prefix()
+    cmd = [
+        *cmd_prefix,
+        "backtest",
+        str(algo_path),
+        str(cbotset_path),
+        f"--start={start}",
+        f"--end={end}",
+        f"--data-mode={data_mode}",
+        f"--ctid={ctid}",
+        f"--pwd-file={str(pwd_file)}",
+        f"--account={account}",
+        f"--symbol={symbol}",
+        f"--period={period}",
+        f"--report-json={str(report_json)}",
+    ]
+    if report_html is not None:
+        cmd.append(f"--report={str(report_html)}")
+    if balance is not None:
+        cmd.append(f"--balance={balance}")
+
+    def reports_ready() -> bool:
+        return _reports_ready(report_html, report_json)
+
+    with log_path.open("w", encoding="utf-8") as logf:
+        logf.write(f"[started_at_utc] {now_utc_iso()}\n")
+        logf.write(f"[command] {' '.join(cmd)}\n\n")
+        logf.flush()
+        proc = subprocess.Popen(cmd, stdout=logf, stderr=subprocess.STDOUT, text=True)
+        if on_proc_start:
+            try:
+                on_proc_start(proc)
+            except Exception:
+                pass
+
+        start_ts = time.time()
+        success = False
+        outcome = "unknown"
+        progress_offset = 0
+        try:
+            while True:
+                if progress is not None:
+                    # The CLI prints the cBot log to stdout, i.e. into log_path.
+                    events, progress_offset = _read_progress_events(log_path, progress_offset)
+                    for event in events:
+                        progress.feed(event)
+                    progress.check_stalled()
+                early_stopped = progress is not None and progress.reason is not None
+                if early_stopped or (stop_requested and stop_requested()):
+                    try:
+                        proc.terminate()
+                        proc.wait(timeout=3)
+                    except Exception:
+                        try:
+                            proc.kill()
+                            proc.wait(timeout=1)
+                        except Exception:
+                            pass
+                    outcome = "early_stopped" if early_stopped else "stopped_by_request"
+                    break
+                if reports_ready():
+                    if proc.poll() is None:
+                        try:
+                            proc.wait(timeout=2)
+                        except Exception:
+                            try:
+                                proc.terminate()
+                                proc.wait(timeout=2)
+                            except Exception:
+                                try:
+                                    proc.kill()
+                                    proc.wait(timeout=1)
+                                except Exception:
+                                    pass
+                    success = True
+                    outcome = "reports_ready"
+                    break
+                if proc.poll() is not None:
+                    outcome = f"process_exited_rc_{proc.returncode}"
+                    break
+                if timeout_seconds and (time.time() - start_ts) >= timeout_seconds:
+                    try:
+                        proc.terminate()
+                        proc.wait(timeout=3)
+                    except Exception:
+                        try:
+                            proc.kill()
+                            proc.wait(timeout=1)
+                        except Exception:
+                            pass
+                    outcome = "timeout"
+                    break
+                time.sleep(1)
+        finally:
+            if on_proc_end:
+                try:
+                    on_proc_end(int(proc.pid))
+                except Exception:
+                    pass
+            elapsed_total = round(max(0.0, time.time() - start_ts), 3)
+            logf.write(f"\n[finished_at_utc] {now_utc_iso()}\n")
+            logf.write(f"[elapsed_seconds_total] {elapsed_total}\n")
+            logf.write(f"[outcome] {outcome}\n")
+            logf.flush()
+
+    return success or reports_ready()
+
+
+class _PatchedCliClient:
+    def __init__(
+        self,
+        slot_index: int,
+        on_proc_start: Optional[Callable[[subprocess.Popen[str]], None]] = None,
+        on_proc_end: Optional[Callable[[int], None]] = None,
+    ):
+        self.slot_index = int(slot_index)
         self._seq = 0
         self._on_proc_start = on_proc_start
         self._on_proc_end = on_proc_end
         self._lock = threading.RLock()
         self._cv = threading.Condition(self._lock)
         self._responses: dict[str, dict[str, Any]] = {}
+        # Progress events of the command in flight go to its on_event callback.
+        self._event_handlers: dict[str, Callable[[dict[str, Any]], Any]] = {}
+        self._active_req_id: str | None = None
         self._stderr_tail: deque[str] = deque(maxlen=200)
         self._closed = False
         self._generation = 0
@@ -645,6 +2290,15 @@ class _PatchedCliClient:
                     self._stderr_tail.append(f"[patched-host-stdout-id-missing] {line}")
                     self._cv.notify_all()
                 continue
+            if payload.get("event"):
+                with self._lock:
+                    handler = self._event_handlers.get(req_id)
+                if handler is not None and payload.get("event") == "progress":
+                    try:
+                        handler(payload.get("data") or {})
+                    except Exception:
+                        pass
+                continue
             with self._lock:
                 self._responses[req_id] = payload
                 self._cv.notify_all()
@@ -670,7 +2324,12 @@ class _PatchedCliClient:
             lines = list(self._stderr_tail)[-max_lines:]
         return "\n".join(lines).strip()
 
-    def execute(self, args: list[str], timeout_seconds: int) -> dict[str, Any]:
+    def execute(
+        self,
+        args: list[str],
+        timeout_seconds: int,
+        on_event: Optional[Callable[[dict[str, Any]], Any]] = None,
+    ) -> dict[str, Any]:
         timeout = max(1, int(timeout_seconds))
         with self._lock:
             if self._closed:
@@ -687,25 +2346,48 @@ class _PatchedCliClient:
             generation = int(self._generation)
             req_id = f"{self.slot_index}-{self._seq}"
             payload = json.dumps({"id": req_id, "args": list(args)}, ensure_ascii=False)
-            self.proc.stdin.write(payload + "\n")
-            self.proc.stdin.flush()
-
-            deadline = time.time() + timeout
-            while req_id not in self._responses:
-                remaining = deadline - time.time()
-                if remaining <= 0:
-                    raise TimeoutError(f"patched CLI command timeout after {timeout}s")
-                if self._closed:
-                    raise RuntimeError("patched CLI client closed during command execution")
-                if generation != self._generation:
-                    raise RuntimeError("patched CLI host restarted during command execution")
-                if self.proc.poll() is not None:
-                    detail = self._stderr_snapshot()
-                    raise RuntimeError(
-                        f"patched CLI host exited during command (rc={self.proc.returncode}). {detail}".strip()
-                    )
-                self._cv.wait(timeout=min(remaining, 0.5))
-            return dict(self._responses.pop(req_id))
+            if on_event is not None:
+                self._event_handlers[req_id] = on_event
+            self._active_req_id = req_id
+            try:
+                self.proc.stdin.write(payload + "\n")
+                self.proc.stdin.flush()
+
+                deadline = time.time() + timeout
+                while req_id not in self._responses:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError(f"patched CLI command timeout after {timeout}s")
+                    if self._closed:
+                        raise RuntimeError("patched CLI client closed during command execution")
+                    if generation != self._generation:
+                        raise RuntimeError("patched CLI host restarted during command execution")
+                    if self.proc.poll() is not None:
+                        detail = self._stderr_snapshot()
+                        raise RuntimeError(
+                            f"patched CLI host exited during command (rc={self.proc.returncode}). {detail}".strip()
+                        )
+                    self._cv.wait(timeout=min(remaining, 0.5))
+                return dict(self._responses.pop(req_id))
+            finally:
+                self._event_handlers.pop(req_id, None)
+                if self._active_req_id == req_id:
+                    self._active_req_id = None
+
+    def abort(self) -> bool:
+        # Asks the host to abandon the backtest in flight; its response follows
+        # with exitCode 1 and error "aborted_by_request".
+        with self._lock:
+            req_id = self._active_req_id
+            proc = self.proc
+            if req_id is None or proc is None or proc.stdin is None or proc.poll() is not None:
+                return False
+            try:
+                proc.stdin.write(json.dumps({"id": req_id, "control": "abort"}) + "\n")
+                proc.stdin.flush()
+            except Exception:
+                return False
+        return True
 
     def reset_process(self) -> None:
         self.close()
@@ -787,7 +2469,7 @@ def run_backtest_with_patched_cli(
     account: str,
     symbol: str,
     period: str,
-    report_html: Path,
+    report_html: Path | None,
     report_json: Path,
     log_path: Path,
     timeout_seconds: int,
@@ -796,6 +2478,7 @@ def run_backtest_with_patched_cli(
     run_id: Optional[str] = None,
     pass_id: Optional[int] = None,
     worker_slot: Optional[int] = None,
+    progress: _PassProgress | None = None,
 ) -> bool:
     args = [
         "backtest",
@@ -809,9 +2492,10 @@ def run_backtest_with_patched_cli(
         f"--account={account}",
         f"--symbol={symbol}",
         f"--period={period}",
-        f"--report={str(report_html)}",
         f"--report-json={str(report_json)}",
     ]
+    if report_html is not None:
+        args.append(f"--report={str(report_html)}")
     if balance is not None:
         args.append(f"--balance={balance}")
 
@@ -824,16 +2508,15 @@ def run_backtest_with_patched_cli(
     patched_host_elapsed_seconds: float | None = None
 
     def reports_ready() -> bool:
-        return (
-            report_html.exists()
-            and report_json.exists()
-            and report_html.stat().st_size > 0
-            and report_json.stat().st_size > 0
-        )
+        return _reports_ready(report_html, report_json)
 
     def _invoke() -> None:
         try:
-            result_box["response"] = cli_client.execute(args, timeout_seconds=max(5, int(timeout_seconds)) + 30)
+            result_box["response"] = cli_client.execute(
+                args,
+                timeout_seconds=max(5, int(timeout_seconds)) + 30,
+                on_event=progress.feed if progress is not None else None,
+            )
         except Exception as exc:
             error_box["error"] = exc
         finally:
@@ -845,12 +2528,34 @@ def run_backtest_with_patched_cli(
     success = False
 
     with log_path.open("w", encoding="utf-8") as logf:
+
+        def write_output(response: dict[str, Any]) -> None:
+            for label, key in (("patched_host_stdout", "stdout"), ("patched_host_stderr", "stderr")):
+                text = str(response.get(key) or "")
+                if text:
+                    logf.write(f"\n[{label}]\n")
+                    logf.write(text)
+                    if not text.endswith("\n"):
+                        logf.write("\n")
+
         logf.write(f"[started_at_utc] {now_utc_iso()}\n")
         logf.write(f"[command] {' '.join(shlex.quote(x) for x in cmd_display)}\n")
         logf.write(f"[execution] patched_cli_host pid={cli_client.pid}\n\n")
         logf.flush()
         worker_thread.start()
         while not done.wait(timeout=0.5):
+            if progress is not None:
+                progress.check_stalled()
+            if progress is not None and progress.reason is not None:
+                stop_flag.set()
+                outcome = "early_stopped"
+                # The host tears its session down on abort; restart it only if it hangs.
+                if not (cli_client.abort() and done.wait(timeout=15)):
+                    try:
+                        cli_client.reset_process()
+                    except Exception:
+                        pass
+                break
             if stop_requested and stop_requested():
                 stop_flag.set()
                 outcome = "stopped_by_request"
@@ -887,23 +2592,15 @@ def run_backtest_with_patched_cli(
                 patched_host_elapsed_ms = _as_float_or_none(raw_elapsed_ms)
                 if patched_host_elapsed_ms is not None:
                     patched_host_elapsed_seconds = round(max(0.0, patched_host_elapsed_ms / 1000.0), 3)
-                stdout = str(response.get("stdout") or "")
-                stderr = str(response.get("stderr") or "")
-                if stdout:
-                    logf.write("\n[patched_host_stdout]\n")
-                    logf.write(stdout)
-                    if not stdout.endswith("\n"):
-                        logf.write("\n")
-                if stderr:
-                    logf.write("\n[patched_host_stderr]\n")
-                    logf.write(stderr)
-                    if not stderr.endswith("\n"):
-                        logf.write("\n")
+                write_output(response)
                 if exit_code == 0 and reports_ready():
                     success = True
                     outcome = "reports_ready"
                 else:
                     outcome = f"process_exited_rc_{exit_code}"
+        elif outcome == "early_stopped" and done.is_set():
+            # The aborted command still answers with what the cBot printed up to the stop.
+            write_output(result_box.get("response") or {})
 
         worker_thread.join(timeout=2.0)
         elapsed_total = round(max(0.0, time.time() - start_ts), 3)
@@ -981,6 +2678,18 @@ class WorkerStatus(BaseModel):
     parallel_per_core: int
     explicit_parallel: Optional[int] = None
     current_run_id: Optional[str] = None
+    lease_mode: bool = False
+    leases_held: int = 0
+    max_queue_depth: Optional[int] = None
+    drain_rate_per_second: Optional[float] = None
+    executors: dict[str, Any] = Field(default_factory=dict)
+    disk: dict[str, Any] = Field(default_factory=dict)
+    artifact_retention: Optional[dict[str, Any]] = None
+    warming_up: bool = False
+    # Shared history cache: link state, lock waits and symbol/range coverage.
+    data_cache: Optional[dict[str, Any]] = None
+    # One entry per running pass: slot, simulated time/progress, rates, elapsed, stalled.
+    slots: list[dict[str, Any]] = Field(default_factory=list)
     started_at_utc: str
 
 
@@ -989,6 +2698,68 @@ class ParallelSettingsUpdate(BaseModel):
     parallel_per_core: Optional[int] = Field(default=None, ge=1, le=16)
 
 
+RiskMetricName = Literal["sharpeRatio", "sortinoRatio", "ulcerIndex", "recoveryFactor", "equityR2"]
+
+
+class RiskAnalyticsConfig(BaseModel):
+    metrics: list[RiskMetricName] = Field(
+        default_factory=lambda: ["sharpeRatio", "sortinoRatio", "ulcerIndex", "recoveryFactor", "equityR2"]
+    )
+    # Dotted path to the equity series: numbers, [time, value] pairs or objects
+    # carrying one of equity_value_keys. Without it the curve is rebuilt from
+    # the trades' profits.
+    equity_path: Optional[str] = "equity.curve"
+    equity_value_keys: list[str] = Field(default_factory=lambda: ["equity", "value", "v", "y"])
+    trades_path: Optional[str] = "trades"
+    trade_profit_key: str = "netProfit"
+    # Annualises Sharpe/Sortino (e.g. 252 for a daily curve); per-period ratios when unset.
+    periods_per_year: Optional[float] = Field(default=None, gt=0)
+    risk_free_rate: float = 0.0
+
+    @property
+    def sections(self) -> frozenset[str]:
+        paths = [p for p in (self.equity_path, self.trades_path) if p]
+        return frozenset({"main", *(p.split(".")[0] for p in paths)})
+
+
+class RetryPolicy(BaseModel):
+    # A failed pass is retried when its error detail contains one of the
+    # signatures and its outcome contains one of the outcomes (if any given).
+    signatures: list[str] = Field(default_factory=lambda: ["Message expected"])
+    outcomes: list[str] = Field(default_factory=lambda: ["process_exited_rc_1"])
+    max_attempts: int = Field(default=2, ge=1, le=20)
+    backoff_seconds: float = Field(default=10.0, ge=0.0, le=3600.0)
+    backoff_multiplier: float = Field(default=2.0, ge=1.0, le=10.0)
+    backoff_max_seconds: float = Field(default=300.0, ge=0.0, le=86400.0)
+    placement: Literal["same_slot", "any_slot"] = "same_slot"
+
+
+DEFAULT_GA_RETRY_POLICY = RetryPolicy()
+
+
+class ArtifactRetention(BaseModel):
+    # Only the current top_k passes by metric (plus failures, if keep_failed)
+    # keep their artifact directory and get artifacts sent in callbacks.
+    metric: str = "netProfit"
+    direction: Literal["max", "min"] = "max"
+    top_k: int = Field(default=100, ge=1, le=1_000_000)
+    # Passes outside the top-K: "delete" the directory or "compress" it into
+    # <pass_id>.artifacts.zip in the run workdir.
+    evicted: Literal["delete", "compress"] = "delete"
+    keep_failed: bool = True
+
+
+class EarlyStopRules(BaseModel):
+    # Checked against the live progress a pass reports (OPTIMO_PROGRESS lines
+    # from the cBot, relayed by the patched host or read from the CLI log). A
+    # rule only applies once the fields it needs have been reported.
+    max_drawdown_percent: Optional[float] = Field(default=None, gt=0)
+    min_equity: Optional[float] = None
+    min_trades: Optional[int] = Field(default=None, ge=1)
+    # Fraction of the backtest range by which min_trades must have been reached.
+    min_trades_at_progress: float = Field(default=0.25, gt=0.0, le=1.0)
+
+
 class RunStartRequest(BaseModel):
     # Identifiers (optional but recommended)
     bot_name: Optional[str] = None
@@ -1012,9 +2783,33 @@ class RunStartRequest(BaseModel):
     # Callback (OptimoUI collector)
     callback_url: Optional[str] = None
 
+    # Pull mode: lease passes from the coordinator whenever slots are free
+    # (base URL exposing /acquire, /heartbeat, /complete and /release).
+    lease_url: Optional[str] = None
+    lease_ttl_seconds: int = Field(default=120, ge=10, le=86400)
+    lease_batch_max: int = Field(default=0, ge=0)
+
     # Execution policy
     timeout_seconds: int = 28800
     include_artifacts: bool = True
+    # False: passes write report.json only; POST /run/{id}/passes/render
+    # re-runs chosen passes later to produce their HTML report.
+    html_report: bool = True
+    # Defaults to the "Message expected" retry for distributed GA tick runs only.
+    retry_policy: Optional[RetryPolicy] = None
+    # Only these go into PassResult.metrics: headline names (netProfit,
+    # profitFactor, ...) and/or dotted paths into report.json (main.netProfit).
+    metrics_projection: Optional[list[str]] = None
+    # Derived risk metrics from the equity/trade series (needs numpy on the worker).
+    risk_analytics: Optional[RiskAnalyticsConfig] = None
+    # Keep pass directories (and send artifacts) only for the best passes.
+    artifact_retention: Optional[ArtifactRetention] = None
+    # "stored", "deflate[:level]" or "zstd[:level]"; defaults to OPTIMO_WORKER_ARTIFACTS_CODEC.
+    artifacts_codec: Optional[str] = None
+    # Abort passes that break a rule; they complete early with partial metrics.
+    early_stop: Optional[EarlyStopRules] = None
+    # First pass alone until it has loaded the data; defaults to OPTIMO_WORKER_WARMUP (skipped with one slot).
+    warmup: Optional[bool] = None
 
 
 class RunStartResponse(BaseModel):
@@ -1030,12 +2825,24 @@ class PassJob(BaseModel):
 
 class AssignPassesRequest(BaseModel):
     passes: list[PassJob]
+    # Re-send the stored result of already completed duplicates to the callback.
+    reemit_completed: bool = False
 
 
 class AssignPassesResponse(BaseModel):
     run_id: str
     accepted: int
     queued: int
+    rejected: int = 0
+    rejected_pass_ids: list[int] = Field(default_factory=list)
+    duplicate_pass_ids: list[int] = Field(default_factory=list)
+    reemitted: int = 0
+    max_queue_depth: Optional[int] = None
+    retry_after_seconds: Optional[int] = None
+
+
+class PassIdsRequest(BaseModel):
+    pass_ids: list[int] = Field(default_factory=list)
 
 
 class PassResult(BaseModel):
@@ -1047,10 +2854,15 @@ class PassResult(BaseModel):
     elapsed_seconds_total: Optional[float] = None
     metrics: dict[str, Any] = Field(default_factory=dict)
     artifacts_zip_b64: Optional[str] = None
+    # Codec of artifacts_zip_b64: "stored" / "deflate:<level>" zip, or "zstd:<level>" tar.zst.
+    artifacts_codec: Optional[str] = None
     error: Optional[str] = None
     outcome: Optional[str] = None
     error_detail: Optional[str] = None
     log_tail: Optional[str] = None
+    # Aborted by an early_stop rule; metrics are the last reported progress.
+    early_stopped: bool = False
+    early_stop_reason: Optional[str] = None
 
 
 class RunResultsResponse(BaseModel):
@@ -1060,6 +2872,22 @@ class RunResultsResponse(BaseModel):
     results: list[PassResult]
 
 
+class DataPrefetchRequest(BaseModel):
+    symbol: str
+    period: str
+    start: str
+    end: str
+    data_mode: Literal["ticks", "m1"]
+    ctid: str
+    account: str
+    balance: Optional[float] = None
+    pwd_b64: Optional[str] = None
+    pwd_text: Optional[str] = None
+    # Any cBot works; it only has to start so the CLI loads the history.
+    algo_b64: str
+    timeout_seconds: int = Field(default=900, ge=30, le=86400)
+
+
 class CompileSourceRequest(BaseModel):
     source_zip_b64: str
     project_relpath: Optional[str] = None
@@ -1080,6 +2908,8 @@ class CompileSourceResponse(BaseModel):
     metadata_b64: Optional[str] = None
     metadata_name: Optional[str] = None
     workdir: str
+    cached: bool = False
+    source_hash: Optional[str] = None
 
 
 class CTraderInfoRequest(BaseModel):
@@ -1091,6 +2921,105 @@ class CTraderInfoRequest(BaseModel):
     timeout_seconds: int = 120
 
 
+@dataclass
+class _PassRetry:
+    attempt: int
+    delay_seconds: float
+    diagnostics: dict[str, str | None]
+    slot: Optional[int] = None
+
+
+# Top-K bookkeeping for ArtifactRetention: a min-heap of (score, pass_id)
+# where a higher score is better, so heap[0] is the first to fall out.
+class _TopKRetention:
+    def __init__(self, policy: ArtifactRetention):
+        self.policy = policy
+        self._path = tuple(policy.metric.split("."))
+        self._sign = 1.0 if policy.direction == "max" else -1.0
+        self._heap: list[tuple[float, int]] = []
+        self.kept: set[int] = set()
+        self.evicted_total = 0
+
+    def score(self, metrics: dict[str, Any]) -> float | None:
+        value = metrics.get(self.policy.metric)
+        if value is None and len(self._path) > 1:
+            value = _dig(metrics, self._path)
+        value = _as_float_or_none(value)
+        if value is None or value != value:
+            return None
+        return value * self._sign
+
+    def offer(self, pass_id: int, status: str, outcome: Optional[str], metrics: dict[str, Any]) -> list[int]:
+        # Returns the passes whose artifacts are no longer wanted (possibly pass_id itself).
+        pid = int(pass_id)
+        if pid in self.kept:
+            return []
+        if outcome == "cancelled":
+            return self._evict([pid])
+        if status != "Completed":
+            if self.policy.keep_failed:
+                self.kept.add(pid)
+                return []
+            return self._evict([pid])
+        score = self.score(metrics)
+        if score is None:
+            return self._evict([pid])
+        if len(self._heap) < self.policy.top_k:
+            heapq.heappush(self._heap, (score, pid))
+            self.kept.add(pid)
+            return []
+        if score <= self._heap[0][0]:
+            return self._evict([pid])
+        _, dropped = heapq.heapreplace(self._heap, (score, pid))
+        self.kept.add(pid)
+        self.kept.discard(dropped)
+        return self._evict([dropped])
+
+    def _evict(self, pass_ids: list[int]) -> list[int]:
+        self.evicted_total += len(pass_ids)
+        return pass_ids
+
+    def keeps(self, pass_id: int) -> bool:
+        return int(pass_id) in self.kept
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "metric": self.policy.metric,
+            "direction": self.policy.direction,
+            "top_k": self.policy.top_k,
+            "kept": len(self.kept),
+            "evicted": self.evicted_total,
+            "threshold": (self._heap[0][0] * self._sign) if len(self._heap) >= self.policy.top_k else None,
+        }
+
+
+def _evict_pass_artifacts(
+    workdir: Path,
+    pass_ids: list[int],
+    mode: str,
+    scratch_dir: Path | None = None,
+    codec: _ArtifactCodec | None = None,
+) -> int:
+    codec = codec or ARTIFACTS_CODEC
+    removed = 0
+    for pid in pass_ids:
+        pass_dir = workdir / str(int(pid))
+        if not pass_dir.is_dir() and scratch_dir is not None:
+            pass_dir = scratch_dir / str(int(pid))
+        if not pass_dir.is_dir():
+            continue
+        if mode == "compress":
+            archive = workdir / f"{int(pid)}.artifacts.{codec.extension}"
+            try:
+                archive.write_bytes(_pack_artifacts(_artifact_entries(pass_dir), codec)[0])
+            except Exception:
+                archive.unlink(missing_ok=True)
+                continue
+        shutil.rmtree(pass_dir, ignore_errors=True)
+        removed += 1
+    return removed
+
+
 @dataclass
 class _RunState:
     run_id: str
@@ -1103,16 +3032,74 @@ class _RunState:
     stop: asyncio.Event
     in_flight: int = 0
     enqueued_total: int = 0
-    results: list[PassResult] = None  # type: ignore[assignment]
+    results: _ResultStore = None  # type: ignore[assignment]
     active_procs: dict[int, subprocess.Popen] = None  # type: ignore[assignment]
     callback_queue: asyncio.Queue[PassResult] | None = None
     callback_task: asyncio.Task[Any] | None = None
+    journal: _AppendOnlyJsonl | None = None
+    result_index: _ResultIndex | None = None
+    leases: dict[int, str] = None  # type: ignore[assignment]
+    lost_leases: set[int] = None  # type: ignore[assignment]
+    capacity_event: asyncio.Event | None = None
+    lease_task: asyncio.Task[Any] | None = None
+    finished_at: deque[float] = None  # type: ignore[assignment]
+    running_passes: dict[int, int] = None  # type: ignore[assignment]
+    cancel_requested: set[int] = None  # type: ignore[assignment]
+    # pass_id -> "queued" | "running" | "done"; makes assignment idempotent.
+    pass_states: dict[int, str] = None  # type: ignore[assignment]
+    # Delayed retries: pass_id -> (job, slot or -1 for any slot); due ones move
+    # to retry_ready[slot] and are picked before the shared queue.
+    retry_waiting: dict[int, tuple[PassJob, int]] = None  # type: ignore[assignment]
+    retry_ready: dict[int, deque[int]] = None  # type: ignore[assignment]
+    retry_history: dict[int, dict[str, Any]] = None  # type: ignore[assignment]
+    metrics_extractor: MetricsExtractor | None = None
+    retention: _TopKRetention | None = None
+    artifact_codec: _ArtifactCodec | None = None
+    # Passes whose directory is still in the scratch tier, waiting to be persisted.
+    scratch_pending: set[int] = None  # type: ignore[assignment]
+    # Latest progress snapshot of each running pass (see _PassProgress).
+    pass_progress: dict[int, dict[str, Any]] = None  # type: ignore[assignment]
+    # Set once the data warm-up is over; None when the run skipped it.
+    warmup_done: asyncio.Event | None = None
+    warmup_started_perf: float = 0.0
 
     def __post_init__(self):
         if self.results is None:
-            self.results = []
+            self.results = _ResultStore(self.workdir / RESULTS_SPILL_FILENAME)
         if self.active_procs is None:
             self.active_procs = {}
+        if self.leases is None:
+            self.leases = {}
+        if self.lost_leases is None:
+            self.lost_leases = set()
+        if self.finished_at is None:
+            self.finished_at = deque(maxlen=4096)
+        if self.running_passes is None:
+            self.running_passes = {}
+        if self.cancel_requested is None:
+            self.cancel_requested = set()
+        if self.pass_states is None:
+            self.pass_states = {}
+        if self.retry_waiting is None:
+            self.retry_waiting = {}
+        if self.retry_ready is None:
+            self.retry_ready = {}
+        if self.retry_history is None:
+            self.retry_history = {}
+        if self.scratch_pending is None:
+            self.scratch_pending = set()
+        if self.pass_progress is None:
+            self.pass_progress = {}
+        if self.metrics_extractor is None and self.config.metrics_projection:
+            self.metrics_extractor = _compile_metrics_projection(self.config.metrics_projection)
+        if self.artifact_codec is None:
+            self.artifact_codec = (
+                _parse_artifact_codec(self.config.artifacts_codec) if self.config.artifacts_codec else ARTIFACTS_CODEC
+            )
+        if self.retention is None and self.config.artifact_retention:
+            self.retention = _TopKRetention(self.config.artifact_retention)
+        if self.capacity_event is None and self.config.lease_url:
+            self.capacity_event = asyncio.Event()
         if self.callback_queue is None and self.config.callback_url and CALLBACK_BATCH_SIZE > 1:
             self.callback_queue = asyncio.Queue()
 
@@ -1120,9 +3107,15 @@ class _RunState:
 APP_STARTED_AT = now_utc_iso()
 STATE_LOCK = threading.Lock()
 CURRENT_RUN: _RunState | None = None
+SLOT_POOL = _TimedPool("slot", MAX_PARALLEL)
+IO_POOL = _TimedPool("io", IO_POOL_THREADS)
 LOG_LOCK = threading.Lock()
 LOG_SEQ = 0
 LOG_BUFFER: deque[dict[str, Any]] = deque(maxlen=max(500, _int_env("OPTIMO_WORKER_LOG_MAX_LINES", 2000)))
+# Set inside slot supervisor processes: log entries go to the API process instead.
+_LOG_FORWARD: Callable[[dict[str, Any]], None] | None = None
+# Likewise for pass progress snapshots: (run_id, snapshot).
+_PROGRESS_FORWARD: Callable[[str, dict[str, Any]], None] | None = None
 
 app = FastAPI(title="Bravo OPTIMO Worker", version="0.1.0")
 
@@ -1144,11 +3137,24 @@ def _log_event(
     }
     if isinstance(extra, dict) and extra:
         entry["extra"] = extra
+    if _LOG_FORWARD is not None:
+        _LOG_FORWARD(entry)
+        return entry
+    with LOG_LOCK:
+        LOG_SEQ += 1
+        entry["id"] = LOG_SEQ
+        LOG_BUFFER.append(entry)
+    return entry
+
+
+def _ingest_log_entry(entry: dict[str, Any]) -> None:
+    global LOG_SEQ
+    if not isinstance(entry, dict):
+        return
     with LOG_LOCK:
         LOG_SEQ += 1
         entry["id"] = LOG_SEQ
         LOG_BUFFER.append(entry)
-    return entry
 
 
 def _guess_bind_info() -> tuple[str, int]:
@@ -1241,24 +3247,41 @@ def _is_distributed_callback_url(callback_url: str | None) -> bool:
     return "/api/distributed/callback/" in str(callback_url or "").strip()
 
 
+def _retry_policy_for(run: _RunState) -> RetryPolicy | None:
+    if run.config.retry_policy is not None:
+        return run.config.retry_policy
+    if str(run.config.data_mode or "").strip().lower() != "ticks":
+        return None
+    if not _is_distributed_callback_url(run.config.callback_url):
+        return None
+    return DEFAULT_GA_RETRY_POLICY
+
+
+def _retry_backoff_seconds(policy: RetryPolicy, attempt: int) -> float:
+    delay = float(policy.backoff_seconds) * (float(policy.backoff_multiplier) ** max(0, int(attempt) - 1))
+    return round(min(delay, float(policy.backoff_max_seconds)), 3)
+
+
 def _should_retry_ga_backtest_pass(
     run: _RunState,
     *,
     ok: bool,
     rep: dict[str, Any] | None,
     diagnostics: dict[str, str | None],
+    attempt: int = 1,
 ) -> bool:
-    if ok or rep:
+    if ok or rep is not None:
         return False
     if run.stop.is_set():
         return False
-    if str(run.config.data_mode or "").strip().lower() != "ticks":
-        return False
-    if not _is_distributed_callback_url(run.config.callback_url):
+    policy = _retry_policy_for(run)
+    if policy is None or int(attempt) >= int(policy.max_attempts):
         return False
     outcome = str(diagnostics.get("outcome") or "").strip().lower()
     detail = str(diagnostics.get("error_detail") or "")
-    return ("process_exited_rc_1" in outcome) and ("Message expected" in detail)
+    if policy.outcomes and not any(str(o).strip().lower() in outcome for o in policy.outcomes):
+        return False
+    return any(sig and sig in detail for sig in policy.signatures)
 
 
 def _clear_backtest_retry_outputs(*paths: Path) -> None:
@@ -1287,19 +3310,12 @@ def _snapshot_backtest_attempt_files(
     return attempt_dir
 
 
-def _format_ga_double_failure_detail(
-    first_diag: dict[str, str | None],
-    second_diag: dict[str, str | None],
-) -> str:
+def _format_retry_failure_detail(attempts: list[dict[str, str | None]]) -> str:
     parts: list[str] = []
-    first_outcome = str(first_diag.get("outcome") or "").strip()
-    first_detail = str(first_diag.get("error_detail") or "").strip()
-    second_outcome = str(second_diag.get("outcome") or "").strip()
-    second_detail = str(second_diag.get("error_detail") or "").strip()
-    first_text = first_detail or first_outcome or "report_missing_or_invalid"
-    second_text = second_detail or second_outcome or "report_missing_or_invalid"
-    parts.append(f"tentativo_1={first_text}")
-    parts.append(f"tentativo_2={second_text}")
+    for idx, diag in enumerate(attempts, start=1):
+        outcome = str(diag.get("outcome") or "").strip()
+        detail = str(diag.get("error_detail") or "").strip()
+        parts.append(f"tentativo_{idx}={detail or outcome or 'report_missing_or_invalid'}")
     return " | ".join(parts)
 
 
@@ -1393,6 +3409,110 @@ def _find_compiled_metadata_file(algo_path: Path) -> Optional[Path]:
     return None
 
 
+def _compile_arg_candidates(target: Path, output_path: Path) -> list[list[str]]:
+    return [
+        ["compile", str(target), f"--output={output_path}"],
+        ["compile", str(target), str(output_path)],
+        ["compile", f"--source={target}", f"--output={output_path}"],
+    ]
+
+
+_COMPILE_PROFILES: dict[str, dict[str, Any]] | None = None
+_COMPILE_PROFILES_LOCK = threading.Lock()
+
+
+def _compile_profile(cli_version: str) -> dict[str, Any]:
+    global _COMPILE_PROFILES
+    with _COMPILE_PROFILES_LOCK:
+        if _COMPILE_PROFILES is None:
+            try:
+                loaded = json.loads((WORKER_ROOT / COMPILE_PROFILE_FILENAME).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                loaded = {}
+            _COMPILE_PROFILES = loaded if isinstance(loaded, dict) else {}
+        profile = _COMPILE_PROFILES.get(cli_version)
+        return dict(profile) if isinstance(profile, dict) else {}
+
+
+def _remember_compile_profile(cli_version: str, **changes: Any) -> None:
+    _compile_profile(cli_version)
+    with _COMPILE_PROFILES_LOCK:
+        assert _COMPILE_PROFILES is not None
+        profile = {**(_COMPILE_PROFILES.get(cli_version) or {}), **changes, "updated_at": now_utc_iso()}
+        _COMPILE_PROFILES[cli_version] = profile
+        path = WORKER_ROOT / COMPILE_PROFILE_FILENAME
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(_COMPILE_PROFILES, indent=1), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    _log_event(
+        "INFO",
+        f"compile profile for CLI {cli_version}: {profile}",
+        kind="compile",
+        extra={"phase": "compile_profile", "cli_version": cli_version, **changes},
+    )
+
+
+_COMPILE_CLIENT: _PatchedCliClient | None = None
+_COMPILE_CLIENT_LOCK = threading.Lock()
+
+
+def _compile_host_available() -> bool:
+    return COMPILE_VIA_HOST and CUSTOM_CLI_PATCHED and Path(CLI_PATCHED_HOST_PATH).exists()
+
+
+def _close_compile_client() -> None:
+    global _COMPILE_CLIENT
+    with _COMPILE_CLIENT_LOCK:
+        client, _COMPILE_CLIENT = _COMPILE_CLIENT, None
+    if client is not None:
+        client.close()
+
+
+def _compile_via_host(args: list[str], timeout_seconds: int) -> tuple[int, str, str]:
+    global _COMPILE_CLIENT
+    with _COMPILE_CLIENT_LOCK:
+        try:
+            if _COMPILE_CLIENT is None:
+                started_perf = time.perf_counter()
+                _COMPILE_CLIENT = _PatchedCliClient(0)
+                _log_event(
+                    "INFO",
+                    f"patched CLI host started for compiles (pid={_COMPILE_CLIENT.pid})",
+                    kind="compile",
+                    extra={
+                        "phase": "compile_host_started",
+                        "pid": _COMPILE_CLIENT.pid,
+                        "startup_seconds": round(time.perf_counter() - started_perf, 3),
+                    },
+                )
+            res = _COMPILE_CLIENT.execute(args, max(10, int(timeout_seconds)))
+        except Exception:
+            # A timed-out or dead host cannot take the next request.
+            if _COMPILE_CLIENT is not None:
+                _COMPILE_CLIENT.close()
+            _COMPILE_CLIENT = None
+            raise
+    stderr = str(res.get("stderr") or "")
+    if res.get("error"):
+        stderr = f"{stderr}\n{res.get('error')}".strip()
+    rc = int(res.get("exitCode") if res.get("exitCode") is not None else (0 if res.get("ok") else 1))
+    return rc, str(res.get("stdout") or ""), stderr
+
+
+def _compile_via_subprocess(cmd: list[str], timeout_seconds: int) -> tuple[int, str, str]:
+    res = subprocess.run(
+        cmd,
+        capture_output=True,
+        text=True,
+        check=False,
+        timeout=max(10, int(timeout_seconds)),
+    )
+    return res.returncode, res.stdout or "", res.stderr or ""
+
+
 def _run_compile_commands(
     target: Path,
     output_path: Path,
@@ -1401,54 +3521,237 @@ def _run_compile_commands(
 ) -> tuple[Path, list[str], str, str]:
     before = _snapshot_algo_files(output_path.parent)
     cmd_prefix = _resolve_ctrade_cmd_prefix()
-    cmd_candidates: list[list[str]] = [
-        [*cmd_prefix, "compile", str(target), f"--output={output_path}"],
-        [*cmd_prefix, "compile", str(target), str(output_path)],
-        [*cmd_prefix, "compile", f"--source={target}", f"--output={output_path}"],
-    ]
+    candidates = _compile_arg_candidates(target, output_path)
+    cli_version = _cli_version()
+    profile = _compile_profile(cli_version)
+    syntax = profile.get("syntax")
+    # Once a syntax has worked for this CLI build only that one is tried.
+    order = [syntax] if isinstance(syntax, int) and 0 <= syntax < len(candidates) else list(range(len(candidates)))
+    # The host is skipped once it failed, several compiles in a row, where a
+    # plain CLI process succeeded; one timeout under load must not disable it.
+    host_failures = int(profile.get("host_failures") or 0)
+    runners = ["host", "subprocess"] if _compile_host_available() and host_failures < COMPILE_HOST_MAX_FAILURES else ["subprocess"]
     logs: list[str] = []
     last_stdout = ""
     last_stderr = ""
 
-    for cmd in cmd_candidates:
-        try:
-            res = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=False,
-                timeout=max(10, int(timeout_seconds)),
-            )
-        except FileNotFoundError:
-            raise HTTPException(status_code=500, detail=f"cTrader CLI not found: {CTRADE_BIN}")
-        except subprocess.TimeoutExpired:
-            logs.append(f"TIMEOUT: {' '.join(cmd)}")
-            continue
-        except Exception as exc:
-            logs.append(f"ERROR: {' '.join(cmd)} -> {exc}")
-            continue
+    for runner in runners:
+        for idx in order:
+            cmd = [*cmd_prefix, *candidates[idx]]
+            try:
+                if runner == "host":
+                    rc, last_stdout, last_stderr = _compile_via_host(candidates[idx], timeout_seconds)
+                else:
+                    rc, last_stdout, last_stderr = _compile_via_subprocess(cmd, timeout_seconds)
+            except FileNotFoundError:
+                raise HTTPException(status_code=500, detail=f"cTrader CLI not found: {CTRADE_BIN}")
+            except (subprocess.TimeoutExpired, TimeoutError):
+                logs.append(f"TIMEOUT ({runner}): {' '.join(cmd)}")
+                if runner == "host":
+                    break
+                continue
+            except Exception as exc:
+                logs.append(f"ERROR ({runner}): {' '.join(cmd)} -> {exc}")
+                if runner == "host":
+                    break
+                continue
 
-        last_stdout = res.stdout or ""
-        last_stderr = res.stderr or ""
-        if res.returncode == 0:
-            found = _pick_compiled_algo(output_path.parent, before, output_path)
-            if found:
-                return found, cmd, last_stdout, last_stderr
-        if include_full_logs:
-            logs.append(
-                f"RC={res.returncode}: {' '.join(cmd)}\n[stderr]\n{last_stderr}\n[stdout]\n{last_stdout}"
-            )
-        else:
-            logs.append(
-                f"RC={res.returncode}: {' '.join(cmd)} | stderr={_tail_text(last_stderr, 400)} | stdout={_tail_text(last_stdout, 400)}"
-            )
+            if rc == 0:
+                found = _pick_compiled_algo(output_path.parent, before, output_path)
+                if found:
+                    changes: dict[str, Any] = {}
+                    if syntax != idx:
+                        changes["syntax"] = idx
+                    if runner == "host" and host_failures:
+                        changes["host_failures"] = 0
+                    elif runner == "subprocess" and "host" in runners:
+                        changes["host_failures"] = host_failures + 1
+                    if changes:
+                        _remember_compile_profile(cli_version, **changes)
+                    return found, cmd, last_stdout, last_stderr
+            if include_full_logs:
+                logs.append(
+                    f"RC={rc} ({runner}): {' '.join(cmd)}\n[stderr]\n{last_stderr}\n[stdout]\n{last_stdout}"
+                )
+            else:
+                logs.append(
+                    f"RC={rc} ({runner}): {' '.join(cmd)} | stderr={_tail_text(last_stderr, 400)} | stdout={_tail_text(last_stdout, 400)}"
+                )
 
     detail = "Compile failed on worker."
     if logs:
-        detail += " " + " || ".join(logs[:3])
+        detail += " " + " || ".join(logs[:6])
     raise HTTPException(status_code=502, detail=detail)
 
 
+_CLI_VERSION: str | None = None
+
+
+def _cli_version() -> str:
+    # The CLI has no version command; the size and mtime of its entry point and
+    # console assemblies change with every image that ships a new build.
+    global _CLI_VERSION
+    if _CLI_VERSION is None:
+        explicit = str(os.environ.get("OPTIMO_WORKER_CLI_VERSION") or "").strip()
+        if explicit:
+            _CLI_VERSION = explicit
+        else:
+            paths = [Path(shutil.which(part) or part).expanduser() for part in _resolve_ctrade_cmd_prefix()]
+            paths.extend(sorted(Path(CLI_PATCHED_CLI_DIR).glob("cTrader.Console*.dll")))
+            digest = hashlib.sha256()
+            for path in paths:
+                try:
+                    st = path.resolve().stat()
+                    digest.update(f"{path.resolve()}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+                except OSError:
+                    digest.update(f"{path}\n".encode("utf-8"))
+            _CLI_VERSION = digest.hexdigest()[:16]
+    return _CLI_VERSION
+
+
+# One directory per cache key holding the .algo, its metadata file and
+# entry.json; the mtime of entry.json is the LRU clock. Entries are built in
+# a dot-directory and renamed into place, so readers never see half of one.
+class _CompileCache:
+    def __init__(self, root: Path, max_entries: int, max_bytes: int):
+        self.root = root
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self._lock = threading.Lock()
+        self.hits_total = 0
+        self.misses_total = 0
+        self.evicted_total = 0
+        # Running totals of the stored entries, from one scan of root on first
+        # use; put and _evict keep them current so stats() never walks the tree.
+        self.entries: int | None = None
+        self.bytes = 0
+
+    @staticmethod
+    def source_key(zip_bytes: bytes, project_relpath: Optional[str], cli_version: str) -> str:
+        # Member paths and contents only: timestamps, ordering, compression and
+        # directory entries of the archive do not change the key.
+        digest = hashlib.sha256()
+        with zipfile.ZipFile(io.BytesIO(zip_bytes), "r") as zf:
+            members: list[tuple[str, zipfile.ZipInfo]] = []
+            for info in zf.infolist():
+                name = info.filename.replace("\\", "/").lstrip("/")
+                while name.startswith("./"):
+                    name = name[2:]
+                if info.is_dir() or not name or name.startswith("__MACOSX/"):
+                    continue
+                members.append((name, info))
+            for name, info in sorted(members, key=lambda item: item[0]):
+                digest.update(f"{name}\0{info.file_size}\0".encode("utf-8"))
+                with zf.open(info) as fh:
+                    for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                        digest.update(chunk)
+        relpath = str(project_relpath or "").strip().replace("\\", "/")
+        digest.update(f"\0{relpath}\0{cli_version}".encode("utf-8"))
+        return digest.hexdigest()[:32]
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        entry_dir = self.root / key
+        try:
+            info = json.loads((entry_dir / "entry.json").read_text(encoding="utf-8"))
+            info["algo_bytes"] = (entry_dir / info["algo_name"]).read_bytes()
+            metadata_name = info.get("metadata_name")
+            info["metadata_bytes"] = (entry_dir / metadata_name).read_bytes() if metadata_name else None
+            os.utime(entry_dir / "entry.json")
+        except (OSError, ValueError, KeyError, TypeError):
+            with self._lock:
+                self.misses_total += 1
+            return None
+        with self._lock:
+            self.hits_total += 1
+        info["workdir"] = str(entry_dir)
+        return info
+
+    def put(self, key: str, algo_path: Path, metadata_path: Optional[Path], info: dict[str, Any]) -> None:
+        ensure_dir(self.root)
+        staging = self.root / f".{key}.{uuid.uuid4().hex[:8]}"
+        ensure_dir(staging)
+        try:
+            shutil.copy2(algo_path, staging / algo_path.name)
+            if metadata_path is not None:
+                shutil.copy2(metadata_path, staging / metadata_path.name)
+            entry = {
+                **info,
+                "algo_name": algo_path.name,
+                "metadata_name": metadata_path.name if metadata_path is not None else None,
+                "created_at": now_utc_iso(),
+            }
+            (staging / "entry.json").write_text(json.dumps(entry), encoding="utf-8")
+            size = _dir_size_bytes(staging)
+            with self._lock:
+                self._load_totals()
+                try:
+                    os.replace(staging, self.root / key)
+                    self.entries += 1
+                    self.bytes += size
+                except OSError:
+                    # A concurrent compile of the same source stored it first.
+                    pass
+                self._evict()
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries: list[tuple[float, int, Path]] = []
+        if not self.root.is_dir():
+            return entries
+        for path in self.root.iterdir():
+            if path.name.startswith(".") or not path.is_dir():
+                continue
+            try:
+                last_used = (path / "entry.json").stat().st_mtime
+            except OSError:
+                last_used = 0.0
+            entries.append((last_used, _dir_size_bytes(path), path))
+        entries.sort(key=lambda item: item[0])
+        return entries
+
+    def _load_totals(self) -> None:
+        if self.entries is None:
+            entries = self._entries()
+            self.entries = len(entries)
+            self.bytes = sum(size for _, size, _ in entries)
+
+    def _evict(self) -> None:
+        # Only a cache over its limits is scanned, for the least recently used order.
+        if self.entries <= self.max_entries and self.bytes <= self.max_bytes:
+            return
+        entries = self._entries()
+        self.entries = len(entries)
+        self.bytes = sum(size for _, size, _ in entries)
+        while len(entries) > 1 and (self.entries > self.max_entries or self.bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            self.entries -= 1
+            self.bytes -= size
+            self.evicted_total += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._load_totals()
+            return {
+                "root": str(self.root),
+                "entries": self.entries,
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits_total": self.hits_total,
+                "misses_total": self.misses_total,
+                "evicted_total": self.evicted_total,
+            }
+
+
+COMPILE_CACHE = (
+    _CompileCache(WORKER_ROOT / COMPILE_CACHE_DIRNAME, COMPILE_CACHE_MAX_ENTRIES, COMPILE_CACHE_MAX_BYTES)
+    if COMPILE_CACHE_ENABLED
+    else None
+)
+
+
 @app.middleware("http")
 async def _request_access_log(request: Request, call_next):
     started = time.perf_counter()
@@ -1480,6 +3783,99 @@ async def _request_access_log(request: Request, call_next):
     return response
 
 
+@app.on_event("startup")
+async def _start_slot_shards_startup() -> None:
+    for shard in SLOT_SHARDS:
+        try:
+            await IO_POOL.run(shard.start)
+        except Exception as exc:
+            _log_event(
+                "ERROR",
+                f"slot shard {shard.index} failed to start: {exc}",
+                kind="app",
+                extra={"phase": "slot_shard_start_error", "shard": shard.index},
+            )
+
+
+@app.on_event("shutdown")
+async def _stop_slot_shards_shutdown() -> None:
+    for shard in SLOT_SHARDS:
+        await IO_POOL.run(shard.shutdown)
+
+
+@app.on_event("shutdown")
+async def _close_compile_client_shutdown() -> None:
+    await IO_POOL.run(_close_compile_client)
+
+
+@app.on_event("shutdown")
+async def _stop_html_renders_shutdown() -> None:
+    with STATE_LOCK:
+        contexts = list(_RENDER_CONTEXTS.values())
+    for ctx in contexts:
+        ctx.stop.set()
+
+
+@app.on_event("startup")
+async def _attach_shared_data_cache_startup() -> None:
+    if SHARED_DATA_DIR is not None and SHARED_DATA is None:
+        _log_event(
+            "WARNING",
+            "shared data cache needs POSIX file locks; keeping the CLI's private cache",
+            kind="startup",
+            extra={"phase": "shared_data_cache_unavailable"},
+        )
+    if SHARED_DATA is None:
+        return
+    await IO_POOL.run(SHARED_DATA.attach)
+    _log_event(
+        "INFO" if SHARED_DATA.attached else "ERROR",
+        (
+            f"shared data cache {SHARED_DATA.root} linked at {SHARED_DATA.cli_cache_dir}"
+            if SHARED_DATA.attached
+            else f"shared data cache {SHARED_DATA.root} not linked: {SHARED_DATA.attach_error}"
+        ),
+        kind="startup",
+        extra={"phase": "shared_data_cache_attach", "attached": SHARED_DATA.attached},
+    )
+
+
+@app.on_event("startup")
+async def _report_artifacts_codec_startup() -> None:
+    if ARTIFACTS_CODEC_ERROR is not None:
+        _log_event(
+            "WARNING",
+            f"OPTIMO_WORKER_ARTIFACTS_CODEC: {ARTIFACTS_CODEC_ERROR}; using deflate:6",
+            kind="startup",
+            extra={"phase": "artifacts_codec_invalid", "error": ARTIFACTS_CODEC_ERROR},
+        )
+
+
+@app.on_event("startup")
+async def _start_disk_janitor_startup() -> None:
+    if DISK_JANITOR_ENABLED:
+        asyncio.create_task(_disk_janitor_loop())
+
+
+@app.on_event("startup")
+async def _resume_journaled_run_startup() -> None:
+    if not RUN_RESUME_ON_STARTUP:
+        _clear_stale_scratch()
+        return
+    try:
+        resumed = _resume_run_from_journal()
+        _clear_stale_scratch(resumed.run_id if resumed else None)
+        if resumed is not None and SCRATCH is not None:
+            _resume_scratch_passes(resumed)
+    except Exception as exc:
+        _log_event(
+            "ERROR",
+            f"run resume from journal failed: {exc}",
+            kind="startup",
+            extra={"phase": "run_resume_error", "error": str(exc)},
+        )
+
+
 @app.on_event("startup")
 async def _announce_online_startup() -> None:
     host, port = _guess_bind_info()
@@ -1541,49 +3937,377 @@ async def _announce_online_startup() -> None:
                 f"max_parallel={MAX_PARALLEL} cpu_cores={CPU_CORES} "
                 f"target={CPU_TARGET_PERCENT}% per_core={PARALLEL_PER_CORE}"
             ),
-        ]
-    )
-    for attempt in range(1, 6):
-        try:
-            await asyncio.to_thread(_telegram_send_message, token, chat_id, msg, 10)
-            print("[telegram] online notify sent")
-            return
-        except Exception as exc:
-            print(f"[telegram] notify failed (attempt {attempt}/5): {exc}")
-            await asyncio.sleep(min(5.0, attempt))
+        ]
+    )
+    for attempt in range(1, 6):
+        try:
+            await IO_POOL.run(_telegram_send_message, token, chat_id, msg, 10)
+            print("[telegram] online notify sent")
+            return
+        except Exception as exc:
+            print(f"[telegram] notify failed (attempt {attempt}/5): {exc}")
+            await asyncio.sleep(min(5.0, attempt))
+
+
+def _get_run_or_404(run_id: str) -> _RunState:
+    with STATE_LOCK:
+        run = CURRENT_RUN
+    if not run or run.run_id != run_id:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
+def _is_busy(run: _RunState | None) -> tuple[bool, int, int]:
+    if not run:
+        return False, 0, 0
+    queued = run.queue.qsize() + len(run.retry_waiting)
+    running = run.in_flight
+    return (queued > 0 or running > 0), queued, running
+
+
+def _max_queue_depth() -> int | None:
+    if MAX_QUEUE_FACTOR <= 0:
+        return None
+    return max(1, MAX_QUEUE_FACTOR * MAX_PARALLEL)
+
+
+def _drain_rate_per_second(run: _RunState | None) -> float | None:
+    if not run:
+        return None
+    horizon = time.monotonic() - DRAIN_RATE_WINDOW_SECONDS
+    with STATE_LOCK:
+        recent = [ts for ts in run.finished_at if ts >= horizon]
+    if len(recent) < 2:
+        return None
+    span = recent[-1] - recent[0]
+    if span <= 0:
+        return None
+    return round((len(recent) - 1) / span, 4)
+
+
+def _assign_retry_after_seconds(run: _RunState, backlog: int) -> int:
+    rate = _drain_rate_per_second(run)
+    if not rate:
+        return ASSIGN_RETRY_AFTER_DEFAULT_SECONDS
+    return max(1, min(ASSIGN_RETRY_AFTER_MAX_SECONDS, int(-(-max(1, backlog) // rate))))
+
+
+def _track_run_proc_start(run: _RunState, proc: subprocess.Popen) -> None:
+    pid = int(proc.pid or 0)
+    if pid <= 0:
+        return
+    with STATE_LOCK:
+        run.active_procs[pid] = proc
+
+
+def _track_run_proc_end(run: _RunState, pid: int) -> None:
+    with STATE_LOCK:
+        run.active_procs.pop(int(pid), None)
+
+
+def _open_run_journal(workdir: Path) -> _AppendOnlyJsonl | None:
+    if not RUN_JOURNAL_ENABLED:
+        return None
+    try:
+        return _AppendOnlyJsonl(workdir / RUN_JOURNAL_FILENAME)
+    except Exception as exc:
+        _log_event(
+            "ERROR",
+            f"run journal unavailable for {workdir.name}: {exc}",
+            kind="run",
+            extra={"run_id": workdir.name, "phase": "journal_open_error", "error": str(exc)},
+        )
+        return None
+
+
+def _open_result_index(workdir: Path) -> _ResultIndex | None:
+    if not RESULT_INDEX_ENABLED:
+        return None
+    try:
+        return _ResultIndex(workdir / RESULT_INDEX_FILENAME)
+    except Exception as exc:
+        _log_event(
+            "ERROR",
+            f"result index unavailable for {workdir.name}: {exc}",
+            kind="run",
+            extra={"run_id": workdir.name, "phase": "result_index_open_error", "error": str(exc)},
+        )
+        return None
+
+
+def _journal_append(run: _RunState, kind: str, **fields: Any) -> None:
+    journal = run.journal
+    if journal is None:
+        return
+    try:
+        journal.append({"t": kind, "ts": now_utc_iso(), **fields})
+    except Exception as exc:
+        _log_event(
+            "WARNING",
+            f"run journal append failed ({kind}): {exc}",
+            kind="run",
+            extra={"run_id": run.run_id, "phase": "journal_append_error", "record": kind, "error": str(exc)},
+        )
+
+
+def _close_run_journal(run: _RunState) -> None:
+    journal = run.journal
+    if journal is None:
+        return
+    try:
+        journal.close()
+    except Exception:
+        pass
+
+
+def _journal_mark_stopped(workdir: Path, reason: str) -> None:
+    try:
+        journal = _AppendOnlyJsonl(workdir / RUN_JOURNAL_FILENAME)
+    except Exception:
+        return
+    try:
+        journal.append({"t": "stop", "ts": now_utc_iso(), "reason": reason})
+    finally:
+        journal.close()
+
+
+def _replay_run_journal(workdir: Path) -> dict[str, Any]:
+    replay: dict[str, Any] = {
+        "started_at_utc": None,
+        "assigned": [],
+        "results": [],
+        "started": set(),
+        "delivered": set(),
+        "leases": {},
+        "stopped": False,
+    }
+    for record in _AppendOnlyJsonl.iter_records(workdir / RUN_JOURNAL_FILENAME):
+        kind = record.get("t")
+        try:
+            if kind == "open":
+                replay["started_at_utc"] = record.get("started_at_utc")
+            elif kind == "assign":
+                for item in record.get("passes") or []:
+                    replay["assigned"].append(PassJob.model_validate(item))
+            elif kind == "start":
+                replay["started"].add(int(record.get("pass_id") or 0))
+            elif kind == "lease":
+                replay["leases"][int(record.get("pass_id") or 0)] = str(record.get("lease_id") or "")
+            elif kind == "result" and record.get("result"):
+                # Journals written before results.jsonl carried the full result.
+                replay["results"].append(PassResult.model_validate(record["result"]))
+            elif kind == "delivered":
+                replay["delivered"].update(int(pid) for pid in record.get("pass_ids") or [])
+            elif kind == "stop":
+                replay["stopped"] = True
+        except Exception:
+            continue
+    return replay
+
+
+def _resume_run_from_journal() -> _RunState | None:
+    global CURRENT_RUN
+    candidates = sorted(
+        [p for p in WORKER_ROOT.glob("run_*") if p.is_dir() and (p / RUN_JOURNAL_FILENAME).exists()],
+        key=lambda p: p.name,
+        reverse=True,
+    )
+    resumed: _RunState | None = None
+    for workdir in candidates:
+        replay = _replay_run_journal(workdir)
+        if replay["stopped"]:
+            continue
+        if resumed is not None:
+            # Only one run can be active: older unfinished journals are closed out.
+            _journal_mark_stopped(workdir, "superseded_on_resume")
+            continue
+
+        algo_path = workdir / "algo.algo"
+        pwd_path = workdir / "pwd.txt"
+        try:
+            config = RunStartRequest.model_validate(json.loads((workdir / "run.json").read_text(encoding="utf-8")))
+            if not algo_path.exists() or not pwd_path.exists():
+                raise RuntimeError("algo.algo or pwd.txt missing from workdir")
+        except Exception as exc:
+            _log_event(
+                "ERROR",
+                f"cannot resume run {workdir.name}: {exc}",
+                kind="startup",
+                extra={"run_id": workdir.name, "phase": "run_resume_error", "error": str(exc)},
+            )
+            _journal_mark_stopped(workdir, "resume_failed")
+            continue
+
+        store = _ResultStore(workdir / RESULTS_SPILL_FILENAME)
+        if not store.load():
+            for result in replay["results"]:
+                store.append(result)
+        completed_counts = Counter(store.pass_ids)
+        queue: asyncio.Queue[PassJob] = asyncio.Queue()
+        requeued_in_flight = 0
+        leases: dict[int, str] = {}
+        pass_states = {pid: "done" for row, pid in enumerate(store.pass_ids) if not store.is_cancelled(row)}
+        for job in replay["assigned"]:
+            pid = int(job.pass_id)
+            if completed_counts[pid] > 0:
+                completed_counts[pid] -= 1
+                continue
+            if pid in replay["started"]:
+                requeued_in_flight += 1
+            if replay["leases"].get(pid):
+                # Still held if the restart beat the TTL; the first heartbeat tells.
+                leases[pid] = replay["leases"][pid]
+            pass_states[pid] = "queued"
+            queue.put_nowait(job)
+
+        run_state = _RunState(
+            run_id=workdir.name,
+            workdir=workdir,
+            started_at_utc=str(replay["started_at_utc"] or now_utc_iso()),
+            config=config,
+            algo_path=algo_path,
+            pwd_path=pwd_path,
+            queue=queue,
+            stop=asyncio.Event(),
+            enqueued_total=len(replay["assigned"]),
+            results=store,
+            leases=leases,
+            pass_states=pass_states,
+        )
+        run_state.journal = _open_run_journal(workdir)
+        run_state.result_index = _open_result_index(workdir)
+        if run_state.result_index is not None and len(store):
+            run_state.result_index.backfill(
+                store.spill_path,  # type: ignore[arg-type]
+                {int(job.pass_id): job.parameters for job in replay["assigned"]},
+            )
+        if run_state.retention is not None:
+            evicted: list[int] = []
+            for _, record in _AppendOnlyJsonl.iter_offsets(store.spill_path):  # type: ignore[arg-type]
+                try:
+                    evicted += run_state.retention.offer(
+                        int(record["pass_id"]), str(record.get("status") or ""), record.get("outcome"), record.get("metrics") or {}
+                    )
+                except Exception:
+                    continue
+            if evicted:
+                asyncio.create_task(
+                    IO_POOL.run(
+                        _evict_pass_artifacts,
+                        workdir,
+                        evicted,
+                        run_state.retention.policy.evicted,
+                        None,
+                        run_state.artifact_codec,
+                    )
+                )
+        _journal_append(run_state, "resume", queued=queue.qsize(), completed=len(store))
+
+        with STATE_LOCK:
+            CURRENT_RUN = run_state
+        _launch_run_tasks(run_state)
+
+        undelivered: list[PassResult] = []
+        if config.callback_url:
+            undelivered = store.read([row for row, pid in enumerate(store.pass_ids) if pid not in replay["delivered"]])
+        if config.callback_url and undelivered:
+            asyncio.create_task(_redeliver_results(run_state, undelivered))
+
+        _log_event(
+            "WARNING",
+            (
+                f"run {run_state.run_id} resumed from journal: completed={len(store)} "
+                f"queued={queue.qsize()} requeued_in_flight={requeued_in_flight} redeliver={len(undelivered) if config.callback_url else 0}"
+            ),
+            kind="startup",
+            extra={
+                "run_id": run_state.run_id,
+                "phase": "run_resume",
+                "completed": len(store),
+                "queued": queue.qsize(),
+                "requeued_in_flight": requeued_in_flight,
+                "redeliver": len(undelivered) if config.callback_url else 0,
+            },
+        )
+        resumed = run_state
+    return resumed
 
 
-def _get_run_or_404(run_id: str) -> _RunState:
-    with STATE_LOCK:
-        run = CURRENT_RUN
-    if not run or run.run_id != run_id:
-        raise HTTPException(status_code=404, detail="Run not found")
-    return run
+async def _redeliver_results(run: _RunState, results: list[PassResult]) -> None:
+    for result in results:
+        if run.callback_queue is not None:
+            await run.callback_queue.put(result)
+            continue
+        if run.config.include_artifacts:
+            pass_dir = _pass_artifact_dir(run, result.pass_id)
+            if pass_dir.exists():
+                try:
+                    artifacts = await IO_POOL.run(zip_dir_to_b64, pass_dir, run.artifact_codec)
+                    result = result.model_copy(
+                        update={"artifacts_zip_b64": artifacts, "artifacts_codec": run.artifact_codec.label}
+                    )
+                except Exception:
+                    pass
+        await _notify_callback(run, result)
 
 
-def _is_busy(run: _RunState | None) -> tuple[bool, int, int]:
-    if not run:
-        return False, 0, 0
-    queued = run.queue.qsize()
-    running = run.in_flight
-    return (queued > 0 or running > 0), queued, running
+def _pass_stop_requested(run: _RunState, pass_id: int) -> Callable[[], bool]:
+    return lambda: run.stop.is_set() or int(pass_id) in run.cancel_requested
 
 
-def _track_run_proc_start(run: _RunState, proc: subprocess.Popen) -> None:
-    pid = int(proc.pid or 0)
-    if pid <= 0:
-        return
-    with STATE_LOCK:
-        run.active_procs[pid] = proc
+def _cancelled_pass_result(run: _RunState, pass_id: int, started_at: Optional[str] = None) -> PassResult:
+    finished_at = now_utc_iso()
+    return PassResult(
+        run_id=run.run_id,
+        pass_id=int(pass_id),
+        status="Skipped",
+        started_at_utc=started_at or finished_at,
+        finished_at_utc=finished_at,
+        metrics={},
+        error="cancelled",
+        outcome="cancelled",
+    )
 
 
-def _track_run_proc_end(run: _RunState, pid: int) -> None:
-    with STATE_LOCK:
-        run.active_procs.pop(int(pid), None)
+def _reorder_run_queue(
+    run: _RunState,
+    *,
+    drop: set[int] | None = None,
+    front: list[int] | None = None,
+) -> tuple[list[PassJob], list[PassJob]]:
+    # Rebuilds the FIFO in place; runs on the event loop thread, so no slot can
+    # dequeue while the queue is temporarily empty.
+    drop = drop or set()
+    front_order = {pid: idx for idx, pid in enumerate(front or [])}
+    kept: list[PassJob] = []
+    dropped: list[PassJob] = []
+    while True:
+        try:
+            job = run.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        try:
+            run.queue.task_done()
+        except Exception:
+            pass
+        if int(job.pass_id) in drop:
+            dropped.append(job)
+        else:
+            kept.append(job)
+    moved = [job for job in kept if int(job.pass_id) in front_order]
+    moved.sort(key=lambda job: front_order[int(job.pass_id)])
+    rest = [job for job in kept if int(job.pass_id) not in front_order]
+    for job in [*moved, *rest]:
+        run.queue.put_nowait(job)
+    return dropped, moved
 
 
 def _drain_run_queue(run: _RunState) -> int:
-    dropped = 0
+    with STATE_LOCK:
+        dropped = len(run.retry_waiting)
+        run.retry_waiting.clear()
+        run.retry_ready.clear()
+        run.retry_history.clear()
     while True:
         try:
             _ = run.queue.get_nowait()
@@ -1624,45 +4348,879 @@ def _terminate_active_processes(run: _RunState) -> int:
 def _release_run_if_idle(run: _RunState) -> bool:
     global CURRENT_RUN
     with STATE_LOCK:
-        queued = run.queue.qsize()
+        queued = run.queue.qsize() + len(run.retry_waiting)
         running = run.in_flight
-        if CURRENT_RUN is run and run.stop.is_set() and queued <= 0 and running <= 0:
+        released = CURRENT_RUN is run and run.stop.is_set() and queued <= 0 and running <= 0
+        if released:
             CURRENT_RUN = None
-            return True
-    return False
+    if released:
+        _close_run_journal(run)
+        run.results.close()
+        if run.result_index is not None:
+            run.result_index.close()
+    return released
+
+
+def _stop_and_unlock_run(run: _RunState, reason: str) -> dict[str, Any]:
+    if not run.stop.is_set():
+        _journal_append(run, "stop", reason=reason)
+    run.stop.set()
+    _shard_signal(run, "stop")
+    dropped = _drain_run_queue(run)
+    killed = _terminate_active_processes(run)
+    released = _release_run_if_idle(run)
+    _log_event(
+        "WARNING",
+        (
+            f"run {run.run_id} stop/unlock reason={reason} "
+            f"dropped={dropped} killed={killed} released={released}"
+        ),
+        kind="run",
+        extra={
+            "run_id": run.run_id,
+            "phase": "unlock",
+            "reason": reason,
+            "dropped": dropped,
+            "killed": killed,
+            "released": released,
+        },
+    )
+    return {"dropped_queued": dropped, "killed_processes": killed, "released": released}
+
+
+def _dir_size_bytes(root: Path) -> int:
+    total = 0
+    stack = [str(root)]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    st = entry.stat(follow_symlinks=False)
+                    total += getattr(st, "st_blocks", 0) * 512 or st.st_size
+            except OSError:
+                continue
+    return total
+
+
+def _workdir_last_used(workdir: Path) -> float:
+    # Directory mtime only moves when top-level entries change; the run files
+    # that are appended to for the whole run tell when it was last active.
+    newest = 0.0
+    for path in (workdir, workdir / RUN_JOURNAL_FILENAME, workdir / RESULTS_SPILL_FILENAME, workdir / RESULT_INDEX_FILENAME):
+        try:
+            newest = max(newest, path.stat().st_mtime)
+        except OSError:
+            continue
+    return newest
+
+
+# Evicts finished run_* and compile_* directories under WORKER_ROOT: first the
+# ones past their age limit, then least recently used ones while free space
+# is below DISK_MIN_FREE_BYTES or WORKER_ROOT is over DISK_QUOTA_BYTES. The
+# current run, anything used within the grace period and every other entry
+# (tmp, caches) are never touched.
+class _DiskJanitor:
+    def __init__(self, root: Path):
+        self.root = root
+        self._lock = threading.Lock()
+        self._sizes: dict[str, tuple[float, int]] = {}
+        self.reclaimed_bytes_total = 0
+        self.evicted_total = 0
+        self.last_run_utc: str | None = None
+        self.last_evicted: deque[dict[str, Any]] = deque(maxlen=20)
+
+    def _size(self, workdir: Path, last_used: float) -> int:
+        cached = self._sizes.get(workdir.name)
+        if cached is not None and cached[0] == last_used:
+            return cached[1]
+        size = _dir_size_bytes(workdir)
+        self._sizes[workdir.name] = (last_used, size)
+        return size
+
+    def _evict(self, workdir: Path, last_used: float, reason: str) -> int:
+        size = self._size(workdir, last_used)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if workdir.exists():
+            return 0
+        self._sizes.pop(workdir.name, None)
+        self.reclaimed_bytes_total += size
+        self.evicted_total += 1
+        self.last_evicted.append({"name": workdir.name, "bytes": size, "reason": reason, "at_utc": now_utc_iso()})
+        _log_event(
+            "WARNING",
+            f"disk janitor removed {workdir.name} ({size} bytes, reason={reason})",
+            kind="app",
+            extra={"phase": "disk_janitor_evict", "name": workdir.name, "bytes": size, "reason": reason},
+        )
+        return size
+
+    def run_once(self, reason: str = "periodic") -> int:
+        with self._lock:
+            with STATE_LOCK:
+                run = CURRENT_RUN
+            protected = run.workdir.resolve() if run else None
+            now = time.time()
+            candidates: list[tuple[float, Path]] = []
+            for path in self.root.iterdir():
+                if not path.name.startswith(("run_", "compile_")) or not path.is_dir():
+                    continue
+                if protected is not None and path.resolve() == protected:
+                    continue
+                last_used = _workdir_last_used(path)
+                if now - last_used < DISK_JANITOR_GRACE_SECONDS:
+                    continue
+                candidates.append((last_used, path))
+            candidates.sort(key=lambda item: item[0])
+
+            reclaimed = 0
+            remaining: list[tuple[float, Path]] = []
+            for last_used, path in candidates:
+                max_age_hours = RUN_DIR_MAX_AGE_HOURS if path.name.startswith("run_") else COMPILE_DIR_MAX_AGE_HOURS
+                if max_age_hours and now - last_used > max_age_hours * 3600.0:
+                    reclaimed += self._evict(path, last_used, "max_age")
+                else:
+                    remaining.append((last_used, path))
+
+            if DISK_MIN_FREE_BYTES:
+                while remaining and shutil.disk_usage(self.root).free < DISK_MIN_FREE_BYTES:
+                    last_used, path = remaining.pop(0)
+                    reclaimed += self._evict(path, last_used, "low_disk")
+            if DISK_QUOTA_BYTES and remaining:
+                used = _dir_size_bytes(self.root)
+                while remaining and used > DISK_QUOTA_BYTES:
+                    last_used, path = remaining.pop(0)
+                    freed = self._evict(path, last_used, "quota")
+                    reclaimed += freed
+                    used -= freed
+            self.last_run_utc = now_utc_iso()
+        if reclaimed:
+            _log_event(
+                "INFO",
+                f"disk janitor ({reason}) reclaimed {reclaimed} bytes",
+                kind="app",
+                extra={"phase": "disk_janitor", "reason": reason, "reclaimed_bytes": reclaimed},
+            )
+        return reclaimed
+
+    def stats(self) -> dict[str, Any]:
+        try:
+            usage = shutil.disk_usage(self.root)
+        except OSError:
+            usage = None
+        out: dict[str, Any] = {
+            "root": str(self.root),
+            "reclaimed_bytes_total": self.reclaimed_bytes_total,
+            "evicted_total": self.evicted_total,
+            "last_run_utc": self.last_run_utc,
+            "last_evicted": list(self.last_evicted),
+            "quota_bytes": DISK_QUOTA_BYTES or None,
+            "min_free_bytes": DISK_MIN_FREE_BYTES or None,
+            "critical_free_bytes": DISK_CRITICAL_FREE_BYTES or None,
+        }
+        if usage is not None:
+            out.update(
+                free_bytes=usage.free,
+                total_bytes=usage.total,
+                free_percent=round(usage.free * 100.0 / usage.total, 2) if usage.total else None,
+                critical=bool(DISK_CRITICAL_FREE_BYTES and usage.free < DISK_CRITICAL_FREE_BYTES),
+            )
+        return out
+
+
+DISK_JANITOR = _DiskJanitor(WORKER_ROOT)
+
+
+async def _disk_janitor_loop() -> None:
+    while True:
+        try:
+            await IO_POOL.run(DISK_JANITOR.run_once, "periodic")
+        except Exception as exc:
+            _log_event(
+                "ERROR",
+                f"disk janitor failed: {exc}",
+                kind="app",
+                extra={"phase": "disk_janitor_error", "error": str(exc)},
+            )
+        await asyncio.sleep(DISK_JANITOR_INTERVAL_SECONDS)
+
+
+# Admission and accounting for the scratch tier. Usage is measured on the
+# scratch root itself, so slot supervisor processes share one budget; the
+# expected size of the next pass is a moving average of finished ones.
+class _ScratchTier:
+    def __init__(self, root: Path, budget_bytes: int):
+        self.root = root
+        self.budget_bytes = max(0, int(budget_bytes))
+        self._lock = threading.Lock()
+        self.expected_pass_bytes = 4 * 1024 * 1024
+        self.admitted_total = 0
+        self.fallback_total = 0
+        self.persisted_total = 0
+        self.persisted_bytes_total = 0
+
+    def run_dir(self, run_id: str) -> Path:
+        return self.root / run_id
+
+    def admit(self) -> bool:
+        with self._lock:
+            expected = self.expected_pass_bytes
+        try:
+            ensure_dir(self.root)
+            ok = (
+                _dir_size_bytes(self.root) + expected <= self.budget_bytes
+                and shutil.disk_usage(self.root).free >= 2 * expected
+            )
+        except OSError:
+            ok = False
+        with self._lock:
+            if ok:
+                self.admitted_total += 1
+            else:
+                self.fallback_total += 1
+        return ok
+
+    def observe(self, pass_bytes: int) -> None:
+        with self._lock:
+            self.expected_pass_bytes = int(0.8 * self.expected_pass_bytes + 0.2 * max(0, int(pass_bytes)))
+
+    def stats(self) -> dict[str, Any]:
+        try:
+            used = _dir_size_bytes(self.root)
+        except OSError:
+            used = None
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": used,
+                "expected_pass_bytes": self.expected_pass_bytes,
+                "admitted_total": self.admitted_total,
+                "fallback_total": self.fallback_total,
+                "persisted_total": self.persisted_total,
+                "persisted_bytes_total": self.persisted_bytes_total,
+            }
+
+
+SCRATCH = _ScratchTier(SCRATCH_ROOT, SCRATCH_BUDGET_BYTES) if SCRATCH_ROOT is not None else None
+
+
+# Coordination inside SHARED_DATA_DIR: history/ is what the CLI cache links to,
+# locks/ holds one flock file per symbol and data mode (taken exclusively to
+# download, shared to read), and index.json lists the date ranges already
+# fetched by any worker. The index is replaced atomically, so readers of the
+# index do not take the lock.
+class _SharedDataCache:
+    def __init__(self, root: Path, cli_cache_dir: Path):
+        self.root = root
+        self.history_dir = root / "history"
+        self.locks_dir = root / "locks"
+        self.index_path = root / "index.json"
+        self.cli_cache_dir = cli_cache_dir
+        self._lock = threading.Lock()
+        self.attached = False
+        self.attach_error: str | None = None
+        self.hits_total = 0
+        self.fetches_total = 0
+        self.lock_waits_total = 0
+        self.lock_wait_seconds_total = 0.0
+
+    def attach(self) -> None:
+        link = self.cli_cache_dir
+        try:
+            ensure_dir(self.history_dir)
+            ensure_dir(self.locks_dir)
+            if link.is_symlink():
+                if link.resolve() == self.history_dir.resolve():
+                    self.attached = True
+                    return
+                link.unlink()
+            elif link.is_dir():
+                # Keep what this container downloaded before the cache was shared.
+                with self.lock("attach"):
+                    for child in link.iterdir():
+                        if not (self.history_dir / child.name).exists():
+                            shutil.move(str(child), str(self.history_dir / child.name))
+                shutil.rmtree(link, ignore_errors=True)
+            ensure_dir(link.parent)
+            link.symlink_to(self.history_dir, target_is_directory=True)
+            self.attached = True
+            self.attach_error = None
+        except OSError as exc:
+            self.attach_error = str(exc)
+
+    def acquire(
+        self,
+        name: str,
+        shared: bool = False,
+        stop_requested: Optional[Callable[[], bool]] = None,
+        timeout_seconds: float | None = None,
+    ) -> IO[str]:
+        # Returns the open lock file; closing it (release) drops the flock, which
+        # belongs to the open file and so also excludes other threads here.
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+        timeout = SHARED_DATA_LOCK_TIMEOUT_SECONDS if timeout_seconds is None else float(timeout_seconds)
+        ensure_dir(self.locks_dir)
+        started = time.monotonic()
+
+        def _flock(fh: IO[str], mode: int) -> bool:
+            waited = False
+            while True:
+                try:
+                    fcntl.flock(fh.fileno(), mode | fcntl.LOCK_NB)
+                    return waited
+                except BlockingIOError:
+                    waited = True
+                    if stop_requested and stop_requested():
+                        raise InterruptedError(f"stopped while waiting for shared data lock {safe_name}")
+                    if time.monotonic() - started >= timeout:
+                        raise TimeoutError(f"shared data lock {safe_name} still held after {int(timeout)}s")
+                    time.sleep(0.5)
+
+        # Everyone passes the gate, and a writer holds it while it waits: a
+        # steady stream of readers cannot starve a download.
+        with open(self.locks_dir / f"{safe_name}.gate", "a+") as gate:
+            waited = _flock(gate, fcntl.LOCK_EX)
+            fh = open(self.locks_dir / f"{safe_name}.lock", "a+")
+            try:
+                waited = _flock(fh, fcntl.LOCK_SH if shared else fcntl.LOCK_EX) or waited
+            except BaseException:
+                fh.close()
+                raise
+        if waited:
+            with self._lock:
+                self.lock_waits_total += 1
+                self.lock_wait_seconds_total += time.monotonic() - started
+        return fh
+
+    @staticmethod
+    def release(fh: IO[str]) -> None:
+        fh.close()
+
+    @contextmanager
+    def lock(
+        self,
+        name: str,
+        stop_requested: Optional[Callable[[], bool]] = None,
+        timeout_seconds: float | None = None,
+        shared: bool = False,
+    ):
+        fh = self.acquire(name, shared=shared, stop_requested=stop_requested, timeout_seconds=timeout_seconds)
+        try:
+            yield
+        finally:
+            self.release(fh)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _coverage(self) -> dict[str, Any]:
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        coverage = data.get("coverage") if isinstance(data, dict) else None
+        return coverage if isinstance(coverage, dict) else {}
+
+    @staticmethod
+    def _span(start: str, end: str) -> tuple[str, str] | None:
+        lo, hi = _parse_sim_time(start), _parse_sim_time(end)
+        if lo is None or hi is None:
+            return None
+        return lo.date().isoformat(), hi.date().isoformat()
+
+    def covered(self, symbol: str, data_mode: str, start: str, end: str) -> bool:
+        span = self._span(start, end)
+        entry = self._coverage().get(f"{symbol.upper()}|{data_mode}")
+        if span is None or not isinstance(entry, dict):
+            return False
+        return any(lo <= span[0] and span[1] <= hi for lo, hi in entry.get("ranges") or [])
+
+    def record(self, symbol: str, data_mode: str, start: str, end: str) -> None:
+        span = self._span(start, end)
+        if span is None:
+            return
+        key = f"{symbol.upper()}|{data_mode}"
+        with self.lock("index"):
+            coverage = self._coverage()
+            entry = coverage.get(key) if isinstance(coverage.get(key), dict) else {}
+            merged: list[list[str]] = []
+            for lo, hi in sorted([tuple(r) for r in entry.get("ranges") or []] + [span]):
+                if merged and lo <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], hi)
+                else:
+                    merged.append([lo, hi])
+            coverage[key] = {
+                "symbol": symbol.upper(),
+                "data_mode": data_mode,
+                "ranges": merged,
+                "updated_at": now_utc_iso(),
+                "updated_by": WORKER_ID,
+            }
+            tmp = self.index_path.with_name(f".index.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps({"coverage": coverage}, indent=1), encoding="utf-8")
+            os.replace(tmp, self.index_path)
+
+    def stats(self) -> dict[str, Any]:
+        coverage = sorted(
+            (v for v in self._coverage().values() if isinstance(v, dict)),
+            key=lambda v: (str(v.get("symbol")), str(v.get("data_mode"))),
+        )
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "cli_cache_dir": str(self.cli_cache_dir),
+                "attached": self.attached,
+                "attach_error": self.attach_error,
+                "hits_total": self.hits_total,
+                "fetches_total": self.fetches_total,
+                "lock_waits_total": self.lock_waits_total,
+                "lock_wait_seconds_total": round(self.lock_wait_seconds_total, 3),
+                "coverage": coverage,
+            }
+
+
+SHARED_DATA = (
+    _SharedDataCache(SHARED_DATA_DIR, CLI_HISTORY_CACHE_DIR)
+    if SHARED_DATA_DIR is not None and fcntl is not None
+    else None
+)
+
+
+def _pass_work_dir(run: _RunState, pass_id: int) -> Path:
+    persistent = run.workdir / str(int(pass_id))
+    if SCRATCH is None:
+        return persistent
+    scratch = SCRATCH.run_dir(run.run_id) / str(int(pass_id))
+    # A retry continues in whichever tier the first attempt used.
+    if scratch.is_dir():
+        return scratch
+    if persistent.is_dir():
+        return persistent
+    return scratch if SCRATCH.admit() else persistent
+
+
+def _pass_artifact_dir(run: _RunState, pass_id: int) -> Path:
+    persistent = run.workdir / str(int(pass_id))
+    if SCRATCH is None or persistent.is_dir():
+        return persistent
+    scratch = SCRATCH.run_dir(run.run_id) / str(int(pass_id))
+    return scratch if scratch.is_dir() else persistent
+
+
+def _persist_scratch_pass(run: _RunState, pass_id: int) -> None:
+    pid = int(pass_id)
+    src = SCRATCH.run_dir(run.run_id) / str(pid)  # type: ignore[union-attr]
+    dst = run.workdir / str(pid)
+    try:
+        if src.is_dir() and (run.retention is None or run.retention.keeps(pid)):
+            # Copy next to the target and rename, so readers only ever see a complete directory.
+            partial = run.workdir / f".{pid}.partial"
+            shutil.rmtree(partial, ignore_errors=True)
+            shutil.copytree(src, partial)
+            shutil.rmtree(dst, ignore_errors=True)
+            partial.rename(dst)
+            size = _dir_size_bytes(dst)
+            with SCRATCH._lock:  # type: ignore[union-attr]
+                SCRATCH.persisted_total += 1  # type: ignore[union-attr]
+                SCRATCH.persisted_bytes_total += size  # type: ignore[union-attr]
+        shutil.rmtree(src, ignore_errors=True)
+    finally:
+        with STATE_LOCK:
+            run.scratch_pending.discard(pid)
+    if run.retention is not None and not run.retention.keeps(pid):
+        # Fell out of the top-K while it was being copied.
+        _evict_pass_artifacts(run.workdir, [pid], run.retention.policy.evicted, None, run.artifact_codec)
+
+
+async def _persist_scratch_pass_task(run: _RunState, pass_id: int) -> None:
+    try:
+        await IO_POOL.run(_persist_scratch_pass, run, pass_id)
+    except Exception as exc:
+        _log_event(
+            "ERROR",
+            f"persisting scratch directory of pass {pass_id} failed: {exc}",
+            kind="run",
+            extra={"run_id": run.run_id, "pass_id": pass_id, "phase": "scratch_persist_error", "error": str(exc)},
+        )
+
+
+def _resume_scratch_passes(run: _RunState) -> None:
+    # Finished passes left in scratch by the previous process still get
+    # persisted; unfinished ones are rerun from scratch anyway.
+    scratch_run = SCRATCH.run_dir(run.run_id)  # type: ignore[union-attr]
+    if not scratch_run.is_dir():
+        return
+    for path in scratch_run.iterdir():
+        if not path.name.isdigit() or not path.is_dir():
+            continue
+        pid = int(path.name)
+        if run.pass_states.get(pid) == "done":
+            with STATE_LOCK:
+                run.scratch_pending.add(pid)
+            asyncio.create_task(_persist_scratch_pass_task(run, pid))
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _clear_stale_scratch(keep_run_id: str | None = None) -> None:
+    if SCRATCH is None or not SCRATCH.root.is_dir():
+        return
+    for path in SCRATCH.root.iterdir():
+        if path.name != keep_run_id and path.name.startswith("run_"):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# Optional process sharding: slots run in child supervisor processes that own
+# their patched hosts and do the per-pass work (backtest, report parsing,
+# zipping) under their own GIL. Slot i maps to shard i % SLOT_PROCESSES; the
+# API process keeps the queue, journal and callbacks and gets compact results
+# back over a pipe.
+class _SlotShard:
+    def __init__(self, index: int):
+        self.index = index
+        self.proc: Any = None
+        self.conn: Any = None
+        self.restarts = -1
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pending: dict[int, Future] = {}
+        self._seq = 0
+        # (run_id, slot) -> run snapshot of every open slot, replayed into a restarted child.
+        self._open_slots: dict[tuple[str, int], dict[str, Any]] = {}
+
+    def start(self) -> None:
+        with self._lock:
+            self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self.proc is not None and self.proc.is_alive():
+            return
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe(duplex=True)
+        proc = ctx.Process(
+            target=_slot_supervisor_main,
+            args=(self.index, child_conn),
+            name=f"optimo-slot-shard-{self.index}",
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        self.proc, self.conn = proc, parent_conn
+        self._pending = {}
+        self.restarts += 1
+        threading.Thread(target=self._reader, args=(proc, parent_conn, self._pending), daemon=True).start()
+        for (_, slot), snap in list(self._open_slots.items()):
+            # Sent before any later request, so the child knows the slot by the time an exec arrives.
+            self._seq += 1
+            self._pending[self._seq] = Future()
+            with self._send_lock:
+                parent_conn.send(("open_slot", self._seq, {"run": snap, "slot": slot}))
+        _log_event(
+            "INFO",
+            f"slot shard {self.index} started (pid={proc.pid}, reopened_slots={len(self._open_slots)})",
+            kind="app",
+            extra={"phase": "slot_shard_started", "shard": self.index, "pid": proc.pid, "restarts": self.restarts},
+        )
+
+    def request(self, op: str, **fields: Any) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            if op == "open_slot":
+                self._open_slots[(str(fields["run"]["run_id"]), int(fields["slot"]))] = fields["run"]
+            self._ensure_started()
+            self._seq += 1
+            req_id = self._seq
+            pending = self._pending
+            pending[req_id] = fut
+            conn = self.conn
+        try:
+            with self._send_lock:
+                conn.send((op, req_id, fields))
+        except Exception as exc:
+            with self._lock:
+                pending.pop(req_id, None)
+            if not fut.done():
+                fut.set_exception(RuntimeError(f"slot shard {self.index} send failed: {exc}"))
+        return fut
+
+    def signal(self, op: str, **fields: Any) -> None:
+        with self._lock:
+            if op == "close_slot":
+                self._open_slots.pop((str(fields.get("run_id") or ""), int(fields.get("slot", -1))), None)
+            conn = self.conn if self.proc is not None and self.proc.is_alive() else None
+        if conn is None:
+            return
+        try:
+            with self._send_lock:
+                conn.send((op, 0, fields))
+        except Exception:
+            pass
+
+    def _reader(self, proc: Any, conn: Any, pending: dict[int, Future]) -> None:
+        while True:
+            try:
+                kind, req_id, payload = conn.recv()
+            except Exception:
+                break
+            if kind == "log":
+                _ingest_log_entry(payload)
+                continue
+            if kind == "progress":
+                _ingest_pass_progress(*payload)
+                continue
+            with self._lock:
+                fut = pending.pop(req_id, None)
+            if fut is None or fut.done():
+                continue
+            if kind == "error":
+                fut.set_exception(RuntimeError(str(payload)))
+            else:
+                fut.set_result(payload)
+        proc.join(timeout=1)
+        with self._lock:
+            failed = list(pending.values())
+            pending.clear()
+            if self.proc is proc:
+                self.proc, self.conn = None, None
+        for fut in failed:
+            if not fut.done():
+                fut.set_exception(RuntimeError(f"slot shard {self.index} exited (exitcode={proc.exitcode})"))
+        _log_event(
+            "WARNING" if failed else "INFO",
+            f"slot shard {self.index} exited (exitcode={proc.exitcode}, failed_requests={len(failed)})",
+            kind="app",
+            extra={"phase": "slot_shard_exited", "shard": self.index, "exitcode": proc.exitcode, "failed": len(failed)},
+        )
+
+    def shutdown(self) -> None:
+        self.signal("shutdown")
+        with self._lock:
+            proc = self.proc
+        if proc is not None:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            alive = self.proc is not None and self.proc.is_alive()
+            return {
+                "index": self.index,
+                "alive": alive,
+                "pid": self.proc.pid if alive else None,
+                "pending": len(self._pending),
+                "restarts": max(0, self.restarts),
+            }
+
+
+SLOT_SHARDS: list[_SlotShard] = [_SlotShard(i) for i in range(SLOT_PROCESSES)]
+
+
+def _shard_for_slot(worker_index: int) -> _SlotShard | None:
+    if not SLOT_SHARDS:
+        return None
+    return SLOT_SHARDS[int(worker_index) % len(SLOT_SHARDS)]
+
+
+def _shard_signal(run: _RunState, op: str, **fields: Any) -> None:
+    for shard in SLOT_SHARDS:
+        shard.signal(op, run_id=run.run_id, **fields)
+
+
+def _shard_run_snapshot(run: _RunState) -> dict[str, Any]:
+    return {
+        "run_id": run.run_id,
+        "workdir": str(run.workdir),
+        "started_at_utc": run.started_at_utc,
+        "config": run.config.model_dump(),
+        "algo_path": str(run.algo_path),
+        "pwd_path": str(run.pwd_path),
+        # Spawned children never run the startup hook that links the cache.
+        "shared_data_attached": bool(SHARED_DATA is not None and SHARED_DATA.attached),
+    }
+
+
+async def _shard_execute(shard: _SlotShard, run: _RunState, job: PassJob, worker_index: int) -> PassResult | _PassRetry:
+    with STATE_LOCK:
+        history = run.retry_history.get(int(job.pass_id)) or {}
+        diagnostics = list(history.get("diagnostics") or [])
+    kind, payload = await asyncio.wrap_future(
+        shard.request(
+            "exec",
+            run_id=run.run_id,
+            slot=int(worker_index),
+            job=job.model_dump(),
+            diagnostics=diagnostics,
+        )
+    )
+    if kind == "retry":
+        return _PassRetry(**payload)
+    return PassResult(**payload)
+
+
+def _slot_supervisor_main(shard_index: int, conn: Any) -> None:
+    global _LOG_FORWARD, _PROGRESS_FORWARD
+    send_lock = threading.Lock()
+    state_lock = threading.Lock()
+    runs: dict[str, _RunState] = {}
+    open_slots: dict[str, set[int]] = {}
+    clients: dict[tuple[str, int], _PatchedCliClient] = {}
+    # Set once the matching open_slot finished; an exec for that slot waits on it.
+    opening: dict[tuple[str, int], threading.Event] = {}
+
+    def _send(kind: str, req_id: int, payload: Any) -> None:
+        with send_lock:
+            try:
+                conn.send((kind, req_id, payload))
+            except Exception:
+                pass
+
+    def _forward_log(entry: dict[str, Any]) -> None:
+        extra = entry.setdefault("extra", {})
+        if isinstance(extra, dict):
+            extra.setdefault("shard", shard_index)
+        _send("log", 0, entry)
+
+    _LOG_FORWARD = _forward_log
+    _PROGRESS_FORWARD = lambda run_id, snapshot: _send("progress", 0, (run_id, snapshot))  # noqa: E731
+
+    def _open_slot(req_id: int, fields: dict[str, Any]) -> None:
+        snap = fields["run"]
+        slot = int(fields["slot"])
+        try:
+            with state_lock:
+                run = runs.get(snap["run_id"])
+                if run is None:
+                    run = _RunState(
+                        run_id=snap["run_id"],
+                        workdir=Path(snap["workdir"]),
+                        started_at_utc=snap["started_at_utc"],
+                        config=RunStartRequest(**snap["config"]),
+                        algo_path=Path(snap["algo_path"]),
+                        pwd_path=Path(snap["pwd_path"]),
+                        queue=asyncio.Queue(),
+                        stop=asyncio.Event(),
+                    )
+                    runs[run.run_id] = run
+                open_slots.setdefault(run.run_id, set()).add(slot)
+                if SHARED_DATA is not None:
+                    SHARED_DATA.attached = bool(snap.get("shared_data_attached"))
+            if CUSTOM_CLI_PATCHED and (run.run_id, slot) not in clients:
+                clients[(run.run_id, slot)] = _create_patched_cli_client(run, slot)
+            _send("result", req_id, True)
+        except Exception as exc:
+            _send("error", req_id, str(exc))
+
+    def _exec(req_id: int, fields: dict[str, Any]) -> None:
+        opened = opening.get((str(fields["run_id"]), int(fields["slot"])))
+        if opened is not None:
+            opened.wait()
+        run = runs.get(fields["run_id"])
+        if run is None:
+            _send("error", req_id, f"run {fields['run_id']} not open in slot shard {shard_index}")
+            return
+        job = PassJob(**fields["job"])
+        pid = int(job.pass_id)
+        slot = int(fields["slot"])
+        try:
+            if fields.get("diagnostics"):
+                run.retry_history[pid] = {"diagnostics": list(fields["diagnostics"])}
+            out = _execute_pass_job(run, job, slot, clients.get((run.run_id, slot)))
+        except Exception as exc:
+            _send("error", req_id, str(exc))
+            return
+        finally:
+            run.retry_history.pop(pid, None)
+            run.cancel_requested.discard(pid)
+        if isinstance(out, _PassRetry):
+            _send("result", req_id, ("retry", asdict(out)))
+        else:
+            _send("result", req_id, ("pass", out.model_dump()))
+
+    def _close_slot(fields: dict[str, Any]) -> None:
+        run_id = str(fields.get("run_id") or "")
+        opening.pop((run_id, int(fields.get("slot", -1))), None)
+        client = clients.pop((run_id, int(fields.get("slot", -1))), None)
+        if client is not None:
+            client.close()
+        with state_lock:
+            slots = open_slots.get(run_id)
+            if slots is not None:
+                slots.discard(int(fields.get("slot", -1)))
+                if not slots:
+                    open_slots.pop(run_id, None)
+                    runs.pop(run_id, None)
+
+    while True:
+        try:
+            op, req_id, fields = conn.recv()
+        except Exception:
+            break
+        if op == "shutdown":
+            break
+        if op == "open_slot":
+            opened = opening[(str(fields["run"]["run_id"]), int(fields["slot"]))] = threading.Event()
+
+            def _open_and_mark(req_id: int = req_id, fields: dict[str, Any] = fields, opened: threading.Event = opened) -> None:
+                try:
+                    _open_slot(req_id, fields)
+                finally:
+                    opened.set()
+
+            threading.Thread(target=_open_and_mark, daemon=True).start()
+        elif op == "exec":
+            threading.Thread(target=_exec, args=(req_id, fields), daemon=True).start()
+        elif op == "close_slot":
+            _close_slot(fields)
+        elif op in {"cancel", "stop"}:
+            run = runs.get(str(fields.get("run_id") or ""))
+            if run is None:
+                continue
+            if op == "cancel":
+                run.cancel_requested.update(int(pid) for pid in fields.get("pass_ids") or [])
+            else:
+                run.stop.set()
+                _terminate_active_processes(run)
+
+    for run in list(runs.values()):
+        run.stop.set()
+        _terminate_active_processes(run)
+    for client in list(clients.values()):
+        try:
+            client.close()
+        except Exception:
+            pass
 
 
-def _stop_and_unlock_run(run: _RunState, reason: str) -> dict[str, Any]:
-    run.stop.set()
-    dropped = _drain_run_queue(run)
-    killed = _terminate_active_processes(run)
-    released = _release_run_if_idle(run)
-    _log_event(
-        "WARNING",
-        (
-            f"run {run.run_id} stop/unlock reason={reason} "
-            f"dropped={dropped} killed={killed} released={released}"
-        ),
-        kind="run",
-        extra={
-            "run_id": run.run_id,
-            "phase": "unlock",
-            "reason": reason,
-            "dropped": dropped,
-            "killed": killed,
-            "released": released,
-        },
-    )
-    return {"dropped_queued": dropped, "killed_processes": killed, "released": released}
+async def _wait_for_warmup(run: _RunState) -> None:
+    while run.warmup_done is not None and not run.warmup_done.is_set() and not run.stop.is_set():
+        try:
+            await asyncio.wait_for(run.warmup_done.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            continue
 
 
 async def _process_loop(run: _RunState, worker_index: int) -> None:
     cli_client: _PatchedCliClient | None = None
-    if CUSTOM_CLI_PATCHED:
+    shard = _shard_for_slot(worker_index)
+    if shard is not None or CUSTOM_CLI_PATCHED:
         try:
-            cli_client = _create_patched_cli_client(run, worker_index)
+            if shard is not None:
+                await asyncio.wrap_future(shard.request("open_slot", run=_shard_run_snapshot(run), slot=worker_index))
+            else:
+                cli_client = _create_patched_cli_client(run, worker_index)
         except Exception as exc:
+            if not run.stop.is_set():
+                _journal_append(run, "stop", reason="patched_cli_init_error")
             run.stop.set()
+            _shard_signal(run, "stop")
             dropped = _drain_run_queue(run)
             _log_event(
                 "ERROR",
@@ -1679,17 +5237,34 @@ async def _process_loop(run: _RunState, worker_index: int) -> None:
             return
 
     try:
+        # Slot 0 leads: its first pass is the warm-up the other slots wait for.
+        if worker_index != 0:
+            await _wait_for_warmup(run)
         while not run.stop.is_set():
-            try:
-                job = await asyncio.wait_for(run.queue.get(), timeout=0.5)
-            except asyncio.TimeoutError:
-                continue
+            job = _take_ready_retry(run, worker_index)
+            from_queue = job is None
+            if job is None:
+                try:
+                    job = await asyncio.wait_for(run.queue.get(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
             if run.stop.is_set():
-                run.queue.task_done()
+                if from_queue:
+                    run.queue.task_done()
                 break
+            if job.pass_id in run.lost_leases:
+                with STATE_LOCK:
+                    run.lost_leases.discard(job.pass_id)
+                    run.pass_states.pop(int(job.pass_id), None)
+                if from_queue:
+                    run.queue.task_done()
+                continue
 
             with STATE_LOCK:
                 run.in_flight += 1
+                run.running_passes[int(job.pass_id)] = worker_index
+                run.pass_states[int(job.pass_id)] = "running"
+            _journal_append(run, "start", pass_id=job.pass_id, worker_slot=worker_index)
 
             started_at = now_utc_iso()
             started_perf = time.perf_counter()
@@ -1699,8 +5274,16 @@ async def _process_loop(run: _RunState, worker_index: int) -> None:
                 kind="run",
                 extra={"run_id": run.run_id, "pass_id": job.pass_id, "worker_slot": worker_index, "phase": "started"},
             )
+            warmup_watch = (
+                asyncio.create_task(_watch_warmup_pass(run, int(job.pass_id)))
+                if run.warmup_done is not None and not run.warmup_done.is_set()
+                else None
+            )
             try:
-                result = await asyncio.to_thread(_execute_pass_job, run, job, worker_index, cli_client)
+                if shard is not None:
+                    result = await _shard_execute(shard, run, job, worker_index)
+                else:
+                    result = await SLOT_POOL.run(_execute_pass_job, run, job, worker_index, cli_client)
             except Exception as exc:
                 result = PassResult(
                     run_id=run.run_id,
@@ -1716,14 +5299,42 @@ async def _process_loop(run: _RunState, worker_index: int) -> None:
                     error_detail=str(exc),
                     log_tail=None,
                 )
+            if warmup_watch is not None:
+                warmup_watch.cancel()
+                _finish_warmup(run, int(job.pass_id), "stopped" if run.stop.is_set() else "pass_finished")
             elapsed_total = round(max(0.0, time.perf_counter() - started_perf), 3)
+            with STATE_LOCK:
+                cancelled = int(job.pass_id) in run.cancel_requested
+                run.cancel_requested.discard(int(job.pass_id))
+                run.running_passes.pop(int(job.pass_id), None)
+                run.pass_progress.pop(int(job.pass_id), None)
+            if isinstance(result, _PassRetry):
+                if run.stop.is_set():
+                    result = _retry_abandoned_result(run, job.pass_id, result)
+                elif cancelled:
+                    result = _cancelled_pass_result(run, job.pass_id)
+                else:
+                    # Hand the retry back to the scheduler; this slot moves on.
+                    _schedule_pass_retry(run, job, result, started_at, started_perf)
+                    with STATE_LOCK:
+                        run.in_flight -= 1
+                    if from_queue:
+                        run.queue.task_done()
+                    continue
+            elif cancelled and result.status != "Completed" and not run.stop.is_set():
+                result = _cancelled_pass_result(run, job.pass_id)
+            with STATE_LOCK:
+                history = run.retry_history.pop(int(job.pass_id), None)
+            if history:
+                started_at = str(history.get("started_at") or started_at)
+                elapsed_total = round(max(0.0, time.perf_counter() - float(history["started_perf"])), 3)
             result.started_at_utc = started_at
             result.finished_at_utc = now_utc_iso()
             result.elapsed_seconds_total = elapsed_total
 
             with STATE_LOCK:
-                run.results.append(result)
                 run.in_flight -= 1
+                run.finished_at.append(time.monotonic())
 
             _log_event(
                 "INFO" if result.status == "Completed" else "ERROR",
@@ -1741,24 +5352,174 @@ async def _process_loop(run: _RunState, worker_index: int) -> None:
                 },
             )
 
-            run.queue.task_done()
+            if from_queue:
+                run.queue.task_done()
+            await _publish_pass_result(run, result, job.parameters)
             if run.stop.is_set():
                 _release_run_if_idle(run)
-
-            if run.callback_queue is not None:
-                await run.callback_queue.put(result)
-            elif run.config.callback_url:
-                asyncio.create_task(_notify_callback(run, result))
     finally:
         if cli_client:
             cli_client.close()
+        if shard is not None:
+            shard.signal("close_slot", run_id=run.run_id, slot=worker_index)
         _release_run_if_idle(run)
 
 
-async def _notify_callback(run: _RunState, result: PassResult) -> None:
+def _stored_pass_result(run: _RunState, pass_id: int) -> PassResult | None:
+    row = run.results.row_of(pass_id)
+    if row is None:
+        return None
+    try:
+        return run.results.get(row)
+    except Exception:
+        return None
+
+
+def _schedule_pass_retry(
+    run: _RunState,
+    job: PassJob,
+    retry: _PassRetry,
+    started_at: str,
+    started_perf: float,
+) -> None:
+    pid = int(job.pass_id)
+    with STATE_LOCK:
+        history = run.retry_history.setdefault(
+            pid,
+            {"started_at": started_at, "started_perf": started_perf, "diagnostics": []},
+        )
+        history["diagnostics"].append(dict(retry.diagnostics))
+        run.retry_waiting[pid] = (job, int(retry.slot) if retry.slot is not None else -1)
+        run.pass_states[pid] = "queued"
+    asyncio.get_running_loop().call_later(max(0.0, float(retry.delay_seconds)), _retry_due, run, pid)
+
+
+def _retry_due(run: _RunState, pass_id: int) -> None:
+    with STATE_LOCK:
+        entry = run.retry_waiting.get(int(pass_id))
+        if entry is None or run.stop.is_set():
+            return
+        run.retry_ready.setdefault(entry[1], deque()).append(int(pass_id))
+
+
+def _take_ready_retry(run: _RunState, worker_index: int) -> PassJob | None:
+    if not run.retry_waiting:
+        return None
+    with STATE_LOCK:
+        for key in (int(worker_index), -1):
+            ready = run.retry_ready.get(key)
+            while ready:
+                entry = run.retry_waiting.pop(ready.popleft(), None)
+                if entry is not None:
+                    return entry[0]
+    return None
+
+
+def _retry_abandoned_result(run: _RunState, pass_id: int, retry: _PassRetry) -> PassResult:
+    diagnostics = retry.diagnostics
+    finished_at = now_utc_iso()
+    return PassResult(
+        run_id=run.run_id,
+        pass_id=int(pass_id),
+        status="Failed",
+        started_at_utc=finished_at,
+        finished_at_utc=finished_at,
+        metrics={},
+        error="report_missing_or_invalid",
+        outcome=diagnostics.get("outcome"),
+        error_detail=diagnostics.get("error_detail") or "report_missing_or_invalid",
+        log_tail=diagnostics.get("log_tail"),
+    )
+
+
+async def _publish_pass_result(
+    run: _RunState,
+    result: PassResult,
+    parameters: dict[str, Any] | None = None,
+) -> None:
+    pid = int(result.pass_id)
+    run.results.append(result, parameters)
+    if run.result_index is not None:
+        run.result_index.add(result, parameters)
+    attach_artifacts = False
+    if run.retention is not None:
+        # Eviction and the artifact zip run in the background; the slot moves on.
+        _apply_artifact_retention(run, result)
+        attach_artifacts = bool(
+            run.config.include_artifacts
+            and run.config.callback_url
+            and run.callback_queue is None
+            and run.retention.keeps(pid)
+        )
+    if SCRATCH is not None and (SCRATCH.run_dir(run.run_id) / str(pid)).is_dir():
+        with STATE_LOCK:
+            run.scratch_pending.add(pid)
+        asyncio.create_task(_persist_scratch_pass_task(run, pid))
+    with STATE_LOCK:
+        if result.outcome == "cancelled":
+            # A cancelled pass may legitimately be assigned again later.
+            run.pass_states.pop(pid, None)
+        else:
+            run.pass_states[pid] = "done"
+    # The full result lives in the results spill file; resume reads it from there.
+    _journal_append(run, "result", pass_id=pid, status=result.status, outcome=result.outcome)
+    if run.capacity_event is not None:
+        run.capacity_event.set()
+    if run.leases:
+        asyncio.create_task(_lease_complete(run, result))
+
+    if run.callback_queue is not None:
+        await run.callback_queue.put(result)
+    elif run.config.callback_url:
+        asyncio.create_task(_notify_callback(run, result, attach_artifacts))
+
+
+def _apply_artifact_retention(run: _RunState, result: PassResult) -> None:
+    retention = run.retention
+    if retention is None:
+        return
+    evicted = retention.offer(result.pass_id, result.status, result.outcome, result.metrics or {})
+    with STATE_LOCK:
+        # Directories still being persisted are checked again once the copy is done.
+        evicted = [pid for pid in evicted if pid not in run.scratch_pending]
+    if evicted:
+        asyncio.create_task(_evict_pass_artifacts_task(run, evicted))
+
+
+async def _evict_pass_artifacts_task(run: _RunState, evicted: list[int]) -> None:
+    retention = run.retention
+    if retention is None:
+        return
+    scratch_dir = SCRATCH.run_dir(run.run_id) if SCRATCH is not None else None
+    try:
+        await IO_POOL.run(
+            _evict_pass_artifacts, run.workdir, evicted, retention.policy.evicted, scratch_dir, run.artifact_codec
+        )
+    except Exception as exc:
+        _log_event(
+            "ERROR",
+            f"artifact eviction failed for passes {evicted[:5]}: {exc}",
+            kind="run",
+            extra={"run_id": run.run_id, "phase": "artifact_eviction_error", "pass_ids": evicted[:50], "error": str(exc)},
+        )
+
+
+async def _notify_callback(run: _RunState, result: PassResult, attach_artifacts: bool = False) -> None:
+    if attach_artifacts:
+        pass_dir = _pass_artifact_dir(run, result.pass_id)
+        if pass_dir.exists():
+            try:
+                artifacts = await IO_POOL.run(zip_dir_to_b64, pass_dir, run.artifact_codec)
+                result = result.model_copy(
+                    update={"artifacts_zip_b64": artifacts, "artifacts_codec": run.artifact_codec.label}
+                )
+            except Exception:
+                pass
     payload = result.model_dump()
-    ok, err = await asyncio.to_thread(post_json, run.config.callback_url or "", payload, CALLBACK_POST_TIMEOUT_SECONDS)
-    if not ok:
+    ok, err = await IO_POOL.run(post_json, run.config.callback_url or "", payload, CALLBACK_POST_TIMEOUT_SECONDS)
+    if ok:
+        _journal_append(run, "delivered", pass_ids=[int(result.pass_id)])
+    else:
         # Keep run throughput high: callback is best-effort and never blocks worker slots.
         _log_event(
             "ERROR",
@@ -1769,24 +5530,30 @@ async def _notify_callback(run: _RunState, result: PassResult) -> None:
 
 
 def _build_callback_batch_payload(run: _RunState, items: list[PassResult]) -> dict[str, Any]:
-    payload_items = [item.model_dump(exclude={"artifacts_zip_b64"}) for item in items]
+    payload_items = [item.model_dump(exclude={"artifacts_zip_b64", "artifacts_codec"}) for item in items]
     payload: dict[str, Any] = {"run_id": run.run_id, "items": payload_items}
     if not run.config.include_artifacts:
         return payload
 
     pass_ids = [int(item.pass_id) for item in items if int(item.pass_id or 0) > 0]
-    artifacts_batch_zip_b64 = zip_pass_dirs_to_b64(run.workdir, pass_ids)
+    if run.retention is not None:
+        pass_ids = [pid for pid in pass_ids if run.retention.keeps(pid)]
+    artifacts_batch_zip_b64 = zip_pass_dirs_to_b64(
+        run.workdir, pass_ids, SCRATCH.run_dir(run.run_id) if SCRATCH is not None else None, run.artifact_codec
+    )
     if artifacts_batch_zip_b64:
         payload["artifacts_batch_zip_b64"] = artifacts_batch_zip_b64
+        payload["artifacts_batch_codec"] = run.artifact_codec.label  # type: ignore[union-attr]
     return payload
 
 
 async def _notify_callback_batch(run: _RunState, items: list[PassResult]) -> None:
     if not items:
         return
-    payload = await asyncio.to_thread(_build_callback_batch_payload, run, items)
-    ok, err = await asyncio.to_thread(post_json, run.config.callback_url or "", payload, CALLBACK_POST_TIMEOUT_SECONDS)
+    payload = await IO_POOL.run(_build_callback_batch_payload, run, items)
+    ok, err = await IO_POOL.run(post_json, run.config.callback_url or "", payload, CALLBACK_POST_TIMEOUT_SECONDS)
     if ok:
+        _journal_append(run, "delivered", pass_ids=[int(item.pass_id) for item in items])
         return
     ids = [str(item.pass_id) for item in items]
     shown = ",".join(ids[:5])
@@ -1830,14 +5597,264 @@ async def _callback_loop(run: _RunState) -> None:
         await _notify_callback_batch(run, pending)
 
 
+def _lease_endpoint(run: _RunState, action: str) -> str:
+    return f"{str(run.config.lease_url or '').strip().rstrip('/')}/{action}"
+
+
+async def _lease_acquire(run: _RunState, want: int) -> int:
+    payload = {
+        "worker_id": WORKER_ID,
+        "run_id": run.run_id,
+        "max_passes": int(want),
+        "ttl_seconds": int(run.config.lease_ttl_seconds),
+    }
+    ok, reply, err = await IO_POOL.run(
+        post_json_reply, _lease_endpoint(run, "acquire"), payload, LEASE_REQUEST_TIMEOUT_SECONDS
+    )
+    if not ok:
+        _log_event(
+            "WARNING",
+            f"lease acquire failed: {err}",
+            kind="run",
+            extra={"run_id": run.run_id, "phase": "lease_acquire", "error": err},
+        )
+        return 0
+
+    items = reply.get("leases") if isinstance(reply, dict) else None
+    leased: list[tuple[PassJob, str]] = []
+    for item in items or []:
+        try:
+            job = PassJob(pass_id=int(item["pass_id"]), parameters=item.get("parameters") or {})
+        except Exception:
+            continue
+        leased.append((job, str(item.get("lease_id") or "")))
+    if not leased:
+        return 0
+    if run.stop.is_set():
+        await _lease_release(run, {job.pass_id: lease_id for job, lease_id in leased})
+        return 0
+
+    fresh: list[tuple[PassJob, str]] = []
+    for job, lease_id in leased:
+        pid = int(job.pass_id)
+        state = run.pass_states.get(pid)
+        if state is None:
+            fresh.append((job, lease_id))
+            continue
+        with STATE_LOCK:
+            run.leases[pid] = lease_id
+        if state == "done":
+            # Re-leased after we already finished it: hand back the stored result.
+            stored = _stored_pass_result(run, pid)
+            if stored is not None:
+                asyncio.create_task(_lease_complete(run, stored))
+    if not fresh:
+        return len(leased)
+    leased = fresh
+
+    _journal_append(run, "assign", passes=[job.model_dump() for job, _ in leased])
+    for job, lease_id in leased:
+        _journal_append(run, "lease", pass_id=job.pass_id, lease_id=lease_id)
+    with STATE_LOCK:
+        for job, lease_id in leased:
+            run.leases[int(job.pass_id)] = lease_id
+            run.lost_leases.discard(int(job.pass_id))
+            run.pass_states[int(job.pass_id)] = "queued"
+        run.enqueued_total += len(leased)
+    for job, _ in leased:
+        run.queue.put_nowait(job)
+
+    _log_event(
+        "INFO",
+        f"run {run.run_id} leased {len(leased)} pass(es) (asked {want})",
+        kind="run",
+        extra={"run_id": run.run_id, "phase": "lease_acquire", "leased": len(leased), "requested": int(want)},
+    )
+    return len(leased)
+
+
+async def _lease_heartbeat(run: _RunState) -> None:
+    with STATE_LOCK:
+        held = dict(run.leases)
+    if not held:
+        return
+    payload = {
+        "worker_id": WORKER_ID,
+        "run_id": run.run_id,
+        "lease_ids": list(held.values()),
+        "ttl_seconds": int(run.config.lease_ttl_seconds),
+    }
+    ok, reply, err = await IO_POOL.run(
+        post_json_reply, _lease_endpoint(run, "heartbeat"), payload, LEASE_REQUEST_TIMEOUT_SECONDS
+    )
+    if not ok:
+        _log_event(
+            "WARNING",
+            f"lease heartbeat failed for {len(held)} lease(s): {err}",
+            kind="run",
+            extra={"run_id": run.run_id, "phase": "lease_heartbeat", "error": err, "leases": len(held)},
+        )
+        return
+    lost_raw = reply.get("lost") if isinstance(reply, dict) else None
+    lost_ids = {str(x) for x in lost_raw or []}
+    lost_passes = [pid for pid, lease_id in held.items() if lease_id in lost_ids]
+    if not lost_passes:
+        return
+    cancelled: list[int] = []
+    with STATE_LOCK:
+        for pid in lost_passes:
+            run.leases.pop(pid, None)
+            if pid in run.running_passes:
+                # Someone else owns it now: free the slot instead of finishing a duplicate.
+                run.cancel_requested.add(pid)
+                cancelled.append(pid)
+            else:
+                run.lost_leases.add(pid)
+    if cancelled:
+        _shard_signal(run, "cancel", pass_ids=cancelled)
+    _log_event(
+        "WARNING",
+        f"run {run.run_id} lost {len(lost_passes)} lease(s); queued copies are skipped, running ones cancelled",
+        kind="run",
+        extra={"run_id": run.run_id, "phase": "lease_lost", "pass_ids": lost_passes[:50]},
+    )
+
+
+async def _lease_complete(run: _RunState, result: PassResult) -> None:
+    with STATE_LOCK:
+        lease_id = run.leases.pop(int(result.pass_id), None)
+    if not lease_id:
+        return
+    payload = {
+        "worker_id": WORKER_ID,
+        "run_id": run.run_id,
+        "lease_id": lease_id,
+        "pass_id": int(result.pass_id),
+        "status": result.status,
+        "result": result.model_dump(exclude={"artifacts_zip_b64", "artifacts_codec"}),
+    }
+    ok, _, err = await IO_POOL.run(
+        post_json_reply, _lease_endpoint(run, "complete"), payload, LEASE_REQUEST_TIMEOUT_SECONDS
+    )
+    if not ok:
+        _log_event(
+            "ERROR",
+            f"lease complete failed for pass {result.pass_id}: {err}",
+            kind="run",
+            extra={"run_id": run.run_id, "pass_id": result.pass_id, "phase": "lease_complete", "error": err},
+        )
+
+
+async def _lease_release(run: _RunState, held: dict[int, str]) -> None:
+    if not held:
+        return
+    payload = {"worker_id": WORKER_ID, "run_id": run.run_id, "lease_ids": list(held.values())}
+    ok, _, err = await IO_POOL.run(
+        post_json_reply, _lease_endpoint(run, "release"), payload, LEASE_REQUEST_TIMEOUT_SECONDS
+    )
+    _log_event(
+        "INFO" if ok else "WARNING",
+        f"run {run.run_id} released {len(held)} lease(s)" + ("" if ok else f": {err}"),
+        kind="run",
+        extra={"run_id": run.run_id, "phase": "lease_release", "leases": len(held), "error": err},
+    )
+
+
+async def _lease_loop(run: _RunState) -> None:
+    event = run.capacity_event
+    if not run.config.lease_url or event is None:
+        return
+    heartbeat_every = max(1.0, float(run.config.lease_ttl_seconds) / 3.0)
+    next_heartbeat = time.monotonic() + heartbeat_every
+    try:
+        while not run.stop.is_set():
+            event.clear()
+            if time.monotonic() >= next_heartbeat:
+                await _lease_heartbeat(run)
+                next_heartbeat = time.monotonic() + heartbeat_every
+
+            # Passes waiting out a retry backoff come back for a slot too. During the
+            # warm-up only the lead slot runs, so only one pass is leased.
+            warming = run.warmup_done is not None and not run.warmup_done.is_set()
+            with STATE_LOCK:
+                free = (1 if warming else MAX_PARALLEL) - run.in_flight - run.queue.qsize() - len(run.retry_waiting)
+            want = min(free, run.config.lease_batch_max) if run.config.lease_batch_max > 0 else free
+            got = await _lease_acquire(run, want) if want > 0 else 0
+            if want > 0 and got >= want:
+                continue
+
+            # Coordinator ran dry (or slots are full): sleep until a slot frees up,
+            # the idle poll interval elapses or a heartbeat is due.
+            wait = LEASE_IDLE_POLL_SECONDS if want > 0 else heartbeat_every
+            wait = max(0.05, min(wait, next_heartbeat - time.monotonic()))
+            try:
+                await asyncio.wait_for(event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        with STATE_LOCK:
+            held = dict(run.leases)
+            run.leases.clear()
+        await _lease_release(run, held)
+
+
+def _pass_progress_publisher(run: _RunState, pass_id: int) -> Callable[[dict[str, Any]], None]:
+    pid = int(pass_id)
+    forward = _PROGRESS_FORWARD
+    if forward is not None:
+        return lambda snapshot: forward(run.run_id, snapshot)
+
+    def _publish(snapshot: dict[str, Any]) -> None:
+        with STATE_LOCK:
+            if pid in run.running_passes:
+                run.pass_progress[pid] = snapshot
+
+    return _publish
+
+
+def _ingest_pass_progress(run_id: str, snapshot: dict[str, Any]) -> None:
+    with STATE_LOCK:
+        run = CURRENT_RUN
+        pid = snapshot.get("pass_id")
+        # A snapshot that arrives after the pass finished must not resurrect it.
+        if run is not None and run.run_id == run_id and pid in run.running_passes:
+            run.pass_progress[int(pid)] = snapshot
+
+
+def _pass_progress_view(snapshot: dict[str, Any], now: float) -> dict[str, Any]:
+    view = {k: v for k, v in snapshot.items() if k not in ("started_at", "updated_at", "advanced_at")}
+    view["elapsed_seconds"] = round(max(0.0, now - float(snapshot.get("started_at") or now)), 1)
+    view["last_update_age_seconds"] = round(max(0.0, now - float(snapshot.get("updated_at") or now)), 1)
+    advanced_at = snapshot.get("advanced_at")
+    view["progress_data"] = advanced_at is not None
+    idle = max(0.0, now - float(advanced_at)) if advanced_at is not None else 0.0
+    view["stalled"] = PROGRESS_STALL_SECONDS > 0 and idle >= PROGRESS_STALL_SECONDS
+    return view
+
+
+def _running_pass_progress(run: _RunState | None) -> list[dict[str, Any]]:
+    if run is None:
+        return []
+    now = time.time()
+    with STATE_LOCK:
+        running = dict(run.running_passes)
+        snapshots = {pid: run.pass_progress.get(pid) for pid in running}
+    out = []
+    for pid, slot in sorted(running.items(), key=lambda item: item[1]):
+        snapshot = snapshots.get(pid)
+        out.append(_pass_progress_view(snapshot, now) if snapshot else {"pass_id": pid, "worker_slot": slot})
+    return out
+
+
 def _execute_pass_job(
     run: _RunState,
     job: PassJob,
     worker_index: int,
     cli_client: _PatchedCliClient | None = None,
-) -> PassResult:
+) -> PassResult | _PassRetry:
     prep_started_perf = time.perf_counter()
-    pass_dir = run.workdir / str(job.pass_id)
+    pass_id = int(job.pass_id)
+    pass_dir = _pass_work_dir(run, pass_id)
     ensure_dir(pass_dir)
 
     report_html = pass_dir / "report.html"
@@ -1846,14 +5863,31 @@ def _execute_pass_job(
     events_path = pass_dir / "events.json"
     cbotset_path = pass_dir / "parameters.cbotset"
 
+    history = run.retry_history.get(pass_id) or {}
+    prior_failures: list[dict[str, str | None]] = list(history.get("diagnostics") or [])
+    attempt = len(prior_failures) + 1
+    if attempt > 1:
+        _clear_backtest_retry_outputs(report_html, report_json, log_path)
+
     write_events(events_path)
     write_cbotset(cbotset_path, job.parameters, run.config.symbol, run.config.period)
     prep_elapsed_seconds = round(max(0.0, time.perf_counter() - prep_started_perf), 3)
 
-    def _run_backtest_attempt() -> tuple[bool, dict[str, Any] | None, dict[str, str | None], float, float]:
-        backtest_started_perf = time.perf_counter()
+    stage_timings: dict[str, float] = {}
+    progress = _PassProgress(
+        run.config.early_stop,
+        run.config.start,
+        run.config.end,
+        run.config.balance,
+        run_id=run.run_id,
+        pass_id=pass_id,
+        worker_slot=worker_index,
+        publish=_pass_progress_publisher(run, pass_id),
+    )
+
+    def _run_backtest_process() -> bool:
         if cli_client is not None:
-            ok = run_backtest_with_patched_cli(
+            return run_backtest_with_patched_cli(
                 cli_client=cli_client,
                 algo_path=run.algo_path,
                 cbotset_path=cbotset_path,
@@ -1865,126 +5899,165 @@ def _execute_pass_job(
                 account=run.config.account,
                 symbol=run.config.symbol,
                 period=run.config.period,
-                report_html=report_html,
+                report_html=report_html if run.config.html_report else None,
                 report_json=report_json,
                 log_path=log_path,
                 timeout_seconds=int(run.config.timeout_seconds),
                 balance=run.config.balance,
-                stop_requested=run.stop.is_set,
+                stop_requested=_pass_stop_requested(run, job.pass_id),
                 run_id=run.run_id,
                 pass_id=job.pass_id,
                 worker_slot=worker_index,
+                progress=progress,
             )
-        else:
-            ok = run_backtest(
-                algo_path=run.algo_path,
-                cbotset_path=cbotset_path,
-                start=run.config.start,
-                end=run.config.end,
-                data_mode=run.config.data_mode,
-                ctid=run.config.ctid,
-                pwd_file=run.pwd_path,
-                account=run.config.account,
-                symbol=run.config.symbol,
-                period=run.config.period,
-                report_html=report_html,
-                report_json=report_json,
-                log_path=log_path,
-                timeout_seconds=int(run.config.timeout_seconds),
-                balance=run.config.balance,
-                stop_requested=run.stop.is_set,
-                on_proc_start=lambda proc: _track_run_proc_start(run, proc),
-                on_proc_end=lambda pid: _track_run_proc_end(run, pid),
-            )
+        return run_backtest(
+            algo_path=run.algo_path,
+            cbotset_path=cbotset_path,
+            start=run.config.start,
+            end=run.config.end,
+            data_mode=run.config.data_mode,
+            ctid=run.config.ctid,
+            pwd_file=run.pwd_path,
+            account=run.config.account,
+            symbol=run.config.symbol,
+            period=run.config.period,
+            report_html=report_html if run.config.html_report else None,
+            report_json=report_json,
+            log_path=log_path,
+            timeout_seconds=int(run.config.timeout_seconds),
+            balance=run.config.balance,
+            stop_requested=_pass_stop_requested(run, job.pass_id),
+            on_proc_start=lambda proc: _track_run_proc_start(run, proc),
+            on_proc_end=lambda pid: _track_run_proc_end(run, pid),
+            progress=progress,
+        )
+
+    def _run_backtest_attempt() -> tuple[bool, dict[str, Any] | None, dict[str, str | None], float, float]:
+        backtest_started_perf = time.perf_counter()
+        try:
+            release_data = _hold_shared_data(run, progress, _pass_stop_requested(run, job.pass_id))
+        except (TimeoutError, InterruptedError) as exc:
+            outcome = "shared_cache_lock_timeout" if isinstance(exc, TimeoutError) else "stopped_by_request"
+            waited = round(max(0.0, time.perf_counter() - backtest_started_perf), 3)
+            return False, None, {"log_tail": None, "outcome": outcome, "error_detail": str(exc)}, waited, 0.0
+        ok = False
+        try:
+            ok = _run_backtest_process()
+        finally:
+            release_data(ok)
         backtest_elapsed_seconds = round(max(0.0, time.perf_counter() - backtest_started_perf), 3)
 
         report_parse_started_perf = time.perf_counter()
-        rep = parse_report(report_json) if ok else None
-        report_parse_elapsed_seconds = round(max(0.0, time.perf_counter() - report_parse_started_perf), 3)
+        stage_timings.clear()
+        rep = parse_report(report_json, run.metrics_extractor, run.config.risk_analytics, stage_timings) if ok else None
+        report_parse_elapsed_seconds = round(
+            max(0.0, time.perf_counter() - report_parse_started_perf - stage_timings.get("analytics_seconds", 0.0)), 3
+        )
         diagnostics = _collect_backtest_diagnostics(log_path)
         return ok, rep, diagnostics, backtest_elapsed_seconds, report_parse_elapsed_seconds
 
     ok, rep, diagnostics, backtest_elapsed_seconds, report_parse_elapsed_seconds = _run_backtest_attempt()
-    attempt_count = 1
-    retry_wait_seconds = 0.0
-    first_failure_diagnostics: dict[str, str | None] | None = None
-
-    if _should_retry_ga_backtest_pass(run, ok=ok, rep=rep, diagnostics=diagnostics):
-        attempt_count = 2
-        first_failure_diagnostics = dict(diagnostics)
+    # An aborted pass has no report; its last progress stands in for the metrics.
+    early_stop_reason = progress.reason if rep is None else None
+    if early_stop_reason is not None:
+        rep = progress.partial_metrics()
+        _log_event(
+            "INFO",
+            f"pass {job.pass_id} early-stopped: {early_stop_reason} (run_id={run.run_id}, worker_slot={worker_index})",
+            kind="run",
+            extra={
+                "run_id": run.run_id,
+                "pass_id": job.pass_id,
+                "worker_slot": worker_index,
+                "phase": "early_stopped",
+                "reason": early_stop_reason,
+                "backtest_seconds": backtest_elapsed_seconds,
+            },
+        )
+    # A projection can legitimately come back empty; only None means no report.
+    completed = rep is not None
+
+    policy = _retry_policy_for(run)
+    if (
+        policy is not None
+        and _should_retry_ga_backtest_pass(run, ok=ok, rep=rep, diagnostics=diagnostics, attempt=attempt)
+        and pass_id not in run.cancel_requested
+    ):
         _snapshot_backtest_attempt_files(
             pass_dir,
-            "attempt_1",
+            f"attempt_{attempt}",
             report_html,
             report_json,
             log_path,
             events_path,
             cbotset_path,
         )
+        delay_seconds = _retry_backoff_seconds(policy, attempt)
+        retry_slot = worker_index if policy.placement == "same_slot" else None
         _log_event(
             "WARNING",
             (
-                f"pass {job.pass_id} failed with retryable GA signature; "
-                f"waiting 10s before same-slot retry (run_id={run.run_id}, worker_slot={worker_index})"
+                f"pass {job.pass_id} failed with retryable signature; re-queued for attempt {attempt + 1} "
+                f"in {delay_seconds}s ({policy.placement}) (run_id={run.run_id}, worker_slot={worker_index})"
             ),
             kind="run",
             extra={
                 "run_id": run.run_id,
                 "pass_id": job.pass_id,
                 "worker_slot": worker_index,
-                "phase": "ga_retry_wait",
-                "retry_wait_seconds": 10,
+                "phase": "ga_retry_scheduled",
+                "attempt": attempt,
+                "retry_wait_seconds": delay_seconds,
+                "placement": policy.placement,
+                "backtest_seconds": backtest_elapsed_seconds,
             },
         )
-        time.sleep(10)
-        retry_wait_seconds = 10.0
-        if run.stop.is_set():
-            attempt_count = 1
-            retry_wait_seconds = 0.0
-            first_failure_diagnostics = None
-        else:
-            _clear_backtest_retry_outputs(report_html, report_json, log_path)
-            ok_retry, rep_retry, diagnostics_retry, retry_backtest_seconds, retry_parse_seconds = _run_backtest_attempt()
-            ok = ok_retry
-            rep = rep_retry
-            diagnostics = diagnostics_retry
-            backtest_elapsed_seconds = round(backtest_elapsed_seconds + retry_wait_seconds + retry_backtest_seconds, 3)
-            report_parse_elapsed_seconds = round(report_parse_elapsed_seconds + retry_parse_seconds, 3)
-            _log_event(
-                "INFO" if rep else "WARNING",
-                (
-                    f"pass {job.pass_id} same-slot GA retry finished "
-                    f"status={'Completed' if rep else 'Failed'} attempts={attempt_count} "
-                    f"(run_id={run.run_id}, worker_slot={worker_index})"
-                ),
-                kind="run",
-                extra={
-                    "run_id": run.run_id,
-                    "pass_id": job.pass_id,
-                    "worker_slot": worker_index,
-                    "phase": "ga_retry_finished",
-                    "attempts": attempt_count,
-                    "status": "Completed" if rep else "Failed",
-                },
-            )
-            _snapshot_backtest_attempt_files(
-                pass_dir,
-                "attempt_2",
-                report_html,
-                report_json,
-                log_path,
-                events_path,
-                cbotset_path,
-            )
+        return _PassRetry(
+            attempt=attempt,
+            delay_seconds=delay_seconds,
+            diagnostics=dict(diagnostics),
+            slot=retry_slot,
+        )
+
+    if attempt > 1:
+        _log_event(
+            "INFO" if completed else "WARNING",
+            (
+                f"pass {job.pass_id} GA retry finished "
+                f"status={'Completed' if completed else 'Failed'} attempts={attempt} "
+                f"(run_id={run.run_id}, worker_slot={worker_index})"
+            ),
+            kind="run",
+            extra={
+                "run_id": run.run_id,
+                "pass_id": job.pass_id,
+                "worker_slot": worker_index,
+                "phase": "ga_retry_finished",
+                "attempts": attempt,
+                "status": "Completed" if completed else "Failed",
+            },
+        )
+        _snapshot_backtest_attempt_files(
+            pass_dir,
+            f"attempt_{attempt}",
+            report_html,
+            report_json,
+            log_path,
+            events_path,
+            cbotset_path,
+        )
 
     metrics = rep or {}
+    if SCRATCH is not None and pass_dir.parent.parent == SCRATCH.root:
+        SCRATCH.observe(_dir_size_bytes(pass_dir))
 
     artifacts_zip_b64 = None
     callback_batch_enabled = bool(run.config.callback_url) and CALLBACK_BATCH_SIZE > 1
     zip_elapsed_seconds = 0.0
-    if run.config.include_artifacts and not callback_batch_enabled:
+    # With artifact retention the publisher zips, once it knows the pass made the top-K.
+    if run.config.include_artifacts and not callback_batch_enabled and run.retention is None:
         zip_started_perf = time.perf_counter()
-        artifacts_zip_b64 = zip_dir_to_b64(pass_dir)
+        artifacts_zip_b64 = zip_dir_to_b64(pass_dir, run.artifact_codec)
         zip_elapsed_seconds = round(max(0.0, time.perf_counter() - zip_started_perf), 3)
 
     if (not ok) or (backtest_elapsed_seconds >= SLOW_PASS_LOG_SECONDS):
@@ -1992,7 +6065,8 @@ def _execute_pass_job(
             "WARNING" if not ok else "INFO",
             (
                 f"pass {job.pass_id} stage_timing prep={prep_elapsed_seconds}s "
-                f"backtest={backtest_elapsed_seconds}s parse={report_parse_elapsed_seconds}s zip={zip_elapsed_seconds}s"
+                f"backtest={backtest_elapsed_seconds}s parse={report_parse_elapsed_seconds}s "
+                f"analytics={stage_timings.get('analytics_seconds', 0.0)}s zip={zip_elapsed_seconds}s"
             ),
             kind="run",
             extra={
@@ -2004,6 +6078,7 @@ def _execute_pass_job(
                 "prep_seconds": prep_elapsed_seconds,
                 "backtest_seconds": backtest_elapsed_seconds,
                 "parse_report_seconds": report_parse_elapsed_seconds,
+                "analytics_seconds": stage_timings.get("analytics_seconds", 0.0),
                 "zip_seconds": zip_elapsed_seconds,
                 "slow_threshold_seconds": SLOW_PASS_LOG_SECONDS,
             },
@@ -2012,45 +6087,404 @@ def _execute_pass_job(
     return PassResult(
         run_id=run.run_id,
         pass_id=job.pass_id,
-        status="Completed" if rep else "Failed",
+        status="Completed" if completed else "Failed",
         started_at_utc=now_utc_iso(),
         finished_at_utc=now_utc_iso(),
         metrics=metrics,
         artifacts_zip_b64=artifacts_zip_b64,
+        artifacts_codec=run.artifact_codec.label if artifacts_zip_b64 else None,  # type: ignore[union-attr]
         error=(
             None
-            if rep
+            if completed
             else (
-                "2 backtest falliti sullo stesso worker"
-                if attempt_count > 1 and first_failure_diagnostics is not None
+                (
+                    f"{attempt} backtest falliti sullo stesso worker"
+                    if policy is not None and policy.placement == "same_slot"
+                    else f"{attempt} backtest falliti"
+                )
+                if prior_failures
                 else "report_missing_or_invalid"
             )
         ),
-        outcome=None if rep else diagnostics.get("outcome"),
+        outcome=None if completed else diagnostics.get("outcome"),
         error_detail=(
             None
-            if rep
+            if completed
             else (
-                _format_ga_double_failure_detail(first_failure_diagnostics, diagnostics)
-                if attempt_count > 1 and first_failure_diagnostics is not None
+                _format_retry_failure_detail([*prior_failures, diagnostics])
+                if prior_failures
                 else (diagnostics.get("error_detail") or "report_missing_or_invalid")
             )
         ),
-        log_tail=None if rep else diagnostics.get("log_tail"),
+        log_tail=None if completed else diagnostics.get("log_tail"),
+        early_stopped=early_stop_reason is not None,
+        early_stop_reason=early_stop_reason,
+    )
+
+
+# On-demand HTML renders of one run's finished passes. Kept apart from the
+# _RunState so they outlive it: finalists are usually picked once the run is
+# stopped and released, so a re-run only needs what the workdir keeps (run.json,
+# algo.algo, pwd.txt, results.jsonl) and stops on its own signal, not run.stop.
+@dataclass
+class _RenderContext:
+    run_id: str
+    workdir: Path
+    config: RunStartRequest
+    algo_path: Path
+    pwd_path: Path
+    results: _ResultStore
+    # pass_id -> "queued" | "running" | "ready" | "failed".
+    states: dict[int, str] = field(default_factory=dict)
+    stop: threading.Event = field(default_factory=threading.Event)
+    # Renders share SLOT_POOL with the passes of the current run: a large request
+    # must not take every slot, so only a few run at a time and the rest queue.
+    gate: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(HTML_RENDER_CONCURRENCY))
+
+
+_RENDER_CONTEXTS: dict[str, _RenderContext] = {}
+
+
+def _render_context(run_id: str) -> _RenderContext:
+    with STATE_LOCK:
+        ctx = _RENDER_CONTEXTS.get(run_id)
+        run = CURRENT_RUN if CURRENT_RUN is not None and CURRENT_RUN.run_id == run_id else None
+    if ctx is not None and ctx.workdir.is_dir():
+        return ctx
+    if run is not None:
+        ctx = _RenderContext(run_id, run.workdir, run.config, run.algo_path, run.pwd_path, run.results)
+    else:
+        workdir = _run_workdir_or_404(run_id)
+        algo_path = workdir / "algo.algo"
+        pwd_path = workdir / "pwd.txt"
+        try:
+            config = RunStartRequest.model_validate(json.loads((workdir / "run.json").read_text(encoding="utf-8")))
+        except (OSError, ValueError) as exc:
+            raise HTTPException(status_code=409, detail=f"Run {run_id} cannot be re-run: run.json: {exc}")
+        if not algo_path.is_file() or not pwd_path.is_file():
+            raise HTTPException(status_code=409, detail=f"Run {run_id} cannot be re-run: algo.algo or pwd.txt is missing")
+        results = _ResultStore(workdir / RESULTS_SPILL_FILENAME)
+        results.load()
+        ctx = _RenderContext(run_id, workdir, config, algo_path, pwd_path, results)
+    with STATE_LOCK:
+        if _RENDER_CONTEXTS.get(run_id) is None or not _RENDER_CONTEXTS[run_id].workdir.is_dir():
+            _RENDER_CONTEXTS[run_id] = ctx
+        return _RENDER_CONTEXTS[run_id]
+
+
+def _render_pass_html(ctx: _RenderContext, pass_id: int, parameters: dict[str, Any]) -> bool:
+    # Re-runs one finished pass with --report enabled, in a side directory so
+    # the pass's own report.json and log stay untouched.
+    pid = int(pass_id)
+    with STATE_LOCK:
+        ctx.states[pid] = "running"
+    out_dir = ctx.workdir / HTML_RENDER_DIRNAME
+    work_dir = out_dir / f".{pid}"
+    shutil.rmtree(work_dir, ignore_errors=True)
+    ensure_dir(work_dir)
+    report_html = work_dir / "report.html"
+    report_json = work_dir / "report.json"
+    log_path = work_dir / "log.txt"
+    started_perf = time.perf_counter()
+    try:
+        write_events(work_dir / "events.json")
+        write_cbotset(work_dir / "parameters.cbotset", parameters, ctx.config.symbol, ctx.config.period)
+        ok = run_backtest(
+            algo_path=ctx.algo_path,
+            cbotset_path=work_dir / "parameters.cbotset",
+            start=ctx.config.start,
+            end=ctx.config.end,
+            data_mode=ctx.config.data_mode,
+            ctid=ctx.config.ctid,
+            pwd_file=ctx.pwd_path,
+            account=ctx.config.account,
+            symbol=ctx.config.symbol,
+            period=ctx.config.period,
+            report_html=report_html,
+            report_json=report_json,
+            log_path=log_path,
+            timeout_seconds=int(ctx.config.timeout_seconds),
+            balance=ctx.config.balance,
+            stop_requested=ctx.stop.is_set,
+        ) and _reports_ready(report_html, report_json)
+        diagnostics = {} if ok else _collect_backtest_diagnostics(log_path)
+        if ok:
+            os.replace(report_html, out_dir / f"{pid}.html")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    elapsed = round(max(0.0, time.perf_counter() - started_perf), 3)
+    _log_event(
+        "INFO" if ok else "WARNING",
+        f"pass {pid} html render {'ready' if ok else 'failed'} in {elapsed}s (run_id={ctx.run_id})",
+        kind="run",
+        extra={
+            "run_id": ctx.run_id,
+            "pass_id": pid,
+            "phase": "html_render",
+            "ok": bool(ok),
+            "elapsed_seconds": elapsed,
+            "outcome": diagnostics.get("outcome"),
+        },
+    )
+    return ok
+
+
+async def _render_passes_html(ctx: _RenderContext, parameters: dict[int, dict[str, Any]]) -> None:
+    async def _one(pid: int, params: dict[str, Any]) -> None:
+        try:
+            async with ctx.gate:
+                ok = await SLOT_POOL.run(_render_pass_html, ctx, pid, params)
+        except Exception as exc:
+            ok = False
+            _log_event(
+                "ERROR",
+                f"pass {pid} html render error: {exc} (run_id={ctx.run_id})",
+                kind="run",
+                extra={"run_id": ctx.run_id, "pass_id": pid, "phase": "html_render_error"},
+            )
+        with STATE_LOCK:
+            ctx.states[pid] = "ready" if ok else "failed"
+
+    await asyncio.gather(*(_one(pid, params) for pid, params in parameters.items()))
+
+
+def _hold_shared_data(
+    run: _RunState,
+    progress: _PassProgress,
+    stop_requested: Optional[Callable[[], bool]] = None,
+) -> Callable[[bool], None]:
+    # A pass reads the shared history under the symbol lock held shared, or
+    # exclusively when its range is not in the index yet: the CLI then downloads
+    # it. The CLI loads all history before simulating, so the lock goes as soon
+    # as the pass shows simulated time (or when it ends, for a silent cBot); a
+    # pass that fetched records its range then. Returns release(loaded).
+    cfg = run.config
+    if SHARED_DATA is None or not SHARED_DATA.attached:
+        return lambda loaded: None
+    name = f"{cfg.symbol.upper()}_{cfg.data_mode}"
+    fetching = not SHARED_DATA.covered(cfg.symbol, cfg.data_mode, cfg.start, cfg.end)
+    fh = SHARED_DATA.acquire(name, shared=not fetching, stop_requested=stop_requested)
+    if fetching and SHARED_DATA.covered(cfg.symbol, cfg.data_mode, cfg.start, cfg.end):
+        # Fetched by another pass or worker while this one waited.
+        SHARED_DATA.release(fh)
+        fetching = False
+        fh = SHARED_DATA.acquire(name, shared=True, stop_requested=stop_requested)
+    guard = threading.Lock()
+
+    def release(loaded: bool) -> None:
+        with guard:
+            if fh.closed:
+                return
+            try:
+                if fetching and loaded:
+                    SHARED_DATA.record(cfg.symbol, cfg.data_mode, cfg.start, cfg.end)
+            finally:
+                SHARED_DATA.release(fh)
+
+    progress.on_simulating = lambda: release(True)
+    return release
+
+
+# (symbol, data_mode, start, end) -> when a prefetch last got the CLI simulating.
+_PREFETCHED: dict[tuple[str, str, str, str], str] = {}
+
+
+def _prefetch_key(cfg: RunStartRequest | DataPrefetchRequest) -> tuple[str, str, str, str]:
+    return (cfg.symbol.upper(), cfg.data_mode, cfg.start, cfg.end)
+
+
+def _prefetch_market_data(
+    cfg: RunStartRequest | DataPrefetchRequest,
+    algo_path: Path,
+    pwd_path: Path,
+    work_dir: Path,
+    timeout_seconds: int,
+    stop_requested: Optional[Callable[[], bool]] = None,
+    on_proc_start: Optional[Callable[[subprocess.Popen], None]] = None,
+    on_proc_end: Optional[Callable[[int], None]] = None,
+) -> dict[str, Any]:
+    args = (cfg, algo_path, pwd_path, work_dir, timeout_seconds, stop_requested, on_proc_start, on_proc_end)
+    # Unlinked, the CLI still writes to its private cache: the shared index says
+    # nothing about what this worker has and must not list what it downloads.
+    if SHARED_DATA is None or not SHARED_DATA.attached:
+        return _fetch_market_data(*args)
+    # Another worker on this host may be downloading the same symbol into the
+    # shared cache: wait for it and skip the fetch if its range covers ours.
+    started_perf = time.perf_counter()
+    try:
+        with SHARED_DATA.lock(f"{cfg.symbol.upper()}_{cfg.data_mode}", stop_requested=stop_requested):
+            if SHARED_DATA.covered(cfg.symbol, cfg.data_mode, cfg.start, cfg.end):
+                SHARED_DATA.count("hits_total")
+                _PREFETCHED[_prefetch_key(cfg)] = now_utc_iso()
+                return {
+                    "ok": True,
+                    "outcome": "shared_cache_hit",
+                    "seconds": round(max(0.0, time.perf_counter() - started_perf), 3),
+                    "error_detail": None,
+                }
+            SHARED_DATA.count("fetches_total")
+            res = _fetch_market_data(*args)
+            if res["ok"]:
+                SHARED_DATA.record(cfg.symbol, cfg.data_mode, cfg.start, cfg.end)
+            return res
+    except (TimeoutError, InterruptedError) as exc:
+        return {
+            "ok": False,
+            "outcome": "shared_cache_lock_timeout" if isinstance(exc, TimeoutError) else "stopped",
+            "seconds": round(max(0.0, time.perf_counter() - started_perf), 3),
+            "error_detail": str(exc),
+        }
+
+
+def _fetch_market_data(
+    cfg: RunStartRequest | DataPrefetchRequest,
+    algo_path: Path,
+    pwd_path: Path,
+    work_dir: Path,
+    timeout_seconds: int,
+    stop_requested: Optional[Callable[[], bool]] = None,
+    on_proc_start: Optional[Callable[[subprocess.Popen], None]] = None,
+    on_proc_end: Optional[Callable[[int], None]] = None,
+) -> dict[str, Any]:
+    # The CLI loads the whole history before simulating, so the backtest is cut
+    # as soon as the simulation is seen: a progress line or any timestamped cBot
+    # log line. A cBot that logs nothing during the test runs it out.
+    ensure_dir(work_dir)
+    cbotset_path = work_dir / "parameters.cbotset"
+    log_path = work_dir / "log.txt"
+    write_events(work_dir / "events.json")
+    write_cbotset(cbotset_path, {}, cfg.symbol, cfg.period)
+    progress = _PassProgress(None, cfg.start, cfg.end, cfg.balance)
+
+    def simulating() -> bool:
+        return any(key in progress.last for key in ("time", "progress", "bars", "ticks"))
+
+    started_perf = time.perf_counter()
+    ok = run_backtest(
+        algo_path=algo_path,
+        cbotset_path=cbotset_path,
+        start=cfg.start,
+        end=cfg.end,
+        data_mode=cfg.data_mode,
+        ctid=cfg.ctid,
+        pwd_file=pwd_path,
+        account=cfg.account,
+        symbol=cfg.symbol,
+        period=cfg.period,
+        report_html=None,
+        report_json=work_dir / "report.json",
+        log_path=log_path,
+        timeout_seconds=int(timeout_seconds),
+        balance=cfg.balance,
+        stop_requested=lambda: simulating() or bool(stop_requested and stop_requested()),
+        on_proc_start=on_proc_start,
+        on_proc_end=on_proc_end,
+        progress=progress,
+    )
+    data_ready = ok or simulating()
+    diagnostics = {} if data_ready else _collect_backtest_diagnostics(log_path)
+    if data_ready:
+        _PREFETCHED[_prefetch_key(cfg)] = now_utc_iso()
+    return {
+        "ok": data_ready,
+        "outcome": "completed" if ok else ("simulation_started" if data_ready else diagnostics.get("outcome")),
+        "seconds": round(max(0.0, time.perf_counter() - started_perf), 3),
+        "error_detail": diagnostics.get("error_detail"),
+    }
+
+
+async def _watch_warmup_pass(run: _RunState, pass_id: int) -> None:
+    # The lead pass is the run's warm-up: once it shows simulated time the CLI has
+    # the history, and the other slots start without all downloading it again.
+    run.warmup_started_perf = time.perf_counter()
+    _log_event(
+        "INFO",
+        f"run {run.run_id} warm-up: pass {pass_id} loads {run.config.symbol} {run.config.data_mode} {run.config.start}-{run.config.end} first",
+        kind="run",
+        extra={"run_id": run.run_id, "pass_id": pass_id, "phase": "warmup_started"},
+    )
+    deadline = time.monotonic() + WARMUP_MAX_SECONDS
+    while not run.warmup_done.is_set() and not run.stop.is_set():  # type: ignore[union-attr]
+        with STATE_LOCK:
+            advanced_at = (run.pass_progress.get(pass_id) or {}).get("advanced_at")
+        if advanced_at is not None:
+            _PREFETCHED[_prefetch_key(run.config)] = now_utc_iso()
+            _finish_warmup(run, pass_id, "simulation_started")
+            return
+        if time.monotonic() >= deadline:
+            _finish_warmup(run, pass_id, "warmup_timeout")
+            return
+        await asyncio.sleep(0.25)
+
+
+def _finish_warmup(run: _RunState, pass_id: int, outcome: str) -> None:
+    if run.warmup_done is None or run.warmup_done.is_set():
+        return
+    run.warmup_done.set()
+    if run.capacity_event is not None:
+        run.capacity_event.set()
+    seconds = round(max(0.0, time.perf_counter() - run.warmup_started_perf), 3)
+    _log_event(
+        "INFO" if outcome == "simulation_started" else "WARNING",
+        f"run {run.run_id} warm-up over outcome={outcome} seconds={seconds}; dispatching passes",
+        kind="run",
+        extra={"run_id": run.run_id, "pass_id": pass_id, "phase": "warmup_finished", "outcome": outcome, "seconds": seconds},
     )
 
 
 @app.post("/compile", response_model=CompileSourceResponse)
 def compile_source(payload: CompileSourceRequest):
+    source_zip_b64 = str(payload.source_zip_b64 or "").strip()
+    if not source_zip_b64:
+        raise HTTPException(status_code=400, detail="source_zip_b64 is required")
+    try:
+        zip_bytes = base64.b64decode(source_zip_b64.encode("ascii"))
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid source_zip_b64 payload: {exc}")
+
+    # A cache hit never touches the CLI, so it is served even while a run is busy.
+    source_hash: Optional[str] = None
+    if COMPILE_CACHE is not None:
+        try:
+            source_hash = COMPILE_CACHE.source_key(zip_bytes, payload.project_relpath, _cli_version())
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid source zip payload: {exc}")
+        hit = COMPILE_CACHE.get(source_hash)
+        if hit is not None:
+            _log_event(
+                "INFO",
+                f"compile cache hit {source_hash} target={hit.get('compile_target')}",
+                kind="compile",
+                extra={"source_hash": source_hash, "phase": "compile_cache_hit"},
+            )
+            stdout = str(hit.get("stdout") or "")
+            stderr = str(hit.get("stderr") or "")
+            return CompileSourceResponse(
+                ok=True,
+                algo_b64=base64.b64encode(hit["algo_bytes"]).decode("ascii"),
+                algo_name=str(hit["algo_name"]),
+                compile_target=str(hit.get("compile_target") or ""),
+                command=list(hit.get("command") or []),
+                stdout_tail=_tail_text(stdout),
+                stderr_tail=_tail_text(stderr),
+                stdout_full=(stdout if bool(payload.include_full_logs) else None),
+                stderr_full=(stderr if bool(payload.include_full_logs) else None),
+                metadata_b64=(
+                    base64.b64encode(hit["metadata_bytes"]).decode("ascii")
+                    if hit.get("metadata_bytes") is not None
+                    else None
+                ),
+                metadata_name=hit.get("metadata_name"),
+                workdir=str(hit["workdir"]),
+                cached=True,
+                source_hash=source_hash,
+            )
+
     with STATE_LOCK:
         run = CURRENT_RUN
     busy, _, _ = _is_busy(run)
     if busy:
         raise HTTPException(status_code=409, detail="Worker is busy")
-
-    source_zip_b64 = str(payload.source_zip_b64 or "").strip()
-    if not source_zip_b64:
-        raise HTTPException(status_code=400, detail="source_zip_b64 is required")
     timeout_seconds = int(payload.timeout_seconds or 300)
 
     compile_id = f"compile_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
@@ -2059,11 +6493,6 @@ def compile_source(payload: CompileSourceRequest):
     source_dir.mkdir(parents=True, exist_ok=True)
 
     try:
-        try:
-            zip_bytes = base64.b64decode(source_zip_b64.encode("ascii"))
-        except Exception as exc:
-            raise HTTPException(status_code=400, detail=f"Invalid source_zip_b64 payload: {exc}")
-
         zip_path = workdir / "source.zip"
         zip_path.write_bytes(zip_bytes)
         try:
@@ -2092,6 +6521,21 @@ def compile_source(payload: CompileSourceRequest):
             kind="compile",
             extra={"compile_id": compile_id, "target": str(target), "output": str(compiled_algo)},
         )
+        if COMPILE_CACHE is not None and source_hash is not None:
+            try:
+                COMPILE_CACHE.put(
+                    source_hash,
+                    compiled_algo,
+                    metadata_path,
+                    {"compile_target": str(target), "command": used_cmd, "stdout": stdout, "stderr": stderr},
+                )
+            except OSError as exc:
+                _log_event(
+                    "WARNING",
+                    f"compile cache store failed for {source_hash}: {exc}",
+                    kind="compile",
+                    extra={"compile_id": compile_id, "source_hash": source_hash, "phase": "compile_cache_error"},
+                )
 
         return CompileSourceResponse(
             ok=True,
@@ -2106,6 +6550,7 @@ def compile_source(payload: CompileSourceRequest):
             metadata_b64=(base64.b64encode(metadata_bytes).decode("ascii") if metadata_bytes is not None else None),
             metadata_name=(metadata_path.name if metadata_path else None),
             workdir=str(workdir),
+            source_hash=source_hash,
         )
     except HTTPException:
         raise
@@ -2113,6 +6558,54 @@ def compile_source(payload: CompileSourceRequest):
         raise HTTPException(status_code=500, detail=f"compile failed: {exc}")
 
 
+@app.post("/data/prefetch")
+async def data_prefetch(payload: DataPrefetchRequest):
+    if not payload.pwd_b64 and not payload.pwd_text:
+        raise HTTPException(status_code=400, detail="pwd_b64 or pwd_text is required")
+    try:
+        pwd_bytes = base64.b64decode(payload.pwd_b64.encode("ascii")) if payload.pwd_b64 else None
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid pwd_b64 payload: {exc}")
+    try:
+        algo_bytes = base64.b64decode(payload.algo_b64.encode("ascii"))
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid algo_b64 payload: {exc}")
+
+    # The download would take a slot a run's pass may be waiting for.
+    with STATE_LOCK:
+        run = CURRENT_RUN
+    busy, _, _ = _is_busy(run)
+    if busy:
+        raise HTTPException(status_code=409, detail="Worker is busy")
+
+    work_dir = WORKER_ROOT / f"prefetch_{uuid.uuid4().hex[:8]}"
+    ensure_dir(work_dir)
+    try:
+        pwd_path = work_dir / "pwd.txt"
+        if pwd_bytes is not None:
+            pwd_path.write_bytes(pwd_bytes)
+        else:
+            pwd_path.write_text(payload.pwd_text or "", encoding="utf-8")
+        os.chmod(pwd_path, 0o600)
+        algo_path = work_dir / "algo.algo"
+        algo_path.write_bytes(algo_bytes)
+        res = await SLOT_POOL.run(
+            _prefetch_market_data, payload, algo_path, pwd_path, work_dir, int(payload.timeout_seconds)
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    _log_event(
+        "INFO" if res["ok"] else "WARNING",
+        (
+            f"data prefetch {payload.symbol} {payload.data_mode} {payload.start}-{payload.end}: "
+            f"ok={res['ok']} outcome={res['outcome']} seconds={res['seconds']}"
+        ),
+        kind="app",
+        extra={"phase": "data_prefetch", "symbol": payload.symbol, "data_mode": payload.data_mode, **res},
+    )
+    return {"symbol": payload.symbol, "data_mode": payload.data_mode, "start": payload.start, "end": payload.end, **res}
+
+
 @app.get("/status", response_model=WorkerStatus)
 def status():
     with STATE_LOCK:
@@ -2128,6 +6621,24 @@ def status():
         parallel_per_core=PARALLEL_PER_CORE,
         explicit_parallel=EXPLICIT_PARALLEL,
         current_run_id=run.run_id if run else None,
+        lease_mode=bool(run and run.config.lease_url),
+        leases_held=len(run.leases) if run else 0,
+        max_queue_depth=_max_queue_depth(),
+        drain_rate_per_second=_drain_rate_per_second(run),
+        executors={
+            "slot": SLOT_POOL.stats(),
+            "io": IO_POOL.stats(),
+            **({"shards": [shard.stats() for shard in SLOT_SHARDS]} if SLOT_SHARDS else {}),
+        },
+        disk={
+            **DISK_JANITOR.stats(),
+            **({"scratch": SCRATCH.stats()} if SCRATCH is not None else {}),
+            **({"compile_cache": COMPILE_CACHE.stats()} if COMPILE_CACHE is not None else {}),
+        },
+        artifact_retention=run.retention.stats() if run and run.retention else None,
+        warming_up=bool(run and run.warmup_done is not None and not run.warmup_done.is_set()),
+        slots=_running_pass_progress(run),
+        data_cache=SHARED_DATA.stats() if SHARED_DATA is not None else None,
         started_at_utc=APP_STARTED_AT,
     )
 
@@ -2262,6 +6773,22 @@ def logs_live(since_id: int = 0, limit: int = 200):
     }
 
 
+def _launch_run_tasks(run_state: _RunState, warmup: bool = False) -> None:
+    if run_state.callback_queue is not None:
+        run_state.callback_task = asyncio.create_task(_callback_loop(run_state))
+
+    if warmup:
+        run_state.warmup_done = asyncio.Event()
+
+    # spin up processors
+    SLOT_POOL.ensure_workers(MAX_PARALLEL)
+    for i in range(MAX_PARALLEL):
+        asyncio.create_task(_process_loop(run_state, i))
+
+    if run_state.config.lease_url:
+        run_state.lease_task = asyncio.create_task(_lease_loop(run_state))
+
+
 @app.post("/run/start", response_model=RunStartResponse)
 async def run_start(payload: RunStartRequest):
     global CURRENT_RUN
@@ -2275,6 +6802,40 @@ async def run_start(payload: RunStartRequest):
         raise HTTPException(status_code=400, detail="pwd_b64 or pwd_text is required")
     if not payload.algo_b64:
         raise HTTPException(status_code=400, detail="algo_b64 is required")
+    try:
+        _compile_metrics_projection(payload.metrics_projection)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if payload.risk_analytics is not None and np is None:
+        raise HTTPException(status_code=400, detail="risk_analytics requires numpy on the worker")
+    if payload.artifact_retention is not None and payload.metrics_projection:
+        # A pass without the ranking metric is evicted, so a projection that drops
+        # it would silently delete every pass's artifacts.
+        metric = payload.artifact_retention.metric
+        available = [str(name or "").strip() for name in payload.metrics_projection]
+        if payload.risk_analytics is not None:
+            available.extend(payload.risk_analytics.metrics)
+        if not any(metric == name or metric.startswith(f"{name}.") for name in available):
+            raise HTTPException(
+                status_code=400,
+                detail=f"artifact_retention.metric {metric!r} is not in metrics_projection",
+            )
+    if payload.artifacts_codec:
+        try:
+            _parse_artifact_codec(payload.artifacts_codec)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    if DISK_CRITICAL_FREE_BYTES and shutil.disk_usage(WORKER_ROOT).free < DISK_CRITICAL_FREE_BYTES:
+        await IO_POOL.run(DISK_JANITOR.run_once, "admission")
+        free = shutil.disk_usage(WORKER_ROOT).free
+        if free < DISK_CRITICAL_FREE_BYTES:
+            _log_event(
+                "ERROR",
+                f"run start refused: {free} bytes free under {WORKER_ROOT}",
+                kind="run",
+                extra={"phase": "run_start_refused", "reason": "low_disk", "free_bytes": free},
+            )
+            raise HTTPException(status_code=507, detail=f"Insufficient disk space on worker ({free} bytes free)")
 
     run_id = f"run_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
     workdir = (WORKER_ROOT / run_id).resolve()
@@ -2316,16 +6877,18 @@ async def run_start(payload: RunStartRequest):
         json.dumps(payload.model_dump(), indent=2, ensure_ascii=False),
         encoding="utf-8",
     )
+    run_state.journal = _open_run_journal(workdir)
+    run_state.result_index = _open_result_index(workdir)
+    _journal_append(run_state, "open", run_id=run_id, started_at_utc=run_state.started_at_utc)
 
     with STATE_LOCK:
         CURRENT_RUN = run_state
 
-    if run_state.callback_queue is not None:
-        run_state.callback_task = asyncio.create_task(_callback_loop(run_state))
-
-    # spin up processors
-    for i in range(MAX_PARALLEL):
-        asyncio.create_task(_process_loop(run_state, i))
+    warmup = WARMUP_ENABLED if payload.warmup is None else bool(payload.warmup)
+    _launch_run_tasks(
+        run_state,
+        warmup=warmup and MAX_PARALLEL > 1 and _prefetch_key(payload) not in _PREFETCHED,
+    )
 
     _log_event(
         "INFO",
@@ -2342,6 +6905,7 @@ async def run_start(payload: RunStartRequest):
             "callback_enabled": bool(payload.callback_url),
             "callback_batch_enabled": bool(run_state.callback_queue is not None),
             "callback_batch_size": CALLBACK_BATCH_SIZE,
+            "lease_mode": bool(payload.lease_url),
         },
     )
 
@@ -2349,13 +6913,47 @@ async def run_start(payload: RunStartRequest):
 
 
 @app.post("/run/{run_id}/assign", response_model=AssignPassesResponse)
-async def run_assign(run_id: str, payload: AssignPassesRequest):
+async def run_assign(run_id: str, payload: AssignPassesRequest, response: Response):
     run = _get_run_or_404(run_id)
     if run.stop.is_set():
         raise HTTPException(status_code=409, detail="Run is stopping/stopped")
 
-    accepted = 0
+    # Idempotency: a pass_id that is already queued, running or done is only
+    # acknowledged (retried coordinator calls must not run a pass twice).
+    incoming: list[PassJob] = []
+    duplicates: list[int] = []
+    reemit: list[PassResult] = []
+    batch_ids: set[int] = set()
     for p in payload.passes:
+        pid = int(p.pass_id)
+        state = run.pass_states.get(pid)
+        if state is None and pid not in batch_ids:
+            incoming.append(p)
+            batch_ids.add(pid)
+            continue
+        duplicates.append(pid)
+        if state == "done" and payload.reemit_completed:
+            stored = _stored_pass_result(run, pid)
+            if stored is not None:
+                reemit.append(stored)
+    if reemit and run.config.callback_url:
+        asyncio.create_task(_redeliver_results(run, reemit))
+
+    # Admission control: only take what fits under the queue cap and hand the
+    # rest back so the coordinator can place it on another worker.
+    max_depth = _max_queue_depth()
+    rejected_jobs: list[PassJob] = []
+    if max_depth is not None:
+        room = max(0, max_depth - run.queue.qsize())
+        if len(incoming) > room:
+            rejected_jobs = incoming[room:]
+            incoming = incoming[:room]
+
+    if incoming:
+        _journal_append(run, "assign", passes=[p.model_dump() for p in incoming])
+    accepted = 0
+    for p in incoming:
+        run.pass_states[int(p.pass_id)] = "queued"
         await run.queue.put(p)
         accepted += 1
 
@@ -2363,22 +6961,57 @@ async def run_assign(run_id: str, payload: AssignPassesRequest):
         run.enqueued_total += accepted
         queued = run.queue.qsize()
 
+    retry_after: int | None = None
+    if rejected_jobs:
+        retry_after = _assign_retry_after_seconds(run, len(rejected_jobs))
     _log_event(
-        "INFO",
-        f"run {run_id} assigned {accepted} pass(es), queued={queued}",
+        "INFO" if not rejected_jobs else "WARNING",
+        (
+            f"run {run_id} assigned {accepted} pass(es), queued={queued}"
+            + (f", duplicates={len(duplicates)}" if duplicates else "")
+            + (f", rejected={len(rejected_jobs)} retry_after={retry_after}s" if rejected_jobs else "")
+        ),
         kind="run",
-        extra={"run_id": run_id, "phase": "assign", "accepted": accepted, "queued": queued},
+        extra={
+            "run_id": run_id,
+            "phase": "assign",
+            "accepted": accepted,
+            "queued": queued,
+            "rejected": len(rejected_jobs),
+            "duplicates": len(duplicates),
+            "max_queue_depth": max_depth,
+        },
     )
 
-    return AssignPassesResponse(run_id=run_id, accepted=accepted, queued=queued)
+    body = AssignPassesResponse(
+        run_id=run_id,
+        accepted=accepted,
+        queued=queued,
+        rejected=len(rejected_jobs),
+        rejected_pass_ids=[int(p.pass_id) for p in rejected_jobs],
+        duplicate_pass_ids=duplicates,
+        reemitted=len(reemit) if run.config.callback_url else 0,
+        max_queue_depth=max_depth,
+        retry_after_seconds=retry_after,
+    )
+    if retry_after is None:
+        return body
+    if accepted <= 0:
+        return JSONResponse(
+            status_code=429,
+            content=body.model_dump(),
+            headers={"Retry-After": str(retry_after)},
+        )
+    response.headers["Retry-After"] = str(retry_after)
+    return body
 
 
 @app.get("/run/{run_id}/results", response_model=RunResultsResponse)
 def run_results(run_id: str, limit: int = 2000, include_artifacts: int = 1):
     run = _get_run_or_404(run_id)
     with_artifacts = bool(int(include_artifacts or 0))
+    snapshot = run.results.tail(limit)
     with STATE_LOCK:
-        snapshot = list(run.results)[-limit:]
         completed = len(run.results)
         total = run.enqueued_total
     if with_artifacts:
@@ -2386,18 +7019,227 @@ def run_results(run_id: str, limit: int = 2000, include_artifacts: int = 1):
         for r in snapshot:
             artifacts = r.artifacts_zip_b64
             if artifacts is None and run.config.include_artifacts:
-                pass_dir = run.workdir / str(r.pass_id)
+                pass_dir = _pass_artifact_dir(run, r.pass_id)
                 if pass_dir.exists():
                     try:
-                        artifacts = zip_dir_to_b64(pass_dir)
+                        artifacts = zip_dir_to_b64(pass_dir, run.artifact_codec)
                     except Exception:
                         artifacts = None
-            results.append(r.model_copy(update={"artifacts_zip_b64": artifacts}))
+            codec = run.artifact_codec.label if artifacts else None  # type: ignore[union-attr]
+            results.append(r.model_copy(update={"artifacts_zip_b64": artifacts, "artifacts_codec": codec}))
     else:
-        results = [r.model_copy(update={"artifacts_zip_b64": None}) for r in snapshot]
+        results = [r.model_copy(update={"artifacts_zip_b64": None, "artifacts_codec": None}) for r in snapshot]
     return RunResultsResponse(run_id=run_id, completed=completed, total_enqueued=total, results=results)
 
 
+@app.get("/run/{run_id}/progress")
+def run_progress(run_id: str):
+    run = _get_run_or_404(run_id)
+    running = _running_pass_progress(run)
+    busy, queued, _ = _is_busy(run)
+    return {
+        "run_id": run_id,
+        "busy": busy,
+        "queued": queued,
+        "completed": len(run.results),
+        "stall_seconds": PROGRESS_STALL_SECONDS,
+        "stalled": [item["pass_id"] for item in running if item.get("stalled")],
+        "no_progress_data": [item["pass_id"] for item in running if not item.get("progress_data")],
+        "running": running,
+    }
+
+
+@app.get("/run/{run_id}/query")
+def run_query(
+    run_id: str,
+    where: list[str] = Query(default=[]),
+    order_by: Optional[str] = None,
+    desc: int = 1,
+    limit: int = 100,
+    offset: int = 0,
+    status: Optional[str] = None,
+    count: int = 0,
+):
+    run = _get_run_or_404(run_id)
+    index = run.result_index
+    if index is None:
+        raise HTTPException(status_code=404, detail="Result index disabled for this run")
+    started = time.perf_counter()
+    try:
+        out = index.query(
+            where,
+            order_by=order_by,
+            descending=bool(int(desc or 0)),
+            limit=max(1, min(RESULT_QUERY_MAX_LIMIT, int(limit))),
+            offset=max(0, int(offset)),
+            status=status,
+            count=bool(int(count or 0)),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {
+        "run_id": run_id,
+        "matched": out["matched"],
+        "pending_writes": index.pending(),
+        "query_ms": round((time.perf_counter() - started) * 1000.0, 2),
+        "items": out["items"],
+    }
+
+
+def _run_workdir_or_404(run_id: str) -> Path:
+    with STATE_LOCK:
+        run = CURRENT_RUN
+    if run and run.run_id == run_id:
+        return run.workdir
+    # Finished runs are no longer current but their workdir is still on disk.
+    workdir = WORKER_ROOT / run_id
+    if not re.fullmatch(r"run_[\w\-]+", run_id) or not (workdir / RESULTS_SPILL_FILENAME).exists():
+        raise HTTPException(status_code=404, detail="Run not found")
+    return workdir
+
+
+@app.get("/run/{run_id}/export")
+async def run_export(run_id: str, format: Literal["csv", "parquet", "arrow"] = "csv"):
+    workdir = _run_workdir_or_404(run_id)
+    if format != "csv" and pa is None:
+        raise HTTPException(status_code=400, detail=f"{format} export requires pyarrow on the worker; use format=csv")
+    plan = await IO_POOL.run(_plan_results_export, workdir)
+    media_type, ext = _EXPORT_FORMATS[format]
+    chunks = _export_csv_chunks(plan) if format == "csv" else _export_arrow_chunks(plan, format)
+    _log_event(
+        "INFO",
+        f"run {run_id} export format={format} rows={plan.rows} columns={len(plan.columns)}",
+        kind="run",
+        extra={"run_id": run_id, "phase": "export", "format": format, "rows": plan.rows, "columns": len(plan.columns)},
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{run_id}.{ext}"'},
+    )
+
+
+@app.post("/run/{run_id}/passes/render")
+async def run_render_passes(run_id: str, payload: PassIdsRequest):
+    ctx = await IO_POOL.run(_render_context, run_id)
+    wanted = list(dict.fromkeys(int(pid) for pid in payload.pass_ids))
+    with STATE_LOCK:
+        rendering = [pid for pid in wanted if ctx.states.get(pid) in ("queued", "running")]
+    finished = [pid for pid in wanted if pid not in rendering and ctx.results.row_of(pid) is not None]
+    parameters = await IO_POOL.run(ctx.results.parameters, finished)
+    if len(parameters) < len(finished) and (ctx.workdir / RUN_JOURNAL_FILENAME).exists():
+        assigned = await IO_POOL.run(_journal_assigned_parameters, ctx.workdir)
+        for pid in finished:
+            if pid not in parameters and pid in assigned:
+                parameters[pid] = assigned[pid]
+    queued = [pid for pid in finished if pid in parameters]
+    with STATE_LOCK:
+        for pid in queued:
+            ctx.states[pid] = "queued"
+    if queued:
+        asyncio.create_task(_render_passes_html(ctx, {pid: parameters[pid] for pid in queued}))
+    not_found = [pid for pid in wanted if pid not in rendering and pid not in parameters]
+
+    _log_event(
+        "INFO",
+        f"run {run_id} html render: queued={len(queued)} rendering={len(rendering)} not_found={len(not_found)}",
+        kind="run",
+        extra={
+            "run_id": run_id,
+            "phase": "html_render_queued",
+            "queued": queued[:50],
+            "not_found": len(not_found),
+        },
+    )
+    return {"ok": True, "run_id": run_id, "queued": queued, "rendering": rendering, "not_found": not_found}
+
+
+@app.get("/run/{run_id}/passes/{pass_id}/report.html")
+def run_pass_report_html(run_id: str, pass_id: int):
+    workdir = _run_workdir_or_404(run_id)
+    with STATE_LOCK:
+        run = CURRENT_RUN if CURRENT_RUN is not None and CURRENT_RUN.run_id == run_id else None
+        ctx = _RENDER_CONTEXTS.get(run_id)
+        render_state = ctx.states.get(int(pass_id)) if ctx is not None else None
+    pass_dir = _pass_artifact_dir(run, pass_id) if run is not None else workdir / str(int(pass_id))
+    for path in (pass_dir / "report.html", workdir / HTML_RENDER_DIRNAME / f"{int(pass_id)}.html"):
+        if path.is_file() and path.stat().st_size > 0:
+            return FileResponse(path, media_type="text/html")
+    if render_state in ("queued", "running"):
+        return JSONResponse(status_code=202, content={"run_id": run_id, "pass_id": int(pass_id), "render": render_state})
+    raise HTTPException(
+        status_code=404,
+        detail=f"No HTML report for pass {int(pass_id)}; request one with POST /run/{run_id}/passes/render",
+    )
+
+
+@app.post("/run/{run_id}/passes/cancel")
+async def run_cancel_passes(run_id: str, payload: PassIdsRequest):
+    run = _get_run_or_404(run_id)
+    wanted = {int(pid) for pid in payload.pass_ids}
+    if not wanted:
+        return {"ok": True, "run_id": run_id, "cancelled_queued": [], "cancelling_running": [], "not_found": []}
+
+    dropped, _ = _reorder_run_queue(run, drop=wanted)
+    with STATE_LOCK:
+        running = sorted(pid for pid in wanted if pid in run.running_passes)
+        run.cancel_requested.update(running)
+        waiting_retry = [pid for pid in wanted if run.retry_waiting.pop(pid, None) is not None]
+        for pid in waiting_retry:
+            run.retry_history.pop(pid, None)
+    if running:
+        _shard_signal(run, "cancel", pass_ids=running)
+
+    cancelled_queued = sorted({int(job.pass_id) for job in dropped} | set(waiting_retry))
+    for pid in cancelled_queued:
+        await _publish_pass_result(run, _cancelled_pass_result(run, pid))
+    not_found = sorted(wanted - set(cancelled_queued) - set(running))
+
+    _log_event(
+        "INFO",
+        (
+            f"run {run_id} cancel: queued={len(cancelled_queued)} running={len(running)} "
+            f"not_found={len(not_found)}"
+        ),
+        kind="run",
+        extra={
+            "run_id": run_id,
+            "phase": "cancel_passes",
+            "cancelled_queued": len(cancelled_queued),
+            "cancelling_running": running[:50],
+            "not_found": len(not_found),
+        },
+    )
+    return {
+        "ok": True,
+        "run_id": run_id,
+        "cancelled_queued": cancelled_queued,
+        "cancelling_running": running,
+        "not_found": not_found,
+    }
+
+
+@app.post("/run/{run_id}/passes/prioritize")
+async def run_prioritize_passes(run_id: str, payload: PassIdsRequest):
+    run = _get_run_or_404(run_id)
+    order = list(dict.fromkeys(int(pid) for pid in payload.pass_ids))
+    _, moved = _reorder_run_queue(run, front=order)
+    moved_ids = [int(job.pass_id) for job in moved]
+    moved_set = set(moved_ids)
+    _log_event(
+        "INFO",
+        f"run {run_id} prioritized {len(moved_ids)} queued pass(es)",
+        kind="run",
+        extra={"run_id": run_id, "phase": "prioritize_passes", "moved": len(moved_ids)},
+    )
+    return {
+        "ok": True,
+        "run_id": run_id,
+        "moved_to_front": moved_ids,
+        "not_queued": [pid for pid in order if pid not in moved_set],
+    }
+
+
 @app.post("/run/{run_id}/stop")
 async def run_stop(run_id: str):
     run = _get_run_or_404(run_id)